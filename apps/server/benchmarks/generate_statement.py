@@ -0,0 +1,164 @@
+"""
+Synthetic MT4 statement generator
+Writes realistic MT4 .htm exports of any size for benchmarks and load tests
+
+Usage (from apps/server):
+    python benchmarks/generate_statement.py 100000 /tmp/statement.htm [--seed 1]
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta
+
+# symbol: (typical price, price decimals, account currency per 1.0 price move per lot)
+SYMBOLS = {
+    'eurusd': (1.10, 5, 100000.0),
+    'gbpusd': (1.27, 5, 100000.0),
+    'usdjpy': (150.0, 3, 667.0),
+    'audusd': (0.66, 5, 100000.0),
+    'xauusd': (1950.0, 2, 100.0),
+}
+LOT_SIZES = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+COMMISSION_PER_LOT = -7.0
+# Share of rows that are balance rows, and how those split
+BALANCE_SHARE = 0.04
+ADMIN_FEE_SHARE = 0.5
+WITHDRAWAL_SHARE = 0.3
+
+HEADER = (
+    '<html><head><title>Statement: 1234567 - Synthetic</title></head><body>\n'
+    '<div align=center><b>Synthetic Broker Ltd.</b></div>\n'
+    '<table width=820 cellspacing=1 cellpadding=3 border=0>'
+    '<tr align=left><td colspan=2><b>Account: 1234567</b></td><td colspan=5><b>Name: Synthetic Trader</b></td>'
+    '<td colspan=2><b>Currency: USD</b></td><td colspan=2><b>Leverage: 1:100</b></td></tr></table>\n'
+    '<table width=820 cellspacing=1 cellpadding=3 border=0>\n'
+    '<tr align=left><td colspan=14><b>Closed Transactions:</b></td></tr>\n'
+    '<tr align=center bgcolor="#C0C0C0"><td>Ticket</td><td nowrap>Open Time</td><td>Type</td><td>Size</td>'
+    '<td>Item</td><td>Price</td><td>S / L</td><td>T / P</td><td nowrap>Close Time</td><td>Price</td>'
+    '<td>Commission</td><td>Taxes</td><td>Swap</td><td>Profit</td></tr>\n'
+)
+FOOTER = '</table></body></html>\n'
+
+
+def _money(value):
+    """MT4 money cell: thousands separated with commas from 1,000 up."""
+    return f"{value:,.2f}" if abs(value) >= 1000 else f"{value:.2f}"
+
+
+def _balance_row(ticket, time, description, amount, shade):
+    return (
+        f'<tr{shade} align=right><td>{ticket}</td><td class=msdate nowrap>{time:%Y.%m.%d %H:%M:%S}</td>'
+        f'<td>balance</td><td colspan=10 align=left>{description}</td>'
+        f'<td colspan=4 align=right>{_money(amount)}</td></tr>\n'
+    )
+
+
+def _trade_row(rng, ticket, open_time, shade):
+    symbol = rng.choice(tuple(SYMBOLS))
+    price, decimals, point_value = SYMBOLS[symbol]
+    side = rng.choice(('buy', 'sell'))
+    direction = 1 if side == 'buy' else -1
+    size = rng.choice(LOT_SIZES)
+    open_price = price * rng.uniform(0.9, 1.1)
+    move = open_price * rng.gauss(0.0002, 0.004)
+    close_price = open_price + move
+    close_time = open_time + timedelta(minutes=rng.randint(1, 4 * 24 * 60))
+    nights = (close_time.date() - open_time.date()).days
+
+    stop_distance = open_price * rng.uniform(0.002, 0.01)
+    stop_loss = f"{open_price - direction * stop_distance:.{decimals}f}" if rng.random() < 0.7 else ''
+    take_profit = f"{open_price + direction * 2 * stop_distance:.{decimals}f}" if rng.random() < 0.5 else ''
+    commission = COMMISSION_PER_LOT * size
+    swap = -0.5 * size * nights * rng.uniform(0, 2)
+    profit = direction * (round(close_price, decimals) - round(open_price, decimals)) * size * point_value
+    return (
+        f'<tr{shade} align=right><td title="#{ticket}">{ticket}</td>'
+        f'<td class=msdate nowrap>{open_time:%Y.%m.%d %H:%M:%S}</td><td>{side}</td>'
+        f'<td class=mspt>{size:.2f}</td><td>{symbol}</td><td style="mso-number-format:0\\.00000;">{open_price:.{decimals}f}</td>'
+        f'<td style="mso-number-format:0\\.00000;">{stop_loss}</td><td style="mso-number-format:0\\.00000;">{take_profit}</td>'
+        f'<td class=msdate nowrap>{close_time:%Y.%m.%d %H:%M:%S}</td><td style="mso-number-format:0\\.00000;">{close_price:.{decimals}f}</td>'
+        f'<td class=mspt>{_money(commission)}</td><td class=mspt>0.00</td><td class=mspt>{_money(swap)}</td>'
+        f'<td class=mspt>{_money(profit)}</td></tr>\n'
+    )
+
+
+def generate_rows(rows, seed=1, start=datetime(2015, 1, 5, 9, 0, 0)):
+    """
+    Yield the HTML of rows statement rows.
+
+    The first row is the initial deposit; after that roughly BALANCE_SHARE
+    of rows are deposits, withdrawals and 'Administration Fee' charges, the
+    rest closed buy/sell trades whose profit follows from their prices and
+    size. About 30% of trades have no stop loss and 50% no take profit
+    (blank cells). The same seed always yields the same statement.
+
+    Args:
+        rows: Number of transaction rows
+        seed: Random seed
+        start: Time of the first row
+
+    Yields:
+        One <tr> line per transaction
+    """
+    rng = random.Random(seed)
+    time = start
+    # Spread the history over a realistic span: ~40 rows per trading day
+    step_minutes = 24 * 60 / 40
+    ticket = 10000000
+    for index in range(rows):
+        ticket += rng.randint(1, 3)
+        shade = ' bgcolor=#E0E0E0' if index % 2 else ''
+        if index == 0:
+            yield _balance_row(ticket, time, 'Deposit', 10000.0, shade)
+            continue
+        time += timedelta(minutes=rng.expovariate(1 / step_minutes))
+        if rng.random() < BALANCE_SHARE:
+            kind = rng.random()
+            if kind < ADMIN_FEE_SHARE:
+                yield _balance_row(ticket, time, 'Administration Fee', -rng.choice((5.0, 10.0, 25.0)), shade)
+            elif kind < ADMIN_FEE_SHARE + WITHDRAWAL_SHARE:
+                yield _balance_row(ticket, time, 'Withdrawal', -round(rng.uniform(100, 2000), 2), shade)
+            else:
+                yield _balance_row(ticket, time, 'Deposit', round(rng.uniform(500, 5000), 2), shade)
+            continue
+        yield _trade_row(rng, ticket, time, shade)
+
+
+def write_statement(path, rows, seed=1, chunk_rows=10000):
+    """
+    Write a synthetic statement, streaming rows to disk in chunks.
+
+    Args:
+        path: Output file path
+        rows: Number of transaction rows (1k to several million)
+        seed: Random seed
+        chunk_rows: Rows buffered per write
+
+    Returns:
+        The output path
+    """
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(HEADER)
+        buffer = []
+        for row in generate_rows(rows, seed):
+            buffer.append(row)
+            if len(buffer) >= chunk_rows:
+                file.write(''.join(buffer))
+                buffer.clear()
+        file.write(''.join(buffer))
+        file.write(FOOTER)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic MT4 statement")
+    parser.add_argument('rows', type=int, help="number of transaction rows")
+    parser.add_argument('output', help="output .htm path")
+    parser.add_argument('--seed', type=int, default=1, help="random seed")
+    args = parser.parse_args()
+    write_statement(args.output, args.rows, args.seed)
+    print(f"Wrote {args.rows} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
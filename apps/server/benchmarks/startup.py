@@ -0,0 +1,105 @@
+"""
+Startup-time benchmark
+Measures the import cost of the application and of each module it loads,
+in fresh interpreters (what an autoscaled worker pays on a cold start)
+
+Usage (from apps/server):
+    python benchmarks/startup.py [--runs 5] [--top 25] [--module main]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+# Modules timed on their own, each in a fresh interpreter
+STANDALONE_MODULES = (
+    'numpy',
+    'pandas',
+    'matplotlib.pyplot',
+    'plotly.graph_objects',
+    'bs4',
+    'fastapi',
+    'services.mt4_parser',
+    'services.visualization',
+    'api.routes',
+    'main',
+)
+
+
+def _run(code, importtime=False):
+    """
+    Run code in a fresh interpreter with src on sys.path.
+
+    Returns:
+        Tuple (wall seconds reported by the child, stderr text)
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    script = f"import time; start = time.perf_counter(); {code}; print(time.perf_counter() - start)"
+    result = subprocess.run(
+        command + ['-c', script],
+        cwd=SRC_DIR,
+        env={**os.environ, 'PYTHONPATH': str(SRC_DIR)},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def import_time(module, runs=5):
+    """
+    Median wall time of importing module in a fresh interpreter.
+
+    Returns:
+        Seconds
+    """
+    return statistics.median(_run(f"import {module}")[0] for _ in range(runs))
+
+
+def import_breakdown(module='main'):
+    """
+    Per-module cumulative import cost of importing module, from python -X importtime.
+
+    Returns:
+        List of (module name, self microseconds, cumulative microseconds), most expensive first
+    """
+    _, stderr = _run(f"import {module}", importtime=True)
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report application import cost")
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument('--top', type=int, default=25, help="rows of the per-module breakdown")
+    parser.add_argument('--module', default='main', help="module whose import is broken down")
+    args = parser.parse_args()
+
+    print(f"Import time, median of {args.runs} fresh interpreters:")
+    for module in STANDALONE_MODULES:
+        try:
+            seconds = import_time(module, args.runs)
+        except subprocess.CalledProcessError:
+            print(f"  {module:<28} not importable")
+            continue
+        print(f"  {module:<28} {seconds * 1000:8.1f} ms")
+
+    print(f"\nMost expensive imports under 'import {args.module}' (cumulative, ms):")
+    for name, self_us, cumulative_us in import_breakdown(args.module)[:args.top]:
+        print(f"  {name:<40} {cumulative_us / 1000:8.1f}  (self {self_us / 1000:.1f})")
+
+
+if __name__ == "__main__":
+    main()
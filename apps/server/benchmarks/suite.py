@@ -0,0 +1,348 @@
+"""
+Benchmark suite
+Times the parser, filters, analytics and /api routes on synthetic MT4
+statements and compares the results with stored baselines
+
+Every benchmark runs in a fresh interpreter, so peak RSS is its own and
+imports or caches of one benchmark never help another. Allocations are
+measured with tracemalloc in a separate run, so the timed runs pay no
+tracing overhead.
+
+Usage (from apps/server):
+    python benchmarks/suite.py                       # run and compare with baselines.json
+    python benchmarks/suite.py --save-baseline       # run and store the results as the new baseline
+    python benchmarks/suite.py --rows 1000,1000000 --only parse_trade_data,api_summary
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCHMARKS_DIR.parent / "src"
+BASELINE_FILE = BENCHMARKS_DIR / "baselines.json"
+DEFAULT_ROWS = (1000, 20000)
+# The BeautifulSoup reference parser is only timed up to this size
+BS4_MAX_ROWS = 100000
+# Relative slowdown (or memory growth) over the baseline that counts as a regression
+DEFAULT_TOLERANCE = 0.25
+# Timing differences below this many seconds are noise, whatever the ratio
+MIN_TIME_DELTA = 0.001
+
+
+# ---------- benchmarks (run inside the child interpreter) ----------
+
+def _bench_parse(path, engine):
+    from services.mt4_parser import parse_trade_data
+    return lambda: parse_trade_data(path, engine=engine)
+
+
+def _bench_load_ledger(path):
+    from services.mt4_parser import load_ledger
+    return lambda: load_ledger(path)
+
+
+def _bench_build_ledger(path):
+    from services.mt4_parser import parse_trade_data
+    from services.ledger import TradeLedger
+    records = parse_trade_data(path)
+    return lambda: TradeLedger.from_records(records)
+
+
+def _bench_filter_records(path):
+    from services.mt4_parser import parse_trade_data, filter_by_date_range
+    records = parse_trade_data(path)
+    from_date, to_date = _middle_range(records)
+    return lambda: filter_by_date_range(records, from_date, to_date)
+
+
+def _bench_filter_ledger(path):
+    from services.mt4_parser import load_ledger, filter_by_date_range
+    ledger = load_ledger(path)
+    from_date, to_date = _middle_range(ledger.time_strings())
+    return lambda: filter_by_date_range(ledger, from_date, to_date)
+
+
+def _bench_extract_records(path):
+    from services.mt4_parser import parse_trade_data, extract_trade_info
+    records = parse_trade_data(path)
+    from_date, to_date = _middle_range(records)
+    return lambda: extract_trade_info(records, from_date, to_date)
+
+
+def _bench_extract_ledger(path):
+    from services.mt4_parser import load_ledger, extract_trade_info
+    ledger = load_ledger(path)
+    from_date, to_date = _middle_range(ledger.time_strings())
+    return lambda: extract_trade_info(ledger, from_date, to_date)
+
+
+def _bench_analyze(path):
+    from services.mt4_parser import load_ledger
+    from services.data_analyzer import analyze_trade_data
+    ledger = load_ledger(path)
+    return lambda: analyze_trade_data(ledger, 'monthly')
+
+
+def _bench_api(path, url):
+    from fastapi.testclient import TestClient
+    import api.routes as routes
+    routes.MT4_EXPORT_FILE = path
+    import main
+    client = TestClient(main.app)
+    client.__enter__()
+    # The first request parses the statement; the benchmark times served requests
+    client.get(url).raise_for_status()
+
+    def request():
+        client.get(url).raise_for_status()
+    return request
+
+
+def _middle_range(records):
+    """Date range covering the middle half of a statement (records or MT4 time strings)."""
+    times = (record if isinstance(record, str) else record.get('open_time') or record.get('date') for record in records)
+    dates = sorted(value[:10] for value in times if value)
+    if not dates:
+        return None, None
+    return dates[len(dates) // 4], dates[3 * len(dates) // 4]
+
+
+BENCHMARKS = {
+    'parse_trade_data': lambda path: _bench_parse(path, 'stream'),
+    'parse_trade_data_bs4': lambda path: _bench_parse(path, 'bs4'),
+    'load_ledger': _bench_load_ledger,
+    'build_ledger': _bench_build_ledger,
+    'filter_by_date_range_records': _bench_filter_records,
+    'filter_by_date_range_ledger': _bench_filter_ledger,
+    'extract_trade_info_records': _bench_extract_records,
+    'extract_trade_info_ledger': _bench_extract_ledger,
+    'analyze_trade_data': _bench_analyze,
+    'api_summary': lambda path: _bench_api(path, '/api/summary'),
+    'api_summary_periods': lambda path: _bench_api(path, '/api/summary/periods?period=daily'),
+    'api_trades': lambda path: _bench_api(path, '/api/trades'),
+    'api_trades_page': lambda path: _bench_api(path, '/api/trades?limit=500&sort=-profit'),
+    'api_equity': lambda path: _bench_api(path, '/api/equity'),
+    'api_symbols': lambda path: _bench_api(path, '/api/symbols'),
+}
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_child(name, path, repeat, trace):
+    """
+    Child entry point: set the benchmark up, time it and print a JSON result.
+    """
+    import contextlib
+    import io
+    # Keep the parser's progress prints out of the JSON on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        run = BENCHMARKS[name](path)
+        if trace:
+            import tracemalloc
+            tracemalloc.start()
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            result = {
+                'alloc_peak_mb': round(peak / (1024 * 1024), 2),
+                'alloc_blocks': sum(stat.count for stat in snapshot.statistics('filename')),
+            }
+        else:
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - start)
+            result = {
+                'seconds': round(statistics.median(times), 6),
+                'min_seconds': round(min(times), 6),
+                'peak_rss_mb': _peak_rss_mb(),
+            }
+    print(json.dumps(result))
+
+
+# ---------- driver ----------
+
+def _child(name, path, repeat, trace=False):
+    command = [sys.executable, str(Path(__file__).resolve()), '--child', name, '--file', str(path), '--repeat', str(repeat)]
+    if trace:
+        command.append('--trace')
+    result = subprocess.run(
+        command,
+        cwd=SRC_DIR,
+        env={**os.environ, 'PYTHONPATH': str(SRC_DIR), 'WARMUP_ENABLED': '0', 'WATCH_INTERVAL': '0', 'CHART_PRERENDER': '0'},
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{name} failed:\n{result.stderr.strip()}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def statement_path(data_dir, rows, seed):
+    """
+    Path of the synthetic statement for a size, generating it on first use.
+    """
+    sys.path.insert(0, str(BENCHMARKS_DIR))
+    from generate_statement import write_statement
+    path = Path(data_dir) / f"statement-{rows}-{seed}.htm"
+    if not path.exists():
+        print(f"Generating {rows} rows -> {path}")
+        write_statement(path, rows, seed)
+    return path
+
+
+def parity_check(path):
+    """
+    Run the stream/bs4 parser parity check in a child interpreter.
+
+    Returns:
+        compare_parser_engines result
+    """
+    code = (
+        "import contextlib, io, json; from services.mt4_parser import compare_parser_engines\n"
+        "with contextlib.redirect_stdout(io.StringIO()): result = compare_parser_engines(%r)\n"
+        "result['mismatches'] = result['mismatches'][:10]; print(json.dumps(result))" % str(path)
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=SRC_DIR, env={**os.environ, 'PYTHONPATH': str(SRC_DIR)},
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_suite(rows_list, names, repeat, seed, data_dir, allocations=True):
+    """
+    Run every benchmark for every statement size.
+
+    Returns:
+        Dictionary {'name[rows]': metrics}
+    """
+    results = {}
+    for rows in rows_list:
+        path = statement_path(data_dir, rows, seed)
+        for name in names:
+            if name == 'parse_trade_data_bs4' and rows > BS4_MAX_ROWS:
+                continue
+            metrics = _child(name, path, repeat)
+            if allocations:
+                metrics.update(_child(name, path, 1, trace=True))
+            metrics['rows_per_second'] = round(rows / metrics['seconds']) if metrics['seconds'] else None
+            key = f"{name}[{rows}]"
+            results[key] = metrics
+            print(
+                f"  {key:<42} {metrics['seconds'] * 1000:10.2f} ms  "
+                f"{metrics['rows_per_second'] or 0:>12,} rows/s  "
+                f"rss {metrics['peak_rss_mb']:7.1f} MB"
+                + (f"  alloc {metrics['alloc_peak_mb']:7.2f} MB" if 'alloc_peak_mb' in metrics else '')
+            )
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Regressions of results against a baseline.
+
+    A benchmark regresses when its median time, peak RSS or allocation
+    peak exceeds the baseline value by more than tolerance (and, for
+    times, by at least MIN_TIME_DELTA).
+
+    Returns:
+        List of human-readable regression lines
+    """
+    regressions = []
+    for key, metrics in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        for metric in ('seconds', 'peak_rss_mb', 'alloc_peak_mb'):
+            if metric not in metrics or not reference.get(metric):
+                continue
+            ratio = metrics[metric] / reference[metric]
+            if metric == 'seconds' and metrics[metric] - reference[metric] < MIN_TIME_DELTA:
+                continue
+            if ratio > 1 + tolerance:
+                regressions.append(f"{key} {metric}: {reference[metric]} -> {metrics[metric]} (x{ratio:.2f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parser/analytics/API benchmark suite")
+    parser.add_argument('--rows', default=','.join(map(str, DEFAULT_ROWS)), help="comma-separated statement sizes")
+    parser.add_argument('--only', default='', help="comma-separated benchmark names (default: all)")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per benchmark (median is reported)")
+    parser.add_argument('--seed', type=int, default=1, help="statement generator seed")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'mt4-benchmarks'), help="where statements are generated")
+    parser.add_argument('--baseline', default=str(BASELINE_FILE), help="baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="allowed relative regression")
+    parser.add_argument('--no-allocations', action='store_true', help="skip the tracemalloc runs")
+    parser.add_argument('--no-parity', action='store_true', help="skip the parser parity check")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--file', help=argparse.SUPPRESS)
+    parser.add_argument('--trace', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.file, args.repeat, args.trace)
+        return
+
+    rows_list = [int(value) for value in args.rows.split(',') if value]
+    names = [name for name in args.only.split(',') if name] or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)} (known: {', '.join(BENCHMARKS)})")
+    Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+
+    if not args.no_parity:
+        parity = parity_check(statement_path(args.data_dir, min(rows_list), args.seed))
+        print(f"Parser parity (stream vs bs4, {min(rows_list)} rows): {'identical' if parity['identical'] else parity}")
+        if not parity['identical']:
+            sys.exit(1)
+
+    print(f"Benchmarks ({platform.python_implementation()} {platform.python_version()}, {platform.machine()}):")
+    results = run_suite(rows_list, names, args.repeat, args.seed, args.data_dir, not args.no_allocations)
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        stored = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+        stored.setdefault('benchmarks', {}).update(results)
+        stored['environment'] = {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'system': platform.system(),
+            'cpus': os.cpu_count(),
+        }
+        baseline_path.write_text(json.dumps(stored, indent=2, sort_keys=True) + '\n')
+        print(f"Baseline saved to {baseline_path}")
+        return
+
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}; run with --save-baseline to create one")
+        return
+    regressions = compare(results, json.loads(baseline_path.read_text()).get('benchmarks', {}), args.tolerance)
+    if regressions:
+        print(f"\nRegressions (> {args.tolerance:.0%} over baseline):")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nNo regressions (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+FastAPI application
+Builds the app: lifespan, middleware stack, static files and routers
+"""
+
+from contextlib import asynccontextmanager
+from functools import partial
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse
+from fastapi.templating import Jinja2Templates
+from fastapi.staticfiles import StaticFiles
+from api.routes import router, api_router, worker_pool, chart_cache, statement_watcher, ledger_validators, response_cache
+from api.http_cache import HTTPCacheMiddleware, CompressionMiddleware
+from api.instrumentation import MetricsMiddleware
+from config import (
+    TEMPLATES_DIR, STATIC_DIR, STATIC_JS_DIR, STATIC_CHARTS_DIR, MT4_EXPORT_FILE, WARMUP_ENABLED, WATCH_INTERVAL,
+    VALIDATED_PATHS, RESPONSE_CACHE_PATHS, CACHE_CONTROL, COMPRESSION_MIN_SIZE, COMPRESSION_LEVEL,
+    PROFILING_ENABLED, PROFILE_INTERVAL, PROFILE_TIMEOUT
+)
+from services.chart_cache import ensure_plotly_asset
+from services.ledger_cache import get_trade_data
+from services.warmup import start_background_warmup
+import os
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ENABLED:
+        start_background_warmup(loaders=[partial(get_trade_data, str(MT4_EXPORT_FILE))])
+    if WATCH_INTERVAL > 0:
+        statement_watcher.start()
+    yield
+    statement_watcher.stop()
+    chart_cache.shutdown()
+    worker_pool.shutdown()
+
+
+app = FastAPI(title="Trading Tools API", version="0.1.0", lifespan=lifespan)
+templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+
+# Conditional GETs / response cache inside, compression outside (added last)
+app.add_middleware(
+    HTTPCacheMiddleware,
+    validators=ledger_validators,
+    validated_prefixes=VALIDATED_PATHS,
+    cached_prefixes=RESPONSE_CACHE_PATHS,
+    policies=CACHE_CONTROL,
+    response_cache=response_cache
+)
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE, compresslevel=COMPRESSION_LEVEL)
+# Outermost, so request latency includes caching and compression
+app.add_middleware(
+    MetricsMiddleware,
+    routes=app.router.routes,
+    profiling=PROFILING_ENABLED,
+    profile_interval=PROFILE_INTERVAL,
+    profile_timeout=PROFILE_TIMEOUT
+)
+
+# Mount static files (chart specs and the shared plotly.js bundle live here)
+STATIC_CHARTS_DIR.mkdir(parents=True, exist_ok=True)
+ensure_plotly_asset(STATIC_JS_DIR)
+static_dir = str(STATIC_DIR)
+if os.path.exists(static_dir):
+    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+
+# Include routers
+app.include_router(router)
+app.include_router(api_router)
+
+@app.get("/", response_class=HTMLResponse)
+async def read_root(request: Request):
+    return templates.TemplateResponse("dashboard.html", {"request": request})
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint"""
+    return {"status": "ok", "service": "trading-tools-api"}
@@ -0,0 +1,354 @@
+"""
+HTTP caching
+ETag/Last-Modified validators derived from ledger versions, conditional
+GETs, per-path Cache-Control policies, an in-memory LRU of encoded
+responses, and gzip/brotli compression
+"""
+
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Ledger versions are per-process counters, so ETags are salted per process:
+# a validator from before a restart (or from another worker) never matches
+BOOT_ID = os.urandom(4).hex()
+
+
+def make_etag(path, query_params, version):
+    """
+    Weak ETag for a GET on path with the given query parameters against a ledger version.
+
+    Weak because the same representation is sent gzip-, brotli- or
+    un-encoded depending on the request.
+    """
+    query = sorted(QueryParams(query_params).multi_items())
+    token = repr((BOOT_ID, path, query, version)).encode('utf-8')
+    return f'W/"{hashlib.sha1(token).hexdigest()[:20]}"'
+
+
+def http_date(seconds):
+    """Format epoch seconds as an HTTP date (RFC 9110)."""
+    return formatdate(seconds, usegmt=True)
+
+
+def is_not_modified(headers, etag, last_modified=None):
+    """
+    Evaluate If-None-Match / If-Modified-Since against a response's validators.
+
+    If-None-Match takes precedence; If-Modified-Since is only used when the
+    request has no If-None-Match (RFC 9110 13.2.2).
+
+    Args:
+        headers: Request headers
+        etag: ETag of the current representation
+        last_modified: Epoch seconds of the last change, or None
+
+    Returns:
+        True if a 304 Not Modified can be sent
+    """
+    if_none_match = headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        bare = etag[2:] if etag.startswith('W/') else etag
+        return '*' in tags or any((tag[2:] if tag.startswith('W/') else tag) == bare for tag in tags)
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(last_modified) <= since
+
+
+class ResponseCache:
+    """
+    LRU cache of encoded response bodies keyed on their ETag.
+
+    Memory is bounded by both the number of entries and the total body
+    size; the least recently used bodies are evicted first. Bodies larger
+    than a tenth of max_bytes are not cached, so one huge response cannot
+    flush everything else.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, max_entries=256):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Cached (body, media_type) for key, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, media_type):
+        """Store a response body, evicting least recently used entries to stay within bounds."""
+        if len(body) > self.max_bytes // 10:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self._entries[key] = (body, media_type)
+            self.size += len(body)
+            while self.size > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        """Hit/miss/eviction counters, entry count and bytes held."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.size,
+            }
+
+
+def _match_prefix(path, prefixes):
+    return any(path == prefix or path.startswith(prefix.rstrip('/') + '/') for prefix in prefixes)
+
+
+class HTTPCacheMiddleware:
+    """
+    Conditional GET handling for ledger-backed API routes.
+
+    For a GET under one of validated_prefixes, the ledger version of the
+    request's path and account (from the validators callback) and the path and
+    query parameters give the ETag; the file's modification time gives
+    Last-Modified. A matching If-None-Match / If-Modified-Since is answered
+    with 304 before the route runs. Successful responses under
+    cached_prefixes are kept in the ResponseCache and replayed for the same
+    ETag. Every other GET gets the Cache-Control policy of its longest
+    matching prefix in policies (unless the route set one itself).
+    """
+
+    def __init__(self, app, validators, validated_prefixes=(), cached_prefixes=(), policies=None,
+                 response_cache=None, default_policy='private, no-cache'):
+        """
+        Args:
+            app: ASGI application
+            validators: Async callable(path, account) returning (version token, last-modified epoch seconds or None)
+            validated_prefixes: Paths that get ETag/Last-Modified validators
+            cached_prefixes: Validated paths whose responses are kept in response_cache
+            policies: Dictionary {path prefix: Cache-Control value}
+            response_cache: ResponseCache (required when cached_prefixes is not empty)
+            default_policy: Cache-Control of validated responses without a policy
+        """
+        self.app = app
+        self.validators = validators
+        self.validated_prefixes = tuple(validated_prefixes)
+        self.cached_prefixes = tuple(cached_prefixes)
+        self.policies = sorted((policies or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.response_cache = response_cache
+        self.default_policy = default_policy
+        self.not_modified = 0
+
+    def policy(self, path):
+        """Cache-Control value for a path (longest matching prefix), or None."""
+        for prefix, value in self.policies:
+            if _match_prefix(path, (prefix,)):
+                return value
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'GET':
+            await self.app(scope, receive, send)
+            return
+
+        path = scope['path']
+        policy = self.policy(path)
+        if not _match_prefix(path, self.validated_prefixes):
+            await self.app(scope, receive, self._with_headers(send, {'cache-control': policy} if policy else {}))
+            return
+
+        query = QueryParams(scope.get('query_string', b''))
+        try:
+            version, last_modified = await self.validators(path, query.get('account'))
+        except Exception:
+            # Unknown account, busy pool...: let the route report it
+            await self.app(scope, receive, send)
+            return
+
+        etag = make_etag(path, query, version)
+        validator_headers = {'etag': etag, 'cache-control': policy or self.default_policy}
+        if last_modified is not None:
+            validator_headers['last-modified'] = http_date(last_modified)
+
+        if is_not_modified(Headers(scope=scope), etag, last_modified):
+            self.not_modified += 1
+            await send({
+                'type': 'http.response.start',
+                'status': 304,
+                'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in validator_headers.items()],
+            })
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        cacheable = self.response_cache is not None and _match_prefix(path, self.cached_prefixes)
+        if cacheable:
+            cached = self.response_cache.get(etag)
+            if cached is not None:
+                body, media_type = cached
+                headers = {**validator_headers, 'content-type': media_type, 'content-length': str(len(body))}
+                await send({
+                    'type': 'http.response.start',
+                    'status': 200,
+                    'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()],
+                })
+                await send({'type': 'http.response.body', 'body': body})
+                return
+
+        await self.app(scope, receive, self._with_headers(send, validator_headers, etag if cacheable else None))
+
+    def _with_headers(self, send, extra, cache_key=None):
+        """
+        Wrap send to add headers to 200 responses and optionally capture a single-chunk body for the cache.
+        """
+        state = {'status': None, 'media_type': None}
+
+        async def send_with_headers(message):
+            if message['type'] == 'http.response.start':
+                state['status'] = message['status']
+                headers = MutableHeaders(scope=message)
+                state['media_type'] = headers.get('content-type')
+                if message['status'] == 200:
+                    for name, value in extra.items():
+                        if name not in headers:
+                            headers[name] = value
+            elif (message['type'] == 'http.response.body' and cache_key is not None and state['status'] == 200
+                  and not message.get('more_body', False) and state['media_type']):
+                self.response_cache.put(cache_key, message.get('body', b''), state['media_type'])
+                state['status'] = None
+            elif message['type'] == 'http.response.body' and message.get('more_body', False):
+                # Streamed response: never cached
+                state['status'] = None
+            await send(message)
+
+        return send_with_headers
+
+
+class _Encoder:
+    """Incremental gzip or brotli encoder for one response body."""
+
+    def __init__(self, encoding, compresslevel, brotli_quality):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits 31: gzip container
+            self._compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 31)
+
+    def process(self, body, last):
+        """Compress a chunk; last finishes the stream."""
+        if self.encoding == 'br':
+            data = self._compressor.process(body)
+            return data + (self._compressor.finish() if last else self._compressor.flush())
+        data = self._compressor.compress(body)
+        return data + self._compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli response compression, preferring brotli when the client accepts it and the brotli package is installed.
+
+    Responses below minimum_size, server-sent event streams and responses
+    that are already encoded are passed through unchanged. Bodies of at least
+    thread_minimum_size bytes are compressed in a worker thread so they do
+    not stall the event loop.
+    """
+
+    excluded_content_types = ('text/event-stream',)
+
+    def __init__(self, app, minimum_size=1024, compresslevel=6, brotli_quality=5, thread_minimum_size=64 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+        self.brotli_quality = brotli_quality
+        self.thread_minimum_size = thread_minimum_size
+
+    def _encoding(self, scope):
+        accepted = Headers(scope=scope).get('accept-encoding', '')
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+    async def __call__(self, scope, receive, send):
+        encoding = self._encoding(scope) if scope['type'] == 'http' else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {'start': None, 'encoder': None, 'passthrough': False}
+
+        async def send_compressed(message):
+            if message['type'] == 'http.response.start':
+                state['start'] = message
+                return
+            if message['type'] != 'http.response.body' or state['passthrough']:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            start = state['start']
+            if start is not None:
+                # First body chunk: decide whether to compress this response
+                state['start'] = None
+                headers = MutableHeaders(scope=start)
+                media_type = headers.get('content-type', '').split(';')[0].strip().lower()
+                if ('content-encoding' in headers or media_type in self.excluded_content_types
+                        or (not more_body and len(body) < self.minimum_size)):
+                    state['passthrough'] = True
+                    await send(start)
+                    await send(message)
+                    return
+                state['encoder'] = _Encoder(encoding, self.compresslevel, self.brotli_quality)
+                headers['Content-Encoding'] = encoding
+                headers.add_vary_header('Accept-Encoding')
+                data = await self._compress(state['encoder'], body, not more_body)
+                if more_body:
+                    del headers['Content-Length']
+                else:
+                    headers['Content-Length'] = str(len(data))
+                await send(start)
+                await send({'type': 'http.response.body', 'body': data, 'more_body': more_body})
+                return
+
+            data = await self._compress(state['encoder'], body, not more_body)
+            await send({'type': 'http.response.body', 'body': data, 'more_body': more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    async def _compress(self, encoder, body, last):
+        if len(body) >= self.thread_minimum_size:
+            return await anyio.to_thread.run_sync(encoder.process, body, last)
+        return encoder.process(body, last)
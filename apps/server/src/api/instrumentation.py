@@ -0,0 +1,133 @@
+"""
+Request instrumentation
+Per-route latency histograms and the opt-in single-request sampling profiler
+"""
+
+import asyncio
+import threading
+import time
+from starlette.datastructures import Headers, QueryParams
+from starlette.routing import Match
+from services import metrics
+from services.metrics import SamplingProfiler
+
+
+class MetricsMiddleware:
+    """
+    Records the latency of every HTTP request by method, route and status.
+
+    Requests are labelled with their route template (e.g.
+    /api/charts/{chart_type}) rather than the raw path, so the number of
+    series stays bounded. Requests answered before routing (304s, cached
+    bodies) are matched against routes.
+
+    With profiling enabled, a request carrying ?profile=1 or an
+    X-Profile: 1 header runs under a SamplingProfiler and is answered with
+    the text report instead of its own response. One request is profiled
+    at a time; concurrent profile requests get 429. A profiled request is
+    cancelled once its response turns out to be an event stream (which
+    never ends) or after profile_timeout seconds, and the samples taken so
+    far are reported.
+    """
+
+    def __init__(self, app, routes=(), profiling=False, profile_interval=0.005, profile_timeout=30):
+        """
+        Args:
+            app: ASGI application
+            routes: Application routes, used to label requests answered before routing
+            profiling: Honour profile requests
+            profile_interval: Seconds between profiler stack samples
+            profile_timeout: Seconds after which a profiled request is cancelled
+        """
+        self.app = app
+        self.routes = routes
+        self.profiling = profiling
+        self.profile_interval = profile_interval
+        self.profile_timeout = profile_timeout
+        self._profile_lock = threading.Lock()
+        self.requests = metrics.registry.histogram(
+            'http_request_duration_seconds', 'HTTP request latency.', ('method', 'route', 'status')
+        )
+
+    def route_label(self, scope):
+        """Route template of a request, 'unmatched' when no route matches."""
+        route = scope.get('route')
+        if route is None:
+            for candidate in self.routes:
+                if candidate.matches(scope)[0] == Match.FULL:
+                    route = candidate
+                    break
+        return getattr(route, 'path', None) or 'unmatched'
+
+    def wants_profile(self, scope):
+        if not self.profiling:
+            return False
+        if QueryParams(scope.get('query_string', b'')).get('profile') == '1':
+            return True
+        return Headers(scope=scope).get('x-profile') == '1'
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        if self.wants_profile(scope):
+            await self._profile(scope, receive, send)
+            return
+
+        status = {'code': 500}
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.requests.observe(time.perf_counter() - start, scope['method'], self.route_label(scope), str(status['code']))
+
+    async def _profile(self, scope, receive, send):
+        if not self._profile_lock.acquire(blocking=False):
+            await _send_text(send, 429, "Another request is being profiled, please retry\n")
+            return
+        status = {'code': 500}
+        stopped = []
+
+        async def discard(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+                if Headers(raw=message['headers']).get('content-type', '').startswith('text/event-stream'):
+                    stopped.append('event stream, profiled until it started')
+                    task.cancel()
+
+        task = None
+        try:
+            profiler = SamplingProfiler(self.profile_interval)
+            with profiler:
+                task = asyncio.ensure_future(self.app(scope, receive, discard))
+                done, _ = await asyncio.wait({task}, timeout=self.profile_timeout)
+                if not done:
+                    stopped.append(f"cancelled after {self.profile_timeout:g}s")
+                    task.cancel()
+                    await asyncio.wait({task})
+                elif not task.cancelled():
+                    task.result()
+        finally:
+            if task is not None and not task.done():
+                task.cancel()
+            self._profile_lock.release()
+        outcome = f"{status['code']} ({stopped[0]})" if stopped else status['code']
+        report = f"{scope['method']} {scope['path']} -> {outcome}\n{profiler.report()}"
+        await _send_text(send, 200, report, {'x-profiled-status': str(status['code']), 'cache-control': 'no-store'})
+
+
+async def _send_text(send, status, text, headers=None):
+    body = text.encode('utf-8')
+    headers = {**(headers or {}), 'content-type': 'text/plain; charset=utf-8', 'content-length': str(len(body))}
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()],
+    })
+    await send({'type': 'http.response.body', 'body': body})
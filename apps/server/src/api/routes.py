@@ -1,8 +1,45 @@
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from config import MT4_EXPORT_FILE, TEMPLATES_DIR
-from services.mt4_parser import parse_trade_data, extract_trade_info, filter_by_date_range
+from starlette.background import BackgroundTask
+from starlette.requests import ClientDisconnect
+from collections import OrderedDict
+import asyncio
+import os
+from functools import partial
+import threading
+from config import (
+    MT4_EXPORT_FILE, EXPORTS_DIR, ALLOWED_EXTENSIONS, TEMPLATES_DIR, SNAPSHOTS_DIR, SNAPSHOTS_ENABLED,
+    IO_WORKERS, CPU_WORKERS, MAX_PENDING_JOBS, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE,
+    EQUITY_DEFAULT_POINTS, EQUITY_MAX_POINTS, STATIC_CHARTS_DIR, CHART_CACHE_SIZE, CHART_PRERENDER,
+    MAX_POSITION_SCENARIOS, MAX_REPLAY_RULES, REPLAY_DEFAULT_POINTS,
+    MONTE_CARLO_DEFAULT_PATHS, MONTE_CARLO_MAX_PATHS, MONTE_CARLO_MAX_STEPS, MONTE_CARLO_CACHE_SIZE,
+    WATCH_INTERVAL, STREAM_KEEPALIVE, STREAM_QUEUE_SIZE, RESPONSE_CACHE_BYTES, RESPONSE_CACHE_ENTRIES,
+    MAX_FILE_SIZE, UPLOAD_HISTORY, LEDGER_BACKEND, LEDGER_DB_PATH
+)
+from services.executor import WorkerPool, PoolSaturated
+from services.mt4_parser import extract_trade_info, filter_by_date_range, load_ledger_checkpoint
+from services.ledger_cache import get_trade_data, ledger_cache
+from services.rollups import GRANULARITIES
+from services.statement_registry import StatementRegistry, UnknownAccount, ALL_ACCOUNTS
+from services.snapshot_store import SnapshotStore
+from services.sql_store import LedgerStore
+from services.ledger import TRADE_FIELDS
+from services.equity import EquityCurve
+from services.chart_cache import ChartCache, CHART_TYPES
+from services import position_sizing
+from services.risk_replay import ReplayTrades, replay_grid
+from services import monte_carlo
+from services import metrics
+from services.ledger_events import LedgerEventHub
+from services.file_watcher import StatementWatcher
+from services.statement_upload import (
+    StatementUpload, UploadManager, UploadError, UploadTooLarge, UploadInProgress, parse_with_progress, validate_account
+)
+from api.http_cache import ResponseCache
+from api.serialization import (
+    FastJSONResponse, ndjson_response, ndjson_records_response, sse_message, encode_cursor, decode_cursor
+)
 
 # Initialize templates
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
@@ -10,8 +47,457 @@ templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 router = APIRouter()
 api_router = APIRouter(prefix="/api")
 
+# Blocking work runs in worker pools; parsing goes to a separate process
+worker_pool = WorkerPool(IO_WORKERS, CPU_WORKERS, MAX_PENDING_JOBS)
+
+
+def _run_in_worker(func, *args):
+    """
+    Run a parse in the process pool (from a worker thread) and record its stage timings here.
+    """
+    result, events = worker_pool.run_cpu_blocking(metrics.collected, func, *args)
+    metrics.registry.merge(events)
+    return result
+
+
+ledger_cache.set_loader(partial(_run_in_worker, load_ledger_checkpoint))
+if SNAPSHOTS_ENABLED:
+    ledger_cache.set_snapshot_store(SnapshotStore(SNAPSHOTS_DIR))
+
+# Every statement under EXPORTS_DIR, one account per file
+registry = StatementRegistry(EXPORTS_DIR, ALLOWED_EXTENSIONS, ledger_cache, pool=worker_pool)
+
+# Equity curve of the latest ledger of each account: {account: (ledger, EquityCurve)}
+_equity_curves = {}
+_replay_trades = {}
+
+# Monte Carlo results per (account, ledger version, parameters), least recently used first
+_simulations = OrderedDict()
+_simulations_lock = threading.Lock()
+_simulation_lookups = {'hits': 0, 'misses': 0}
+
+# Rendered chart specs, pre-rendered for the standard periods after each ingest
+chart_cache = ChartCache(STATIC_CHARTS_DIR, "/static/charts", CHART_CACHE_SIZE)
+if CHART_PRERENDER:
+    ledger_cache.add_listener(lambda path, entry: chart_cache.prerender(entry.data, entry.version))
+
+# Optional indexed SQL copy of every ingested statement, loaded in the background after each ingest
+ledger_store = LedgerStore(LEDGER_DB_PATH) if LEDGER_BACKEND == "sqlite" else None
+if ledger_store is not None:
+    ledger_cache.add_listener(ledger_store.sync_async)
+
+PLOTLY_JS_URL = "/static/js/plotly.min.js"
+
+# Encoded responses of the hottest summary ranges, replayed by HTTPCacheMiddleware per ETag
+response_cache = ResponseCache(RESPONSE_CACHE_BYTES, RESPONSE_CACHE_ENTRIES)
+
+# New ledger versions are diffed and pushed to dashboards on /api/stream;
+# the watcher ingests statements as soon as they change on disk
+ledger_events = LedgerEventHub(STREAM_QUEUE_SIZE)
+ledger_cache.add_listener(ledger_events.on_ingest)
+# Uploaded statements are parsed in the process pool and swapped into the ledger cache
+upload_manager = UploadManager(ledger_cache, partial(_run_in_worker, parse_with_progress), UPLOAD_HISTORY)
+statement_watcher = StatementWatcher(
+    lambda: [MT4_EXPORT_FILE, *registry.discover().values()],
+    ledger_cache.get_entry,
+    WATCH_INTERVAL
+)
+
+
+# ---------- Prometheus metrics read from the components' stats at scrape time ----------
+
+def _cache_stats():
+    with _simulations_lock:
+        simulations = dict(_simulation_lookups)
+    return {
+        'ledger': ledger_cache.stats(),
+        'charts': chart_cache.stats(),
+        'responses': response_cache.stats(),
+        'monte_carlo': simulations,
+    }
+
+
+def _cache_lookups():
+    samples = {}
+    for cache, stats in _cache_stats().items():
+        samples[(cache, 'hit')] = stats['hits']
+        samples[(cache, 'miss')] = stats['misses']
+    return samples
+
+
+def _cache_hit_ratios():
+    return {
+        (cache,): stats['hits'] / (stats['hits'] + stats['misses'])
+        for cache, stats in _cache_stats().items() if stats['hits'] + stats['misses']
+    }
+
+
+def _ledger_sizes(index):
+    return {(path,): size[index] for path, size in ledger_cache.sizes().items()}
+
+
+metrics.registry.gauge(
+    'mt4_cache_lookups_total', 'Cache lookups by cache and result.', ('cache', 'result'), _cache_lookups, kind='counter'
+)
+metrics.registry.gauge('mt4_cache_hit_ratio', 'Share of cache lookups that were hits.', ('cache',), _cache_hit_ratios)
+metrics.registry.gauge('mt4_ledger_rows', 'Rows of each cached ledger.', ('path',), partial(_ledger_sizes, 0))
+metrics.registry.gauge('mt4_ledger_bytes', 'In-memory size of each cached ledger.', ('path',), partial(_ledger_sizes, 1))
+metrics.registry.gauge(
+    'mt4_ledger_reloads_total', 'Ledger cache reparses by kind.', ('kind',),
+    lambda: {(kind,): ledger_cache.stats()[kind] for kind in ('reloads', 'incremental_reloads', 'rewrite_fallbacks', 'snapshot_loads')},
+    kind='counter'
+)
+metrics.registry.gauge('mt4_worker_pending_jobs', 'Jobs queued or running in the worker pools.', (), lambda: {(): worker_pool.pending})
+metrics.registry.gauge(
+    'mt4_worker_jobs_total', 'Worker pool jobs by outcome.', ('outcome',),
+    lambda: {(outcome,): worker_pool.stats()[outcome] for outcome in ('completed', 'coalesced', 'rejected')},
+    kind='counter'
+)
+metrics.registry.gauge('mt4_stream_subscribers', 'Connected /api/stream dashboards.', (), lambda: {(): ledger_events.stats()['subscribers']})
+
+
+async def load_trade_data(account=None):
+    """
+    Get a cached ledger without blocking the event loop.
+    
+    Concurrent callers share one lookup; a reparse (if an export changed)
+    runs in the process pool.
+    
+    Args:
+        account: None for MT4_EXPORT_FILE, an account id, or 'all' for every account merged
+    """
+    if account is None:
+        return await worker_pool.run_io(get_trade_data, str(MT4_EXPORT_FILE), key=("ledger", None))
+    if account == ALL_ACCOUNTS:
+        return await worker_pool.run_io(registry.aggregate, key=("ledger", ALL_ACCOUNTS))
+    return await worker_pool.run_io(registry.ledger, account, key=("ledger", account))
+
+
+async def ledger_validators(path, account=None):
+    """
+    Version token and last modification time of an account's ledger, for HTTP validators.
+
+    The account list depends on every discovered statement, so /api/accounts
+    is validated against the aggregate of all accounts whatever its query.
+    
+    Returns:
+        Tuple (version, epoch seconds or None)
+    """
+    if path.startswith("/api/accounts"):
+        account = ALL_ACCOUNTS
+    return await worker_pool.run_io(_ledger_state, account, key=("ledger-state", account))
+
+
+def _ledger_state(account):
+    if account == ALL_ACCOUNTS:
+        return registry.aggregate_state()
+    if account is None:
+        entry = ledger_cache.get_entry(str(MT4_EXPORT_FILE))
+    else:
+        entry = registry.entry(account)
+    return entry.version, entry.signature[0] / 1e9 if entry.signature else None
+
+
+def unknown_account_response(error):
+    """
+    404 response for an account id without a statement file.
+    """
+    return FastJSONResponse(
+        status_code=404,
+        content={
+            "success": False,
+            "error": f"Unknown account {error}",
+            "message": "No statement found for this account"
+        }
+    )
+
+
+def busy_response(error):
+    """
+    429 response used when the worker pools are saturated.
+    """
+    return FastJSONResponse(
+        status_code=429,
+        headers={"Retry-After": "1"},
+        content={
+            "success": False,
+            "error": str(error),
+            "message": "Server busy, please retry"
+        }
+    )
+
+
+def _trade_records(trade_data, from_date=None, to_date=None):
+    """
+    Filter a ledger by date and return its buy/sell rows as dictionaries.
+    """
+    if from_date or to_date:
+        trade_data = filter_by_date_range(trade_data, from_date, to_date)
+    return trade_data.trades().to_records()
+
+
+def _ledger_entry(account):
+    """
+    Ledger of an account together with its version token.
+    """
+    if account is None:
+        entry = ledger_cache.get_entry(str(MT4_EXPORT_FILE))
+        return entry.data, entry.version
+    if account == ALL_ACCOUNTS:
+        return registry.aggregate_entry()
+    entry = registry.entry(account)
+    return entry.data, entry.version
+
+
+def _sql_statement(account):
+    """
+    Statement path of a single account if the SQL store holds its current ledger.
+    
+    When the store is behind (the ledger changed and is still being loaded,
+    or was never loaded) the load is queued in the background and the path
+    is None: the request is answered from the in-memory ledger meanwhile,
+    which matches the ETag of the current version.
+    
+    Returns:
+        Tuple (statement path or None, number of transactions)
+    """
+    path = str(MT4_EXPORT_FILE) if account is None else str(registry.path_for(account))
+    entry = ledger_cache.get_entry(path)
+    if not ledger_store.holds(path, entry):
+        ledger_store.sync_async(path, entry)
+        return None, len(entry.data)
+    return path, len(entry.data)
+
+
+def _chart_url(account, chart_type, period, from_date, to_date):
+    """
+    URL of a cached chart spec, rendering it if needed.
+    """
+    trade_data, version = _ledger_entry(account)
+    return chart_cache.get(trade_data, version, chart_type, period, from_date, to_date)
+
+
+def _equity_points(account, trade_data, points, from_date, to_date):
+    """
+    Downsampled equity points and drawdown summary for a date range.
+    
+    The curve is rebuilt only when the account's ledger object changed.
+    """
+    cached = _equity_curves.get(account)
+    if cached is None or cached[0] is not trade_data:
+        with metrics.span('equity_build', rows=len(trade_data)):
+            cached = (trade_data, EquityCurve.from_ledger(trade_data))
+        _equity_curves[account] = cached
+    curve = cached[1]
+    return curve.points(points, from_date, to_date), curve.summary(curve.range_slice(from_date, to_date))
+
+
+def _size_positions(inputs, grid, output_format):
+    """
+    Validate a batch of sizing scenarios and compute them.
+    
+    Args:
+        inputs: Keyword arguments for position_sizing.position_size (scalars or lists)
+        grid: Cartesian product of the inputs instead of element-wise broadcasting
+        output_format: 'json' (list of dicts) or 'csv' (CSV text)
+    
+    Raises:
+        ValueError: On invalid inputs or too many scenarios
+    """
+    unknown = [name for name in inputs if name not in position_sizing.INPUT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    missing = [name for name in position_sizing.REQUIRED_COLUMNS if inputs.get(name) is None]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+    count = position_sizing.scenario_count(grid, **inputs)
+    if count > MAX_POSITION_SCENARIOS:
+        raise ValueError(f"{count} scenarios requested, at most {MAX_POSITION_SCENARIOS} per call")
+    
+    size = position_sizing.position_size_grid if grid else position_sizing.position_size
+    results = size(**{name: value for name, value in inputs.items() if value is not None})
+    if output_format == "csv":
+        return position_sizing.to_csv(results)
+    return position_sizing.to_records(results)
+
+
+def _parse_number_list(value, name):
+    """
+    Parse a comma-separated list of numbers from a query parameter.
+    
+    Raises:
+        ValueError: If the list is empty or an item is not a number
+    """
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    if not items:
+        raise ValueError(f"{name} must list at least one number")
+    try:
+        return [float(item) for item in items]
+    except ValueError:
+        raise ValueError(f"{name} must be a comma-separated list of numbers: '{value}'") from None
+
+
+def _risk_replay(account, trade_data, risk_pcts, leverages, initial_capital, points, from_date, to_date):
+    """
+    Replay the account's trades under every risk % x leverage combination.
+    
+    Per-trade inputs are rebuilt only when the account's ledger object or
+    the date range changed; the grid is spread over the process pool.
+    """
+    cached = _replay_trades.get(account)
+    if cached is None or cached[0] is not trade_data or cached[1] != (from_date, to_date):
+        cached = (trade_data, (from_date, to_date), ReplayTrades(trade_data, from_date, to_date))
+        _replay_trades[account] = cached
+    trades = cached[2]
+    with metrics.span('risk_replay', rows=len(trades) * len(risk_pcts) * len(leverages)):
+        results = replay_grid(trades, risk_pcts, leverages, initial_capital, points, executor=worker_pool.cpu_pool)
+    return results, len(trades), trades.skipped
+
+
+def _monte_carlo(account, params):
+    """
+    Simulate trade sequences for an account, reusing cached results.
+    
+    Results are cached per ledger version and parameters, so a repeated
+    request is answered without simulating until the statement changes.
+    Chunks of paths run in the process pool.
+    """
+    trade_data, version = _ledger_entry(account)
+    key = (account, version, params)
+    with _simulations_lock:
+        cached = _simulations.get(key)
+        if cached is not None:
+            _simulations.move_to_end(key)
+            _simulation_lookups['hits'] += 1
+            return cached, True
+        _simulation_lookups['misses'] += 1
+    
+    paths, horizon, method, ruin_pct, seed, from_date, to_date = params
+    returns = monte_carlo.trade_returns(trade_data, from_date, to_date)
+    if horizon is not None and horizon * paths > MONTE_CARLO_MAX_STEPS:
+        raise ValueError(f"paths x horizon must be at most {MONTE_CARLO_MAX_STEPS}")
+    if horizon is None and len(returns) * paths > MONTE_CARLO_MAX_STEPS:
+        raise ValueError(f"{paths} paths of {len(returns)} trades exceed {MONTE_CARLO_MAX_STEPS} simulated trades; lower paths or set horizon")
+    with metrics.span('monte_carlo', rows=paths * (horizon or len(returns))):
+        result = monte_carlo.simulate(returns, paths, horizon, method, ruin_pct, seed, executor=worker_pool.cpu_pool)
+    
+    with _simulations_lock:
+        _simulations[key] = result
+        while len(_simulations) > MONTE_CARLO_CACHE_SIZE:
+            _simulations.popitem(last=False)
+    return result, False
+
+
+def _stream_paths(account):
+    """
+    Predicate selecting the statement paths whose updates an /api/stream subscriber receives.
+    
+    Raises:
+        UnknownAccount: If the account id has no statement file
+    """
+    if account is None:
+        default = os.path.abspath(str(MT4_EXPORT_FILE))
+        return lambda path: path == default
+    if account == ALL_ACCOUNTS:
+        exports = os.path.join(os.path.abspath(str(EXPORTS_DIR)), "")
+        return lambda path: path.startswith(exports)
+    statement = os.path.abspath(str(registry.path_for(account)))
+    return lambda path: path == statement
+
+
+def _ledger_update(event, account, from_date, to_date):
+    """
+    Payload pushed to a dashboard for a new ledger version.
+    
+    Carries the summary for the subscriber's date range and the new trades
+    that fall in it, or only a reload flag when the change is not a pure
+    append (first load, rewritten history, or missed events).
+    """
+    if event.new_rows is None:
+        return {"account": account, "version": event.version, "reload": True}
+    ledger = registry.aggregate() if account == ALL_ACCOUNTS else event.ledger
+    return {
+        "account": account,
+        "version": event.version,
+        "reload": False,
+        "summary": extract_trade_info(ledger, from_date, to_date),
+        "new_trades": _trade_records(event.ledger.take(event.new_rows), from_date, to_date)
+    }
+
+
+def _parse_trade_query(fields, sort, limit, offset, cursor, format):
+    """
+    Validate the paging/projection parameters of /api/trades.
+    
+    Returns:
+        Dictionary of normalized parameters, or None when none were given
+        (legacy full-list response)
+    
+    Raises:
+        ValueError: On invalid values
+    """
+    if fields is None and sort is None and limit is None and offset is None and cursor is None and format == "json":
+        return None
+    if format not in ("json", "ndjson"):
+        raise ValueError("format must be 'json' or 'ndjson'")
+    if cursor is not None:
+        offset, cursor_sort = decode_cursor(cursor)
+        if sort is None:
+            sort = cursor_sort
+        elif sort != cursor_sort:
+            raise ValueError("sort does not match the cursor")
+    offset = offset or 0
+    if offset < 0:
+        raise ValueError("offset must be >= 0")
+    if limit is None:
+        # A bare NDJSON request streams every row; JSON is always paged
+        if format == "json" or offset:
+            limit = DEFAULT_PAGE_SIZE
+    elif not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    if fields is not None and not field_list:
+        raise ValueError("fields must list at least one field")
+    return {"fields": field_list, "sort": sort, "limit": limit, "offset": offset, "format": format}
+
+
+def _record_fields(ledger):
+    """Record keys a trades query may project to or sort by."""
+    return TRADE_FIELDS + (("account",) if "account" in ledger.columns else ())
+
+
+def _trade_page(trade_data, from_date, to_date, query):
+    """
+    Filter, sort and slice the trades of a ledger.
+    
+    Returns:
+        Tuple (page TradeLedger, total matching trades)
+    """
+    if from_date or to_date:
+        trade_data = filter_by_date_range(trade_data, from_date, to_date)
+    trades = trade_data.trades()
+    if query["sort"]:
+        field = query["sort"].lstrip("-")
+        if field not in _record_fields(trades):
+            raise ValueError(f"Unknown sort field: {field}")
+        trades = trades.take(trades.sort_order(field, descending=query["sort"].startswith("-")))
+    end = None if query["limit"] is None else query["offset"] + query["limit"]
+    return trades.take(slice(query["offset"], end)), len(trades)
+
 # ==================== Web Routes (HTML) ====================
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Metrics in the Prometheus text exposition format
+    """
+    return PlainTextResponse(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+        headers={"Cache-Control": "no-store"}
+    )
+
+
 @router.get("/", response_class=HTMLResponse)
 async def read_dashboard(request: Request):
     """
@@ -20,7 +506,7 @@ async def read_dashboard(request: Request):
     try:
         return templates.TemplateResponse("index.html", {"request": request})
     except Exception as e:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "success": False,
@@ -33,22 +519,32 @@ async def read_dashboard(request: Request):
 # ==================== API Routes (JSON) ====================
 
 @api_router.get("/summary")
-async def get_summary(from_date: str = None, to_date: str = None):
+async def get_summary(from_date: str = None, to_date: str = None, account: str = None):
     """
     Get trading summary with optional date range filtering.
     
     Args:
         from_date: Start date (format: 'YYYY.MM.DD')
         to_date: End date (format: 'YYYY.MM.DD')
+        account: Account id, 'all' for every account (default: MT4_EXPORT_FILE)
         
     Returns:
         JSON object with summary statistics for the specified period
     """
     try:
-        trade_data = parse_trade_data(str(MT4_EXPORT_FILE))
+        path = None
+        if ledger_store is not None and account != ALL_ACCOUNTS:
+            path, rows = await worker_pool.run_io(_sql_statement, account, key=("sql-statement", account))
+        if path is not None:
+            # Aggregated in SQL over the indexed date range
+            summary = await worker_pool.run_io(ledger_store.summary, path, from_date, to_date) if rows else None
+        else:
+            trade_data = await load_trade_data(account)
+            # Get summary with date range filtering
+            summary = extract_trade_info(trade_data, from_date, to_date) if len(trade_data) else None
         
-        if not trade_data:
-            return JSONResponse(
+        if summary is None:
+            return FastJSONResponse(
                 status_code=200,
                 content={
                     "success": True,
@@ -57,18 +553,19 @@ async def get_summary(from_date: str = None, to_date: str = None):
                 }
             )
         
-        # Get summary with date range filtering
-        summary = extract_trade_info(trade_data, from_date, to_date)
-        
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
             content={
                 "success": True,
                 "data": summary
             }
         )
+    except PoolSaturated as e:
+        return busy_response(e)
+    except UnknownAccount as e:
+        return unknown_account_response(e)
     except Exception as e:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "success": False,
@@ -78,23 +575,549 @@ async def get_summary(from_date: str = None, to_date: str = None):
         )
 
 
+@api_router.get("/summary/periods")
+async def get_period_summaries(period: str = "monthly", from_date: str = None, to_date: str = None, account: str = None):
+    """
+    Get per-period trading summaries from the precomputed rollups.
+    
+    Args:
+        period: 'daily', 'weekly', 'monthly' or 'yearly'
+        from_date: Start date (format: 'YYYY.MM.DD')
+        to_date: End date (format: 'YYYY.MM.DD')
+        account: Account id, 'all' for every account (default: MT4_EXPORT_FILE)
+        
+    Returns:
+        JSON array with one summary per period
+    """
+    if period not in GRANULARITIES:
+        return FastJSONResponse(
+            status_code=400,
+            content={
+                "success": False,
+                "error": f"Invalid period '{period}'",
+                "message": f"period must be one of {', '.join(GRANULARITIES)}"
+            }
+        )
+    try:
+        trade_data = await load_trade_data(account)
+        periods = trade_data.rollups.rollup(period, from_date, to_date)
+        
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "period": period,
+                "data": periods,
+                "count": len(periods)
+            }
+        )
+    except PoolSaturated as e:
+        return busy_response(e)
+    except UnknownAccount as e:
+        return unknown_account_response(e)
+    except Exception as e:
+        return FastJSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "message": "Error retrieving period summaries"
+            }
+        )
+
+
+@api_router.get("/symbols")
+async def get_symbols(from_date: str = None, to_date: str = None, account: str = None):
+    """
+    Get per-symbol trading statistics from the ledger's symbol index.
+    
+    Args:
+        from_date: Start date (format: 'YYYY.MM.DD')
+        to_date: End date (format: 'YYYY.MM.DD')
+        account: Account id, 'all' for every account (default: MT4_EXPORT_FILE)
+        
+    Returns:
+        JSON array with PnL, volume, win rate, hold time, fees and long/short split per symbol
+    """
+    try:
+        trade_data = await load_trade_data(account)
+        symbols = await worker_pool.run_io(
+            trade_data.rollups.symbols.breakdown, from_date, to_date,
+            key=("symbols", account, from_date, to_date)
+        )
+        
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "data": symbols,
+                "count": len(symbols)
+            }
+        )
+    except PoolSaturated as e:
+        return busy_response(e)
+    except UnknownAccount as e:
+        return unknown_account_response(e)
+    except Exception as e:
+        return FastJSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "message": "Error retrieving symbol statistics"
+            }
+        )
+
+
+@api_router.get("/equity")
+async def get_equity(from_date: str = None, to_date: str = None, account: str = None, points: int = EQUITY_DEFAULT_POINTS):
+    """
+    Get the account's equity curve with running peak and drawdown.
+    
+    Balance includes every deposit, withdrawal, fee and closed trade up to
+    each point; long curves are downsampled server-side with LTTB.
+    
+    Args:
+        from_date: Start date (format: 'YYYY.MM.DD')
+        to_date: End date (format: 'YYYY.MM.DD')
+        account: Account id, 'all' for every account (default: MT4_EXPORT_FILE)
+        points: Maximum number of points to return (3 to EQUITY_MAX_POINTS)
+        
+    Returns:
+        JSON with the curve points and a drawdown summary
+    """
+    if not 3 <= points <= EQUITY_MAX_POINTS:
+        return FastJSONResponse(
+            status_code=400,
+            content={
+                "success": False,
+                "error": f"Invalid points {points}",
+                "message": f"points must be between 3 and {EQUITY_MAX_POINTS}"
+            }
+        )
+    try:
+        trade_data = await load_trade_data(account)
+        curve, summary = await worker_pool.run_io(
+            _equity_points, account, trade_data, points, from_date, to_date,
+            key=("equity", account, points, from_date, to_date)
+        )
+        
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "data": curve,
+                "summary": summary,
+                "count": len(curve)
+            }
+        )
+    except PoolSaturated as e:
+        return busy_response(e)
+    except UnknownAccount as e:
+        return unknown_account_response(e)
+    except Exception as e:
+        return FastJSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "message": "Error retrieving equity curve"
+            }
+        )
+
+
+@api_router.get("/charts/{chart_type}")
+async def get_chart(chart_type: str, period: str = "monthly", from_date: str = None, to_date: str = None, account: str = None):
+    """
+    Get the URL of a rendered Plotly chart spec.
+    
+    Specs are JSON files with content-hashed names under /static/charts,
+    drawn client-side with the shared plotly.js asset.
+    
+    Args:
+        chart_type: 'profit', 'equity' or 'symbols'
+        period: 'daily', 'weekly', 'monthly' or 'yearly' (profit chart)
+        from_date: Start date (format: 'YYYY.MM.DD')
+        to_date: End date (format: 'YYYY.MM.DD')
+        account: Account id, 'all' for every account (default: MT4_EXPORT_FILE)
+        
+    Returns:
+        JSON with the spec URL and the plotly.js URL
+    """
+    if chart_type not in CHART_TYPES or period not in GRANULARITIES:
+        return FastJSONResponse(
+            status_code=400,
+            content={
+                "success": False,
+                "error": f"Invalid chart '{chart_type}' or period '{period}'",
+                "message": f"chart must be one of {', '.join(CHART_TYPES)} and period one of {', '.join(GRANULARITIES)}"
+            }
+        )
+    try:
+        url = await worker_pool.run_io(
+            _chart_url, account, chart_type, period, from_date, to_date,
+            key=("chart", account, chart_type, period, from_date, to_date)
+        )
+        
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "chart": chart_type,
+                "period": period,
+                "url": url,
+                "plotly_js": PLOTLY_JS_URL
+            }
+        )
+    except PoolSaturated as e:
+        return busy_response(e)
+    except UnknownAccount as e:
+        return unknown_account_response(e)
+    except Exception as e:
+        return FastJSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "message": "Error rendering chart"
+            }
+        )
+
+
+@api_router.post("/position-size")
+async def size_positions(request: Request, format: str = "json", grid: bool = False):
+    """
+    Size a batch of positions from capital, risk % and leverage (and optionally a stop distance).
+    
+    The body is either JSON, with each of capital, risk_pct, leverage,
+    stop_distance and contract_size given as a number or a list of numbers
+    (lists are broadcast element-wise, or combined as a cartesian product
+    with grid=true), or a CSV (Content-Type: text/csv) with one scenario
+    per row and those names as header.
+    
+    Args:
+        request: Incoming request carrying the scenarios
+        format: 'json' or 'csv' response
+        grid: Size every combination of the JSON lists
+        
+    Returns:
+        JSON array (or CSV) with risk_amount, position_size, units and lots per scenario
+    """
+    try:
+        if format not in ("json", "csv"):
+            raise ValueError("format must be 'json' or 'csv'")
+        if request.headers.get("content-type", "").startswith("text/csv"):
+            body = (await request.body()).decode("utf-8")
+            inputs = position_sizing.read_csv(body)
+        else:
+            inputs = await request.json()
+            if not isinstance(inputs, dict):
+                raise ValueError("JSON body must be an object")
+        
+        results = await worker_pool.run_io(_size_positions, inputs, grid, format)
+        
+        if format == "csv":
+            return PlainTextResponse(results, media_type="text/csv")
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "data": results,
+                "count": len(results)
+            }
+        )
+    except (ValueError, TypeError) as e:
+        return FastJSONResponse(
+            status_code=400,
+            content={
+                "success": False,
+                "error": str(e),
+                "message": "Invalid position sizing request"
+            }
+        )
+    except PoolSaturated as e:
+        return busy_response(e)
+    except Exception as e:
+        return FastJSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "message": "Error sizing positions"
+            }
+        )
+
+
+@api_router.get("/risk-replay")
+async def get_risk_replay(
+    risk_pct: str = "1,2",
+    leverage: str = "100",
+    initial_capital: float = 10000.0,
+    points: int = REPLAY_DEFAULT_POINTS,
+    from_date: str = None,
+    to_date: str = None,
+    account: str = None
+):
+    """
+    Replay the account's closed trades under alternative position sizing rules.
+    
+    Every trade is re-sized on the equity of the replayed account: trades
+    with a stop loss risk risk_pct of equity at the stop (capped at
+    leverage times equity of notional), trades without one get a notional
+    of equity * risk_pct / 100 * leverage. Each combination of the
+    risk_pct and leverage lists is one rule.
+    
+    Args:
+        risk_pct: Comma-separated risk percentages (e.g. '1,2')
+        leverage: Comma-separated leverages (e.g. '50,100')
+        initial_capital: Starting equity of every replay
+        points: Maximum number of curve points per rule (3 to EQUITY_MAX_POINTS)
+        from_date: Start date (format: 'YYYY.MM.DD')
+        to_date: End date (format: 'YYYY.MM.DD')
+        account: Account id, 'all' for every account (default: MT4_EXPORT_FILE)
+        
+    Returns:
+        JSON with final equity, return, max drawdown and equity curve per rule
+    """
+    try:
+        risk_pcts = _parse_number_list(risk_pct, "risk_pct")
+        leverages = _parse_number_list(leverage, "leverage")
+        if any(not 0 < value <= 100 for value in risk_pcts):
+            raise ValueError("risk_pct values must be in (0, 100]")
+        if any(value <= 0 for value in leverages):
+            raise ValueError("leverage values must be > 0")
+        if initial_capital <= 0:
+            raise ValueError("initial_capital must be > 0")
+        if not 3 <= points <= EQUITY_MAX_POINTS:
+            raise ValueError(f"points must be between 3 and {EQUITY_MAX_POINTS}")
+        if len(risk_pcts) * len(leverages) > MAX_REPLAY_RULES:
+            raise ValueError(f"{len(risk_pcts) * len(leverages)} rules requested, at most {MAX_REPLAY_RULES} per call")
+    except ValueError as e:
+        return FastJSONResponse(
+            status_code=400,
+            content={
+                "success": False,
+                "error": str(e),
+                "message": "Invalid risk replay request"
+            }
+        )
+    try:
+        trade_data = await load_trade_data(account)
+        results, trade_count, skipped = await worker_pool.run_io(
+            _risk_replay, account, trade_data, risk_pcts, leverages, initial_capital, points, from_date, to_date,
+            key=("risk-replay", account, tuple(risk_pcts), tuple(leverages), initial_capital, points, from_date, to_date)
+        )
+        
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "data": results,
+                "trades": trade_count,
+                "skipped_trades": skipped,
+                "count": len(results)
+            }
+        )
+    except PoolSaturated as e:
+        return busy_response(e)
+    except UnknownAccount as e:
+        return unknown_account_response(e)
+    except Exception as e:
+        return FastJSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "message": "Error replaying trades"
+            }
+        )
+
+
+@api_router.get("/monte-carlo")
+async def get_monte_carlo(
+    paths: int = MONTE_CARLO_DEFAULT_PATHS,
+    horizon: int = None,
+    method: str = "bootstrap",
+    ruin_pct: float = 50.0,
+    seed: int = 0,
+    from_date: str = None,
+    to_date: str = None,
+    account: str = None
+):
+    """
+    Estimate drawdown and ruin probability distributions by resampling the account's trades.
+    
+    Each path compounds the realized per-trade returns (net result over the
+    balance before the trade) in a random order: drawn with replacement
+    ('bootstrap') or as a permutation of the history ('shuffle'). The same
+    parameters and seed always give the same result.
+    
+    Args:
+        paths: Number of simulated sequences (1 to MONTE_CARLO_MAX_PATHS)
+        horizon: Trades per sequence for 'bootstrap' (default: number of historical trades)
+        method: 'bootstrap' or 'shuffle'
+        ruin_pct: Loss of starting equity, in percent, that counts as ruin
+        seed: Random seed
+        from_date: Start date of the trades resampled (format: 'YYYY.MM.DD')
+        to_date: End date of the trades resampled (format: 'YYYY.MM.DD')
+        account: Account id, 'all' for every account (default: MT4_EXPORT_FILE)
+        
+    Returns:
+        JSON with the ruin probability and max drawdown / final return percentiles
+    """
+    if not 1 <= paths <= MONTE_CARLO_MAX_PATHS or (horizon is not None and horizon < 1) or method not in monte_carlo.METHODS:
+        return FastJSONResponse(
+            status_code=400,
+            content={
+                "success": False,
+                "error": f"Invalid paths {paths}, horizon {horizon} or method '{method}'",
+                "message": f"paths must be between 1 and {MONTE_CARLO_MAX_PATHS}, horizon >= 1 and method one of {', '.join(monte_carlo.METHODS)}"
+            }
+        )
+    try:
+        params = (paths, horizon, method, ruin_pct, seed, from_date, to_date)
+        result, cached = await worker_pool.run_io(
+            _monte_carlo, account, params,
+            key=("monte-carlo", account, params)
+        )
+        
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "data": result,
+                "cached": cached
+            }
+        )
+    except ValueError as e:
+        return FastJSONResponse(
+            status_code=400,
+            content={
+                "success": False,
+                "error": str(e),
+                "message": "Invalid Monte Carlo request"
+            }
+        )
+    except PoolSaturated as e:
+        return busy_response(e)
+    except UnknownAccount as e:
+        return unknown_account_response(e)
+    except Exception as e:
+        return FastJSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "message": "Error running Monte Carlo simulation"
+            }
+        )
+
+
+@api_router.get("/stream")
+async def stream_updates(from_date: str = None, to_date: str = None, account: str = None):
+    """
+    Push ledger updates to a dashboard as server-sent events.
+    
+    Whenever a watched statement gets a new ledger version, an 'update'
+    event carries the refreshed summary for the requested date range and
+    only the trades that were added; when the change cannot be expressed
+    as an append the event has reload=true and the client re-fetches.
+    
+    Args:
+        from_date: Start date (format: 'YYYY.MM.DD')
+        to_date: End date (format: 'YYYY.MM.DD')
+        account: Account id, 'all' for every account (default: MT4_EXPORT_FILE)
+        
+    Returns:
+        text/event-stream response
+    """
+    try:
+        matches = _stream_paths(account)
+    except UnknownAccount as e:
+        return unknown_account_response(e)
+    
+    queue = ledger_events.subscribe()
+    
+    async def events():
+        try:
+            yield sse_message("ready", {"account": account})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if not matches(event.path):
+                    continue
+                try:
+                    update = await worker_pool.run_io(_ledger_update, event, account, from_date, to_date)
+                except PoolSaturated:
+                    update = {"account": account, "version": event.version, "reload": True}
+                yield sse_message("update", update)
+        finally:
+            ledger_events.unsubscribe(queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @api_router.get("/trades")
-async def get_trades(from_date: str = None, to_date: str = None):
+async def get_trades(
+    from_date: str = None,
+    to_date: str = None,
+    account: str = None,
+    fields: str = None,
+    sort: str = None,
+    limit: int = None,
+    offset: int = None,
+    cursor: str = None,
+    format: str = "json"
+):
     """
     Get all trades with optional date range filtering.
     
+    Without paging/projection parameters the full list is returned, as before.
+    
     Args:
         from_date: Start date (format: 'YYYY.MM.DD')
         to_date: End date (format: 'YYYY.MM.DD')
+        account: Account id, 'all' for every account (default: MT4_EXPORT_FILE)
+        fields: Comma-separated record keys to return (e.g. 'ticket,symbol,profit')
+        sort: Record key to sort by, prefixed with '-' for descending (e.g. '-profit')
+        limit: Page size (at most MAX_PAGE_SIZE)
+        offset: Number of rows to skip
+        cursor: next_cursor of a previous page (replaces offset)
+        format: 'json' or 'ndjson' (streamed, one trade per line)
         
     Returns:
         JSON array of trades for the specified period
     """
     try:
-        trade_data = parse_trade_data(str(MT4_EXPORT_FILE))
+        query = _parse_trade_query(fields, sort, limit, offset, cursor, format)
+    except ValueError as e:
+        return FastJSONResponse(
+            status_code=400,
+            content={
+                "success": False,
+                "error": str(e),
+                "message": "Invalid trades query"
+            }
+        )
+    
+    try:
+        path = None
+        if ledger_store is not None and account != ALL_ACCOUNTS:
+            path, rows = await worker_pool.run_io(_sql_statement, account, key=("sql-statement", account))
+        sql = path is not None
+        if not sql:
+            trade_data = await load_trade_data(account)
+            rows = len(trade_data)
         
-        if not trade_data:
-            return JSONResponse(
+        if not rows and query is None:
+            return FastJSONResponse(
                 status_code=200,
                 content={
                     "success": True,
@@ -103,23 +1126,74 @@ async def get_trades(from_date: str = None, to_date: str = None):
                 }
             )
         
-        # Filter by date range if provided
-        if from_date or to_date:
-            trade_data = filter_by_date_range(trade_data, from_date, to_date)
+        if query is None:
+            # Filter by date range and separate trades from balance transactions
+            if sql:
+                trades, _ = await worker_pool.run_io(ledger_store.trade_page, path, from_date, to_date)
+            else:
+                trades = await worker_pool.run_io(
+                    _trade_records, trade_data, from_date, to_date, key=("trades", account, from_date, to_date)
+                )
+            
+            return FastJSONResponse(
+                status_code=200,
+                content={
+                    "success": True,
+                    "data": trades,
+                    "count": len(trades)
+                }
+            )
         
-        # Separate trades from balance transactions
-        trades = [t for t in trade_data if t.get('type') in ['buy', 'sell']]
+        if sql:
+            # Filtered, sorted and paged in SQL; the page comes back as records
+            page, total = await worker_pool.run_io(
+                ledger_store.trade_page, path, from_date, to_date,
+                query["fields"], query["sort"], query["limit"], query["offset"]
+            )
+        else:
+            page, total = await worker_pool.run_io(_trade_page, trade_data, from_date, to_date, query)
+            unknown = [field for field in query["fields"] or [] if field not in _record_fields(page)]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        next_offset = query["offset"] + len(page)
+        next_cursor = encode_cursor(next_offset, query["sort"]) if next_offset < total else None
+        
+        if query["format"] == "ndjson":
+            headers = {"X-Total-Count": str(total)}
+            if next_cursor:
+                headers["X-Next-Cursor"] = next_cursor
+            if sql:
+                return ndjson_records_response(page, headers=headers)
+            return ndjson_response(page, query["fields"], headers=headers)
         
-        return JSONResponse(
+        trades = page if sql else await worker_pool.run_io(page.to_records, query["fields"])
+        return FastJSONResponse(
             status_code=200,
             content={
                 "success": True,
                 "data": trades,
-                "count": len(trades)
+                "count": len(trades),
+                "total": total,
+                "offset": query["offset"],
+                "limit": query["limit"],
+                "next_cursor": next_cursor
+            }
+        )
+    except ValueError as e:
+        return FastJSONResponse(
+            status_code=400,
+            content={
+                "success": False,
+                "error": str(e),
+                "message": "Invalid trades query"
             }
         )
+    except PoolSaturated as e:
+        return busy_response(e)
+    except UnknownAccount as e:
+        return unknown_account_response(e)
     except Exception as e:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "success": False,
@@ -129,23 +1203,189 @@ async def get_trades(from_date: str = None, to_date: str = None):
         )
 
 
+@api_router.get("/accounts")
+async def get_accounts():
+    """
+    List every account (statement file) found under the exports directory.
+    
+    Returns:
+        JSON array with account id, file name and row counts
+    """
+    try:
+        accounts = await worker_pool.run_io(registry.accounts, key="accounts")
+        
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "data": accounts,
+                "count": len(accounts)
+            }
+        )
+    except PoolSaturated as e:
+        return busy_response(e)
+    except Exception as e:
+        return FastJSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "message": "Error listing accounts"
+            }
+        )
+
+
+def _upload_target(account):
+    """
+    Statement path an upload replaces: MT4_EXPORT_FILE, an account's file, or a new one under EXPORTS_DIR.
+
+    Raises:
+        UploadError: If the account id is not valid
+    """
+    if account is None:
+        return MT4_EXPORT_FILE
+    validate_account(account, reserved=(ALL_ACCOUNTS,))
+    try:
+        return registry.path_for(account)
+    except UnknownAccount:
+        return EXPORTS_DIR / f"{account}.htm"
+
+
+def _upload_error_response(status_code, error):
+    return FastJSONResponse(
+        status_code=status_code,
+        content={
+            "success": False,
+            "error": str(error),
+            "message": "Statement upload rejected"
+        }
+    )
+
+
+@api_router.post("/statements")
+async def upload_statement(request: Request, account: str = None):
+    """
+    Upload an MT4 statement, as the raw request body or a multipart 'file' field.
+
+    The body is streamed to a temporary file and hashed chunk by chunk, so
+    memory use does not depend on its size. The statement is then parsed in
+    the background; poll the returned status URL for progress. Once parsed
+    it replaces the account's statement and ledger in one step, and readers
+    keep getting the previous ledger until then.
+
+    Args:
+        account: Account to replace or create (default: the main statement)
+
+    Returns:
+        202 with the upload job (id, state, progress) and its status URL
+    """
+    try:
+        target = _upload_target(account)
+        content_length = request.headers.get("content-length")
+        job = upload_manager.begin(account, target, int(content_length) if content_length and content_length.isdigit() else None)
+    except UploadInProgress as e:
+        return _upload_error_response(409, e)
+    except UploadError as e:
+        return _upload_error_response(400, e)
+
+    upload = None
+    try:
+        upload = await worker_pool.run_io(
+            StatementUpload, target, MAX_FILE_SIZE, request.headers.get("content-type"), ALLOWED_EXTENSIONS
+        )
+        async for chunk in request.stream():
+            if chunk:
+                await worker_pool.run_io(upload.feed, chunk)
+                job.received_bytes += len(chunk)
+        upload_manager.received(job, *await worker_pool.run_io(upload.finish))
+    except Exception as e:
+        if upload is not None:
+            upload.abort()
+        upload_manager.fail(job, e)
+        if isinstance(e, UploadTooLarge):
+            return _upload_error_response(413, e)
+        if isinstance(e, (UploadError, ClientDisconnect)):
+            return _upload_error_response(400, e)
+        if isinstance(e, PoolSaturated):
+            return busy_response(e)
+        return FastJSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "message": "Error receiving statement"
+            }
+        )
+
+    status_url = f"/api/statements/{job.id}"
+    return FastJSONResponse(
+        status_code=202,
+        headers={"Location": status_url},
+        content={
+            "success": True,
+            "data": {**job.to_dict(), "status_url": status_url},
+            "message": "Statement received, parsing in the background"
+        },
+        background=BackgroundTask(upload_manager.ingest, job)
+    )
+
+
+@api_router.get("/statements/{upload_id}")
+async def get_upload_status(upload_id: str):
+    """
+    State and progress of a statement upload.
+
+    Returns:
+        JSON with the upload job: state ('receiving', 'parsing', 'ready' or
+        'failed'), progress of the current stage, rows and ledger version once ready
+    """
+    job = upload_manager.get(upload_id)
+    if job is None:
+        return FastJSONResponse(
+            status_code=404,
+            content={
+                "success": False,
+                "error": f"Unknown upload {upload_id}",
+                "message": "No such statement upload"
+            }
+        )
+    return FastJSONResponse(
+        status_code=200,
+        headers={"Cache-Control": "no-store"},
+        content={
+            "success": True,
+            "data": job.to_dict()
+        }
+    )
+
+
 @api_router.get("/health")
 async def health_check():
     """
     Health check endpoint
     """
     try:
-        trade_data = parse_trade_data(str(MT4_EXPORT_FILE))
-        return JSONResponse(
+        trade_data = await load_trade_data()
+        return FastJSONResponse(
             status_code=200,
             content={
                 "success": True,
                 "status": "healthy",
-                "trades_count": len([t for t in trade_data if t.get('type') in ['buy', 'sell']]) if trade_data else 0
+                "trades_count": int(trade_data.trade_mask().sum()),
+                "cache": ledger_cache.stats(),
+                "charts": chart_cache.stats(),
+                "workers": worker_pool.stats(),
+                "stream": ledger_events.stats(),
+                "responses": response_cache.stats(),
+                "watcher": statement_watcher.stats(),
+                "uploads": upload_manager.stats(),
+                "ledger_store": await worker_pool.run_io(ledger_store.stats) if ledger_store is not None else None
             }
         )
+    except PoolSaturated as e:
+        return busy_response(e)
     except Exception as e:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=503,
             content={
                 "success": False,
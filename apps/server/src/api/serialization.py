@@ -0,0 +1,130 @@
+"""
+JSON encoding for API responses
+Uses orjson when it is installed and falls back to a compact json.dumps
+"""
+
+import base64
+import json
+import math
+import numpy as np
+from fastapi.responses import JSONResponse, StreamingResponse
+from services import metrics
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+NDJSON_CHUNK_ROWS = 2000
+
+
+def dumps(content):
+    """
+    Serialize to UTF-8 JSON bytes.
+
+    Both encoders give the same output: numpy scalars and arrays become plain
+    JSON values and non-finite floats become null.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(_plain(content), ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+def _plain(value):
+    """Convert numpy values to Python ones and NaN/Infinity to None, like orjson."""
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, (np.generic, np.ndarray)):
+        return _plain(value.tolist())
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with dumps() (orjson when available).
+    """
+
+    def render(self, content):
+        with metrics.span('serialize'):
+            return dumps(content)
+
+
+def ndjson_response(ledger, fields=None, chunk_rows=NDJSON_CHUNK_ROWS, headers=None):
+    """
+    Stream a ledger as newline-delimited JSON, one record per line.
+
+    Rows are converted and encoded chunk by chunk while the response is
+    sent, so memory stays bounded by chunk_rows whatever the ledger size.
+
+    Args:
+        ledger: TradeLedger to stream (already filtered, sorted and paged)
+        fields: Optional list of record keys to project to
+        chunk_rows: Rows converted per chunk
+        headers: Optional extra response headers
+
+    Returns:
+        StreamingResponse with media type application/x-ndjson
+    """
+    def chunk(start):
+        return ledger.take(slice(start, start + chunk_rows)).to_records(fields)
+
+    return _ndjson_stream(len(ledger), chunk_rows, chunk, headers)
+
+
+def ndjson_records_response(records, chunk_rows=NDJSON_CHUNK_ROWS, headers=None):
+    """
+    Stream already built record dictionaries as newline-delimited JSON (see ndjson_response).
+    """
+    return _ndjson_stream(len(records), chunk_rows, lambda start: records[start:start + chunk_rows], headers)
+
+
+def _ndjson_stream(count, chunk_rows, chunk, headers):
+    def generate():
+        for start in range(0, count, chunk_rows):
+            with metrics.span('serialize') as span:
+                records = chunk(start)
+                encoded = b''.join(dumps(record) + b'\n' for record in records)
+                span['rows'] = len(records)
+            yield encoded
+
+    return StreamingResponse(generate(), media_type='application/x-ndjson', headers=headers)
+
+
+def sse_message(event, data):
+    """
+    One server-sent event frame with a JSON payload.
+    """
+    return b'event: ' + event.encode('utf-8') + b'\ndata: ' + dumps(data) + b'\n\n'
+
+
+def encode_cursor(offset, sort=None):
+    """
+    Opaque pagination cursor for the next page.
+    """
+    token = json.dumps({'offset': offset, 'sort': sort}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(token).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Returns:
+        Tuple (offset, sort)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        token = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        offset = int(token['offset'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return offset, token.get('sort')
@@ -15,6 +15,16 @@ EXPORTS_DIR = BASE_DIR / "data"
 # MT4 export file path
 MT4_EXPORT_FILE = EXPORTS_DIR / "trade_data.htm"
 
+# Memory-mapped ledger snapshots (shared by all workers, keyed by statement hash)
+SNAPSHOTS_DIR = BASE_DIR / "snapshots"
+SNAPSHOTS_ENABLED = os.environ.get("SNAPSHOTS_ENABLED", "1") == "1"
+
+# Backend serving /api/summary and /api/trades for single accounts: "memory"
+# (columnar ledger, default) or "sqlite" (indexed copy in LEDGER_DB_PATH,
+# queried with pushed-down SQL)
+LEDGER_BACKEND = os.environ.get("LEDGER_BACKEND", "memory")
+LEDGER_DB_PATH = Path(os.environ.get("LEDGER_DB_PATH", BASE_DIR / "ledger.db"))
+
 # Templates directory
 TEMPLATES_DIR = BASE_DIR / "src" / "templates"
 
@@ -39,10 +49,75 @@ DEBUG = False
 HOST = "127.0.0.1"
 PORT = 8000
 
+# Worker pool settings (parsing/analytics run off the event loop)
+IO_WORKERS = int(os.environ.get("IO_WORKERS", 8))
+CPU_WORKERS = int(os.environ.get("CPU_WORKERS", 0)) or None  # None: cpu_count - 1
+MAX_PENDING_JOBS = int(os.environ.get("MAX_PENDING_JOBS", 64))  # beyond this, /api answers 429
+
+# Import pandas/plotly/matplotlib and parse MT4_EXPORT_FILE in the background after startup
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "0") == "1"
+
+# /api/trades paging
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 10000
+
+# /api/equity downsampling (LTTB point budget)
+EQUITY_DEFAULT_POINTS = 1000
+EQUITY_MAX_POINTS = 10000
+
+# /api/position-size batch limit (scenarios per request)
+MAX_POSITION_SCENARIOS = 100000
+
+# /api/risk-replay limits (risk % x leverage combinations, curve points per rule)
+MAX_REPLAY_RULES = 400
+REPLAY_DEFAULT_POINTS = 500
+
+# /api/monte-carlo limits and result cache
+MONTE_CARLO_DEFAULT_PATHS = 10000
+MONTE_CARLO_MAX_PATHS = 1000000
+MONTE_CARLO_MAX_STEPS = 200000000  # paths x trades per path
+MONTE_CARLO_CACHE_SIZE = int(os.environ.get("MONTE_CARLO_CACHE_SIZE", 32))  # simulation results kept (LRU)
+
+# Live updates: statement files are polled every WATCH_INTERVAL seconds (0 disables the watcher)
+WATCH_INTERVAL = float(os.environ.get("WATCH_INTERVAL", 2))
+STREAM_KEEPALIVE = 15  # seconds between keep-alive comments on /api/stream
+STREAM_QUEUE_SIZE = 64  # undelivered events kept per dashboard
+
+# HTTP caching. Validated paths get an ETag (ledger version + query) and
+# Last-Modified, and conditional GETs are answered with 304 before the route
+# runs. no-cache lets browsers keep responses but revalidate each time.
+# /api/charts is left out: it answers with the URL of a spec file that the
+# chart cache deletes on eviction, which the ledger version cannot vouch for.
+VALIDATED_PATHS = (
+    "/api/summary", "/api/symbols", "/api/equity", "/api/trades",
+    "/api/risk-replay", "/api/monte-carlo", "/api/accounts"
+)
+RESPONSE_CACHE_PATHS = ("/api/summary", "/api/symbols")  # hottest ranges kept as encoded bodies
+RESPONSE_CACHE_BYTES = int(os.environ.get("RESPONSE_CACHE_BYTES", 16 * 1024 * 1024))
+RESPONSE_CACHE_ENTRIES = 256
+CACHE_CONTROL = {
+    "/api": "private, no-cache",
+    "/api/health": "no-store",
+    "/static": "public, max-age=3600",
+    "/static/charts": "public, max-age=31536000, immutable",  # content-hashed file names
+}
+COMPRESSION_MIN_SIZE = 1024  # bytes; smaller responses are sent as is
+COMPRESSION_LEVEL = 6
+
+# Instrumentation: Prometheus metrics at /metrics. With PROFILING_ENABLED a
+# request carrying ?profile=1 (or an X-Profile: 1 header) is run under the
+# sampling profiler and answered with the profile instead of its response.
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+PROFILE_INTERVAL = 0.005  # seconds between stack samples
+PROFILE_TIMEOUT = 30  # seconds; longer profiled requests (and event streams) are cancelled
+
 # Chart settings
+CHART_CACHE_SIZE = int(os.environ.get("CHART_CACHE_SIZE", 64))  # rendered chart specs kept (LRU)
+CHART_PRERENDER = os.environ.get("CHART_PRERENDER", "1") == "1"  # render standard charts after each ingest
 CHART_WIDTH = 1200
 CHART_HEIGHT = 400
 
-# File upload settings (for future file upload functionality)
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+# Statement uploads (POST /api/statements): streamed to disk, so the limit only guards disk space
+MAX_FILE_SIZE = int(os.environ.get("MAX_FILE_SIZE", 512 * 1024 * 1024))  # bytes
+UPLOAD_HISTORY = 32  # finished upload jobs kept for status queries
 ALLOWED_EXTENSIONS = {'.htm', '.html'}
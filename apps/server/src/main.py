@@ -1,32 +1,21 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
-from api.routes import router, api_router
-from config import TEMPLATES_DIR, STATIC_DIR
-import os
+"""
+Entry point for the FastAPI application
 
-app = FastAPI(title="Trading Tools API", version="0.1.0")
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+The app is built in api.application. Worker processes of the spawn process
+pool re-import this module as __mp_main__, so it must not build the app (and
+with it the registry, caches, watcher and gauges of api.routes) on import;
+`app` is only resolved on first access, e.g. by `uvicorn main:app`.
+"""
 
-# Mount static files
-static_dir = str(STATIC_DIR)
-if os.path.exists(static_dir):
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
-# Include routers
-app.include_router(router)
-app.include_router(api_router)
+def __getattr__(name):
+    if name == "app":
+        from api.application import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-@app.get("/", response_class=HTMLResponse)
-async def read_root(request: Request):
-    return templates.TemplateResponse("dashboard.html", {"request": request})
-
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {"status": "ok", "service": "trading-tools-api"}
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
+    from api.application import app
+    uvicorn.run(app, host="127.0.0.1", port=8000)
@@ -0,0 +1,253 @@
+"""
+Chart rendering cache
+Plotly figure specs rendered once per ledger version and served as
+content-hashed static JSON files against a shared plotly.js asset
+"""
+
+import hashlib
+import importlib.util
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from services.equity import EquityCurve
+from services.rollups import GRANULARITIES
+
+CHART_TYPES = ('profit', 'equity', 'symbols')
+
+# Chart types drawn per period; the others ignore the period
+PERIOD_CHARTS = ('profit',)
+
+EQUITY_CHART_POINTS = 2000
+
+
+def ensure_plotly_asset(js_dir):
+    """
+    Copy plotly.min.js from the installed plotly package into js_dir once.
+
+    Every chart spec is drawn with this one cached file instead of each
+    response embedding its own copy of the ~4.8 MB bundle.
+
+    Returns:
+        Path of the asset, or None if plotly is not installed
+    """
+    target = Path(js_dir) / 'plotly.min.js'
+    if target.exists():
+        return target
+    spec = importlib.util.find_spec('plotly')
+    if spec is None or spec.origin is None:
+        return None
+    source = Path(spec.origin).parent / 'package_data' / 'plotly.min.js'
+    if not source.exists():
+        return None
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staging = target.with_name(f".{target.name}.{os.getpid()}")
+    shutil.copyfile(source, staging)
+    os.replace(staging, target)
+    return target
+
+
+def build_figure(ledger, chart_type, period='monthly', from_date=None, to_date=None):
+    """
+    Build a Plotly figure for a ledger.
+
+    Args:
+        ledger: TradeLedger with rollups attached
+        chart_type: 'profit' (PnL per period), 'equity' (balance and drawdown) or 'symbols' (net PnL per symbol)
+        period: Granularity of the profit chart
+        from_date: Start date (format: 'YYYY.MM.DD')
+        to_date: End date (format: 'YYYY.MM.DD')
+
+    Returns:
+        plotly.graph_objects.Figure
+    """
+    # Imported on first use. plotly only peeks at sys.modules for pandas, so
+    # pandas is imported first: that waits for a concurrent import (e.g. the
+    # background warm-up) to finish instead of seeing a half-initialized module
+    import pandas  # noqa: F401
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    if chart_type == 'profit':
+        periods = ledger.rollups.rollup(period, from_date, to_date)
+        labels = [row['period'] for row in periods]
+        pnl = [row['pnl'] for row in periods]
+        fig.add_trace(go.Bar(
+            x=labels,
+            y=pnl,
+            name='PnL',
+            marker_color=['#2e7d32' if value >= 0 else '#c62828' for value in pnl]
+        ))
+        fig.add_trace(go.Scatter(x=labels, y=[row['fees'] for row in periods], mode='lines', name='Fees'))
+        fig.update_layout(title=f'{period.capitalize()} Profit Chart', xaxis_title='Period', yaxis_title='Profit')
+    elif chart_type == 'equity':
+        points = EquityCurve.from_ledger(ledger).points(EQUITY_CHART_POINTS, from_date, to_date)
+        times = [point['time'] for point in points]
+        fig.add_trace(go.Scatter(x=times, y=[point['balance'] for point in points], mode='lines', name='Balance'))
+        fig.add_trace(go.Scatter(
+            x=times,
+            y=[-point['drawdown'] for point in points],
+            mode='lines',
+            name='Drawdown',
+            fill='tozeroy',
+            yaxis='y2'
+        ))
+        fig.update_layout(
+            title='Equity Curve',
+            xaxis_title='Time',
+            yaxis_title='Balance',
+            yaxis2={'title': 'Drawdown', 'overlaying': 'y', 'side': 'right'}
+        )
+    elif chart_type == 'symbols':
+        symbols = ledger.rollups.symbols.breakdown(from_date, to_date)
+        fig.add_trace(go.Bar(
+            x=[row['symbol'] for row in symbols],
+            y=[row['net_pnl'] for row in symbols],
+            name='Net PnL'
+        ))
+        fig.update_layout(title='Net PnL by Symbol', xaxis_title='Symbol', yaxis_title='Net PnL')
+    else:
+        raise ValueError(f"Unknown chart type '{chart_type}', expected one of {CHART_TYPES}")
+    fig.update_layout(hovermode='x unified')
+    return fig
+
+
+class ChartCache:
+    """
+    LRU cache of rendered chart specs keyed on (ledger version, period, chart type, date range).
+
+    A spec is written once to charts_dir under a name derived from the hash
+    of its content, so the URL of a chart changes exactly when the chart
+    does and browsers can cache it forever. Files are written to a
+    temporary name and renamed into place, so concurrent renders of the same
+    chart never expose a partial file. Evicted entries delete their file.
+    """
+
+    def __init__(self, charts_dir, url_prefix='/static/charts', max_entries=64):
+        self.charts_dir = Path(charts_dir)
+        self.url_prefix = url_prefix.rstrip('/')
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._background = None
+        self.hits = 0
+        self.misses = 0
+        self.prerendered = 0
+        self.evictions = 0
+
+    @staticmethod
+    def cache_key(version, chart_type, period, from_date=None, to_date=None):
+        if chart_type not in PERIOD_CHARTS:
+            period = None
+        return (version, period, chart_type, from_date, to_date)
+
+    def get(self, ledger, version, chart_type, period='monthly', from_date=None, to_date=None):
+        """
+        URL of a rendered chart, rendering it on a miss.
+
+        Args:
+            ledger: TradeLedger with rollups attached
+            version: Version token of the ledger (changes whenever the ledger does)
+            chart_type: One of CHART_TYPES
+            period: One of GRANULARITIES (used by period charts)
+            from_date: Start date (format: 'YYYY.MM.DD')
+            to_date: End date (format: 'YYYY.MM.DD')
+
+        Returns:
+            URL path of the chart's JSON spec
+        """
+        if chart_type not in CHART_TYPES:
+            raise ValueError(f"Unknown chart type '{chart_type}', expected one of {CHART_TYPES}")
+        key = self.cache_key(version, chart_type, period, from_date, to_date)
+        with self._lock:
+            filename = self._entries.get(key)
+            if filename is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return f"{self.url_prefix}/{filename}"
+            self.misses += 1
+
+        filename = self._render(ledger, chart_type, period, from_date, to_date)
+        self._store(key, filename)
+        return f"{self.url_prefix}/{filename}"
+
+    def _render(self, ledger, chart_type, period, from_date, to_date):
+        spec = build_figure(ledger, chart_type, period, from_date, to_date).to_json().encode('utf-8')
+        digest = hashlib.sha256(spec).hexdigest()[:16]
+        filename = f"{chart_type}-{digest}.json"
+        target = self.charts_dir / filename
+        if not target.exists():
+            self.charts_dir.mkdir(parents=True, exist_ok=True)
+            descriptor, staging = tempfile.mkstemp(prefix=f".{filename}.", dir=self.charts_dir)
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(spec)
+            os.replace(staging, target)
+        return filename
+
+    def _store(self, key, filename):
+        evicted = []
+        with self._lock:
+            self._entries[key] = filename
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                _, old = self._entries.popitem(last=False)
+                evicted.append(old)
+                self.evictions += 1
+            in_use = set(self._entries.values())
+        for old in evicted:
+            if old not in in_use:
+                try:
+                    (self.charts_dir / old).unlink()
+                except OSError:
+                    pass
+
+    def prerender(self, ledger, version, periods=GRANULARITIES, chart_types=CHART_TYPES):
+        """
+        Render the standard charts of a new ledger version in a background thread.
+
+        Args:
+            ledger: TradeLedger with rollups attached
+            version: Version token of the ledger
+            periods: Periods to render period charts for
+            chart_types: Chart types to render
+        """
+        with self._lock:
+            if self._background is None:
+                self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chart-prerender')
+            background = self._background
+        background.submit(self._prerender, ledger, version, periods, chart_types)
+
+    def _prerender(self, ledger, version, periods, chart_types):
+        jobs = {self.cache_key(version, chart_type, period): (chart_type, period)
+                for chart_type in chart_types for period in periods}
+        for key, (chart_type, period) in jobs.items():
+            with self._lock:
+                if key in self._entries:
+                    continue
+            try:
+                self._store(key, self._render(ledger, chart_type, period, None, None))
+                with self._lock:
+                    self.prerendered += 1
+            except Exception as e:
+                print(f"Error pre-rendering {chart_type} chart: {e}")
+
+    def stats(self):
+        """Hit/miss/eviction counters and the number of cached charts."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'prerendered': self.prerendered,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+            }
+
+    def shutdown(self):
+        """Stop the pre-render thread (called on application shutdown)."""
+        with self._lock:
+            background, self._background = self._background, None
+        if background is not None:
+            background.shutdown(wait=False, cancel_futures=True)
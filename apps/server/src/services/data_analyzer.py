@@ -1,19 +1,27 @@
+from __future__ import annotations
 from datetime import datetime, timedelta
-from typing import List, Dict
-import pandas as pd
+from typing import List, Dict, Union, TYPE_CHECKING
+import numpy as np
+from services import metrics
+from services.ledger import TradeLedger, NO_TIME
+from services.rollups import GRANULARITIES, SECONDS_PER_DAY, period_keys, period_labels
 
-def analyze_trade_data(trade_data: List[Dict], period: str = "monthly") -> Dict:
+# pandas is only needed by the DataFrame helpers below and is imported there
+if TYPE_CHECKING:
+    import pandas as pd
+
+def analyze_trade_data(trade_data: Union[TradeLedger, List[Dict]], period: str = "monthly") -> Dict:
     """
     Analyze trade data for a specified period.
     
     Args:
-        trade_data: List of trade dictionaries
+        trade_data: TradeLedger or list of trade dictionaries
         period: Time period for analysis ('yearly', 'monthly', 'weekly', 'daily')
         
     Returns:
         Dictionary with analysis results
     """
-    if not trade_data:
+    if trade_data is None or not len(trade_data):
         return {
             'total_profit': 0,
             'total_volume': 0,
@@ -22,44 +30,13 @@ def analyze_trade_data(trade_data: List[Dict], period: str = "monthly") -> Dict:
         }
     
     try:
-        df = pd.DataFrame(trade_data)
-        
-        # Parse date columns
-        date_column = 'open_time'
-        if date_column in df.columns:
-            df['date'] = pd.to_datetime(df[date_column], errors='coerce')
-        else:
-            df['date'] = pd.to_datetime(datetime.now())
-        
-        # Group by period
-        if period == 'yearly':
-            grouped = df.groupby(df['date'].dt.to_period('Y'))
-        elif period == 'monthly':
-            grouped = df.groupby(df['date'].dt.to_period('M'))
-        elif period == 'weekly':
-            grouped = df.groupby(df['date'].dt.to_period('W'))
-        elif period == 'daily':
-            grouped = df.groupby(df['date'].dt.to_period('D'))
-        else:
-            grouped = df.groupby(df['date'].dt.to_period('M'))
-        
-        results = []
-        for period_key, group in grouped:
-            result = {
-                'period': str(period_key),
-                'profit': group['profit'].sum() if 'profit' in group.columns else 0,
-                'volume': group['size'].sum() if 'size' in group.columns else 0,
-                'trades': len(group),
-                'wins': len(group[group['profit'] > 0]) if 'profit' in group.columns else 0,
-                'losses': len(group[group['profit'] < 0]) if 'profit' in group.columns else 0,
-            }
-            results.append(result)
-        
+        ledger = _as_ledger(trade_data)
+        granularity = period if period in GRANULARITIES else 'monthly'
         return {
-            'total_profit': df['profit'].sum() if 'profit' in df.columns else 0,
-            'total_volume': df['size'].sum() if 'size' in df.columns else 0,
-            'total_trades': len(df),
-            'results': results,
+            'total_profit': float(ledger['profit'].sum()),
+            'total_volume': float(ledger['size'].sum()),
+            'total_trades': len(ledger),
+            'results': analyze_periods(ledger, (granularity,))[granularity],
             'period': period
         }
     except Exception as e:
@@ -72,26 +49,155 @@ def analyze_trade_data(trade_data: List[Dict], period: str = "monthly") -> Dict:
             'error': str(e)
         }
 
+@metrics.timed('analyze')
+def analyze_periods(trade_data: Union[TradeLedger, List[Dict]], periods=GRANULARITIES) -> Dict:
+    """
+    Per-period statistics for several granularities in one pass.
+    
+    Only rows with an open time (i.e. not balance transactions) are counted.
+    The ledger is time-sorted, so every period is a contiguous run of rows.
+    Rows are reduced to days once (np.add.reduceat over day boundaries);
+    weeks, months and years are then reduced from the daily aggregates, so
+    no metric is computed with a Python loop over groups or rows.
+    
+    Args:
+        trade_data: TradeLedger or list of trade dictionaries
+        periods: Granularities to compute ('daily', 'weekly', 'monthly', 'yearly')
+        
+    Returns:
+        Dictionary {granularity: list of per-period dictionaries in time order}
+    """
+    ledger = _as_ledger(trade_data)
+    # NO_TIME sorts first; those rows have no period
+    first_timed = int(np.searchsorted(ledger['time'], NO_TIME, side='right'))
+    times = ledger['time'][first_timed:]
+    if not len(times):
+        return {granularity: [] for granularity in periods}
+    
+    rows = ~ledger.balance_mask()[first_timed:]
+    profit = np.where(rows, ledger['profit'][first_timed:], 0.0)
+    fees = np.where(rows, ledger['commission'][first_timed:] + ledger['taxes'][first_timed:], 0.0)
+    swap = np.where(rows, ledger['swap'][first_timed:], 0.0)
+    net = profit + fees + swap
+    gross_profit = np.maximum(net, 0.0)
+    columns = {
+        'profit': profit,
+        'volume': np.where(rows, ledger['size'][first_timed:], 0.0),
+        'fees': fees,
+        'swap': swap,
+        'net_pnl': net,
+        'gross_profit': gross_profit,
+        'gross_loss': gross_profit - net,
+    }
+    counts = {'trades': rows, 'wins': profit > 0, 'losses': profit < 0}
+    
+    # Daily aggregates, including each day's equity extremes and internal drawdown
+    days = times // SECONDS_PER_DAY
+    day_starts = np.concatenate(([0], np.flatnonzero(np.diff(days)) + 1))
+    daily = {name: np.add.reduceat(values, day_starts) for name, values in columns.items()}
+    for name, mask in counts.items():
+        daily[name] = np.add.reduceat(mask.view(np.int8), day_starts, dtype=np.int64)
+    equity = np.cumsum(net)
+    opening = np.concatenate(([0.0], equity[day_starts[1:] - 1]))
+    high = np.maximum(np.maximum.reduceat(equity, day_starts), opening)
+    low = np.minimum.reduceat(equity, day_starts)
+    peaks = np.maximum(_segment_running_max(equity, day_starts), _expand(opening, day_starts, len(equity)))
+    day_drawdown = np.maximum.reduceat(peaks - equity, day_starts)
+    
+    results = {}
+    for granularity in periods:
+        keys = period_keys(days[day_starts] * SECONDS_PER_DAY, granularity)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+        totals = {name: np.add.reduceat(values, starts) for name, values in daily.items()}
+        
+        # Highest equity reached before each day within its period (or the period's opening equity)
+        running_high = _segment_running_max(high, starts)
+        prior_high = np.concatenate(([-np.inf], running_high[:-1]))
+        prior_high[starts] = -np.inf
+        prior_high = np.maximum(prior_high, _expand(opening[starts], starts, len(high)))
+        drawdowns = np.maximum.reduceat(np.maximum(day_drawdown, prior_high - low), starts)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            factors = totals['gross_profit'] / totals['gross_loss']
+        
+        # Periods holding only balance transactions are not reported
+        keep = totals['trades'] > 0
+        results[granularity] = [
+            {
+                'period': label,
+                'profit': profit_total,
+                'volume': volume,
+                'trades': trades,
+                'wins': wins,
+                'losses': losses,
+                'fees': fee_total,
+                'swap': swap_total,
+                'net_pnl': net_total,
+                'max_drawdown': drawdown,
+                'profit_factor': factor if factor == factor and factor != float('inf') else None,
+            }
+            for label, profit_total, volume, trades, wins, losses, fee_total, swap_total, net_total, drawdown, factor in zip(
+                period_labels(keys[starts][keep], granularity),
+                totals['profit'][keep].tolist(),
+                totals['volume'][keep].tolist(),
+                totals['trades'][keep].tolist(),
+                totals['wins'][keep].tolist(),
+                totals['losses'][keep].tolist(),
+                np.round(totals['fees'][keep], 2).tolist(),
+                np.round(totals['swap'][keep], 2).tolist(),
+                np.round(totals['net_pnl'][keep], 2).tolist(),
+                np.round(drawdowns[keep], 2).tolist(),
+                np.round(factors[keep], 2).tolist(),
+            )
+        ]
+    return results
+
+def _as_ledger(trade_data: Union[TradeLedger, List[Dict]]) -> TradeLedger:
+    if isinstance(trade_data, TradeLedger):
+        return trade_data
+    return TradeLedger.from_records(trade_data)
+
+def _expand(values: np.ndarray, starts: np.ndarray, length: int) -> np.ndarray:
+    """Repeat one value per segment over the segment's rows."""
+    return np.repeat(values, np.diff(np.append(starts, length)))
+
+def _segment_running_max(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Running maximum that restarts at every segment start.
+    
+    Each segment is lifted above all earlier ones by a constant offset so a
+    single np.maximum.accumulate never carries a maximum across a boundary.
+    """
+    segment = _expand(np.arange(len(starts), dtype=np.float64), starts, len(values))
+    offset = float(values.max() - values.min()) + 1.0
+    return np.maximum.accumulate(values + segment * offset) - segment * offset
+
 def analyze_yearly(df: pd.DataFrame) -> Dict:
     """Analyze data by year."""
-    df['date'] = pd.to_datetime(df['date'])
+    _ensure_datetime(df)
     return df.groupby(df['date'].dt.to_period('Y')).sum().to_dict(orient='records')
 
 def analyze_monthly(df: pd.DataFrame) -> Dict:
     """Analyze data by month."""
-    df['date'] = pd.to_datetime(df['date'])
+    _ensure_datetime(df)
     return df.groupby(df['date'].dt.to_period('M')).sum().to_dict(orient='records')
 
 def analyze_weekly(df: pd.DataFrame) -> Dict:
     """Analyze data by week."""
-    df['date'] = pd.to_datetime(df['date'])
+    _ensure_datetime(df)
     return df.groupby(df['date'].dt.to_period('W')).sum().to_dict(orient='records')
 
 def analyze_daily(df: pd.DataFrame) -> Dict:
     """Analyze data by day."""
-    df['date'] = pd.to_datetime(df['date'])
+    _ensure_datetime(df)
     return df.groupby(df['date'].dt.to_period('D')).sum().to_dict(orient='records')
 
+def _ensure_datetime(df: pd.DataFrame) -> None:
+    """Parse the 'date' column unless it already holds datetimes."""
+    import pandas as pd
+
+    if not pd.api.types.is_datetime64_any_dtype(df['date']):
+        df['date'] = pd.to_datetime(df['date'])
+
 def get_last_n_months_data(trade_data: List[Dict], months: int) -> List[Dict]:
     """
     Filter trade data to only include the last N months.
@@ -103,6 +209,8 @@ def get_last_n_months_data(trade_data: List[Dict], months: int) -> List[Dict]:
     Returns:
         Filtered list of trades
     """
+    import pandas as pd
+
     cutoff_date = datetime.now() - timedelta(days=months * 30)
     return [trade for trade in trade_data 
             if pd.to_datetime(trade.get('open_time', datetime.now()), errors='coerce') >= cutoff_date]
\ No newline at end of file
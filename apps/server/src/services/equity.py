@@ -0,0 +1,206 @@
+"""
+Equity curve and drawdown engine
+Account balance over time from balance transactions and closed trades,
+with running peak, drawdown and underwater duration
+"""
+
+import numpy as np
+from services.ledger import NO_TIME, format_mt4_times, _bound_to_epoch
+
+SECONDS_PER_DAY = 86400
+
+
+class EquityCurve:
+    """
+    Balance after every cash event of a ledger, in event-time order.
+
+    Deposits, withdrawals and fees (balance rows) take effect at their
+    time; a trade's profit, commission, taxes and swap take effect when it
+    closes. Trades that are still open are not part of the curve. Running
+    balance, peak, drawdown and time under water are each one vectorized
+    pass (cumsum / maximum.accumulate) over the merged events.
+    """
+
+    def __init__(self, times, changes):
+        self.times = times
+        self.changes = changes
+        self.balance = np.cumsum(changes)
+        self.peak = np.maximum.accumulate(self.balance)
+        self.drawdown = self.peak - self.balance
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.drawdown_pct = np.where(self.peak > 0, self.drawdown / self.peak * 100, 0.0)
+
+        # Time since the balance last stood at its peak
+        at_peak = self.drawdown <= 0
+        last_peak = np.maximum.accumulate(np.where(at_peak, np.arange(len(changes)), 0))
+        self.underwater = times - times[last_peak]
+
+    @classmethod
+    def from_ledger(cls, ledger):
+        """
+        Build the curve of a TradeLedger.
+
+        Args:
+            ledger: TradeLedger (any order; events are re-sorted by their effective time)
+
+        Returns:
+            EquityCurve
+        """
+        balances = ledger.balance_mask()
+        trades = ledger.trade_mask()
+        times = np.where(balances, ledger['time'], ledger['close_time'])
+        changes = np.where(
+            balances,
+            ledger['amount'],
+            ledger['profit'] + ledger['commission'] + ledger['taxes'] + ledger['swap']
+        )
+        events = (balances | trades) & (times != NO_TIME)
+        times = times[events]
+        changes = changes[events]
+        order = np.argsort(times, kind='stable')
+        return cls(times[order], changes[order])
+
+    def __len__(self):
+        return len(self.times)
+
+    def range_slice(self, from_date=None, to_date=None):
+        """
+        Event index range within a date range (balances still include earlier events).
+
+        Returns:
+            slice
+        """
+        lo = 0 if from_date is None else int(np.searchsorted(self.times, _bound_to_epoch(from_date), side='left'))
+        hi = len(self) if to_date is None else int(
+            np.searchsorted(self.times, _bound_to_epoch(to_date, end_of_day=True), side='right')
+        )
+        return slice(lo, max(lo, hi))
+
+    def summary(self, selected=None):
+        """
+        Headline drawdown statistics for an event range.
+
+        Args:
+            selected: Optional slice from range_slice (default: every event)
+
+        Returns:
+            Dictionary of rounded statistics
+        """
+        selected = selected or slice(0, len(self))
+        balance = self.balance[selected]
+        if not len(balance):
+            return {
+                'events': 0,
+                'final_balance': 0,
+                'peak_balance': 0,
+                'max_drawdown': 0,
+                'max_drawdown_pct': 0,
+                'max_drawdown_time': None,
+                'longest_underwater_days': 0,
+            }
+        drawdown = self.drawdown[selected]
+        worst = int(np.argmax(drawdown))
+        return {
+            'events': len(balance),
+            'final_balance': round(float(balance[-1]), 2),
+            'peak_balance': round(float(self.peak[selected].max()), 2),
+            'max_drawdown': round(float(drawdown[worst]), 2),
+            'max_drawdown_pct': round(float(self.drawdown_pct[selected].max()), 2),
+            'max_drawdown_time': format_mt4_times(self.times[selected][worst:worst + 1])[0],
+            'longest_underwater_days': round(float(self.underwater[selected].max()) / SECONDS_PER_DAY, 2),
+        }
+
+    def to_records(self, indices):
+        """
+        Point dictionaries for the given event indices.
+
+        Returns:
+            List of dictionaries with time, balance, peak, drawdown, drawdown_pct and underwater_days
+        """
+        return [
+            {
+                'time': time,
+                'balance': balance,
+                'peak': peak,
+                'drawdown': drawdown,
+                'drawdown_pct': drawdown_pct,
+                'underwater_days': underwater,
+            }
+            for time, balance, peak, drawdown, drawdown_pct, underwater in zip(
+                format_mt4_times(self.times[indices]),
+                np.round(self.balance[indices], 2).tolist(),
+                np.round(self.peak[indices], 2).tolist(),
+                np.round(self.drawdown[indices], 2).tolist(),
+                np.round(self.drawdown_pct[indices], 2).tolist(),
+                np.round(self.underwater[indices] / SECONDS_PER_DAY, 2).tolist(),
+            )
+        ]
+
+    def points(self, max_points=None, from_date=None, to_date=None):
+        """
+        Curve points for a date range, downsampled to at most max_points.
+
+        Args:
+            max_points: Point budget (None or >= the number of events keeps every event)
+            from_date: Start date (format: 'YYYY.MM.DD')
+            to_date: End date (format: 'YYYY.MM.DD')
+
+        Returns:
+            List of point dictionaries (see to_records)
+        """
+        selected = self.range_slice(from_date, to_date)
+        indices = np.arange(selected.start, selected.stop)
+        if max_points is not None and len(indices) > max_points:
+            indices = indices[lttb_indices(self.times[indices], self.balance[indices], max_points)]
+        return self.to_records(indices)
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last point and, from each of threshold - 2 equal
+    buckets in between, the point forming the largest triangle with the
+    previously kept point and the average of the next bucket, which
+    preserves peaks and troughs far better than striding.
+
+    Args:
+        x: Ascending x values (e.g. epoch seconds)
+        y: y values
+        threshold: Number of points to keep (>= 3)
+
+    Returns:
+        int64 array of kept indices, ascending
+
+    Raises:
+        ValueError: If threshold is below 3
+    """
+    if threshold < 3:
+        raise ValueError("LTTB needs a threshold of at least 3 points")
+    count = len(x)
+    if threshold >= count:
+        return np.arange(count)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket boundaries over the interior points 1 .. count-2
+    edges = np.floor(np.linspace(1, count - 1, threshold - 1)).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = count - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_x = x[stop:edges[bucket + 2]].mean()
+            next_y = y[stop:edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return kept
@@ -0,0 +1,162 @@
+"""
+Worker pools for blocking work
+Keeps file I/O, parsing and analytics off the asyncio event loop
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+class PoolSaturated(Exception):
+    """Raised when a pool already has its maximum number of pending jobs."""
+
+
+class WorkerPool:
+    """
+    Thread pool for I/O-bound work plus a process pool for CPU-bound work.
+
+    Both pools are created lazily on first use. Jobs submitted from the event
+    loop with the same key while one is still running share its result
+    instead of queueing a duplicate (request coalescing). At most
+    max_pending jobs may be queued or running; beyond that submissions fail
+    fast with PoolSaturated so the API can answer 429 instead of letting
+    latency grow without bound.
+    """
+
+    def __init__(self, io_workers=8, cpu_workers=None, max_pending=64):
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.max_pending = max_pending
+        self._io_pool = None
+        self._cpu_pool = None
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.pending = 0
+        self.completed = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    # ---------- pools ----------
+
+    @property
+    def io_pool(self):
+        with self._lock:
+            if self._io_pool is None:
+                self._io_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix='io-worker')
+            return self._io_pool
+
+    @property
+    def cpu_pool(self):
+        with self._lock:
+            if self._cpu_pool is None:
+                # spawn: forking a process that already runs threads is unsafe
+                self._cpu_pool = ProcessPoolExecutor(
+                    max_workers=self.cpu_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._cpu_pool
+
+    # ---------- submission ----------
+
+    def _acquire(self):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolSaturated(f"{self.pending} jobs pending (limit {self.max_pending})")
+            self.pending += 1
+
+    def _release(self):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    def _finished(self, key, future):
+        # Runs when the job itself ends, not when a caller stops waiting: a
+        # cancelled request must not free the slot of a job that keeps running.
+        if key is not None and self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            future.exception()  # retrieved here in case every caller went away
+        self._release()
+
+    async def _run(self, executor, func, args, key):
+        loop = asyncio.get_running_loop()
+        if key is not None and key in self._inflight:
+            self.coalesced += 1
+            return await asyncio.shield(self._inflight[key])
+
+        self._acquire()
+        try:
+            future = loop.run_in_executor(executor, func, *args)
+        except BaseException:
+            self._release()
+            raise
+        if key is not None:
+            self._inflight[key] = future
+        future.add_done_callback(functools.partial(self._finished, key))
+        return await asyncio.shield(future)
+
+    async def run_io(self, func, *args, key=None):
+        """
+        Run a blocking function in the I/O thread pool.
+
+        Args:
+            func: Callable to run
+            *args: Positional arguments for func
+            key: Optional hashable; concurrent calls with the same key share one run
+
+        Returns:
+            The function's result
+
+        Raises:
+            PoolSaturated: If max_pending jobs are already queued or running
+        """
+        return await self._run(self.io_pool, func, args, key)
+
+    async def run_cpu(self, func, *args, key=None):
+        """
+        Run a picklable, module-level function in the process pool.
+
+        Same semantics as run_io. Workers are spawned, so they import func's
+        module (and the main module) afresh: keep process-side entry points in
+        modules without import-time wiring, such as services.mt4_parser, never
+        in api.routes.
+        """
+        return await self._run(self.cpu_pool, func, args, key)
+
+    def run_cpu_blocking(self, func, *args):
+        """
+        Run func in the process pool and wait for it from a worker thread.
+
+        Used by code that already runs inside the I/O pool (e.g. the ledger
+        cache loader) to move the CPU-heavy part to another core.
+        """
+        return self.cpu_pool.submit(func, *args).result()
+
+    # ---------- lifecycle ----------
+
+    def stats(self):
+        """Pool sizes and job counters."""
+        with self._lock:
+            return {
+                'io_workers': self.io_workers,
+                'cpu_workers': self.cpu_workers,
+                'max_pending': self.max_pending,
+                'pending': self.pending,
+                'completed': self.completed,
+                'coalesced': self.coalesced,
+                'rejected': self.rejected,
+            }
+
+    def shutdown(self):
+        """Stop both pools (called on application shutdown)."""
+        with self._lock:
+            pools = (self._io_pool, self._cpu_pool)
+            self._io_pool = self._cpu_pool = None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,107 @@
+"""
+Statement file watcher
+Polls the export file and the exports directory and ingests statements as
+soon as they change, so new exports reach the ledger cache (and its
+listeners) without waiting for a request
+"""
+
+import os
+import threading
+from services.ledger_cache import file_signature
+
+
+class StatementWatcher:
+    """
+    Polling watcher for MT4 statement files.
+
+    Every interval seconds each watched path is stat'ed (the same cheap
+    (mtime, size) signature the LedgerCache validates with); a file whose
+    signature changed, or that appeared since the last poll, is passed to
+    ingest (normally LedgerCache.get_entry, which appends only the new
+    tail of a grown export). Polling needs no platform-specific
+    notification API and costs one stat per file per interval.
+    """
+
+    def __init__(self, paths, ingest, interval=2.0):
+        """
+        Args:
+            paths: Callable returning the statement paths to watch (re-evaluated every poll)
+            ingest: Callable receiving the path of a changed file
+            interval: Seconds between polls
+        """
+        self._paths = paths
+        self._ingest = ingest
+        self.interval = interval
+        self._signatures = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.polls = 0
+        self.ingests = 0
+        self.errors = 0
+
+    def poll(self):
+        """
+        Check every watched file once and ingest the changed ones.
+
+        The first poll only records signatures.
+
+        Returns:
+            List of paths that were ingested
+        """
+        first = self.polls == 0
+        self.polls += 1
+        seen = {}
+        changed = []
+        for path in self._paths():
+            key = os.path.abspath(str(path))
+            signature = file_signature(key)
+            if signature is None:
+                continue
+            seen[key] = signature
+            if not first and self._signatures.get(key) != signature:
+                changed.append(key)
+        self._signatures = seen
+
+        for key in changed:
+            try:
+                self._ingest(key)
+                self.ingests += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Error ingesting {key}: {e}")
+        return changed
+
+    def start(self):
+        """Start polling in a daemon thread."""
+        if self._thread is not None:
+            return self._thread
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='statement-watcher', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Statement watcher error: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    def stop(self):
+        """Stop the polling thread (called on application shutdown)."""
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=self.interval + 1)
+
+    def stats(self):
+        """Watched file count and poll/ingest counters."""
+        return {
+            'watching': len(self._signatures),
+            'interval': self.interval,
+            'polls': self.polls,
+            'ingests': self.ingests,
+            'errors': self.errors,
+        }
@@ -0,0 +1,635 @@
+"""
+Columnar trade ledger
+Typed NumPy columns for parsed MT4 transactions with vectorized queries
+"""
+
+import calendar
+from datetime import datetime, timedelta
+import numpy as np
+from services.row_decoder import canonical_epoch
+
+# Sentinel for missing/unparseable timestamps
+NO_TIME = np.iinfo(np.int64).min
+
+TRADE_TYPES = ('buy', 'sell')
+ADMIN_FEE_MARKER = 'Administration Fee'
+MT4_DATETIME_FORMAT = '%Y.%m.%d %H:%M:%S'
+EPOCH = datetime(1970, 1, 1)
+
+FLOAT_COLUMNS = (
+    'size', 'open_price', 'stop_loss', 'take_profit', 'close_price',
+    'commission', 'taxes', 'swap', 'profit', 'amount'
+)
+CATEGORY_COLUMNS = ('type', 'symbol', 'description')
+SUMMARY_METRICS = (
+    'pnl', 'volume', 'trade_commissions', 'admin_fees', 'deposits', 'withdrawals',
+    'trade_count', 'winning_trades', 'losing_trades', 'balance_transactions'
+)
+
+# Record keys that are stored under another column name
+FIELD_COLUMNS = {'open_time': 'time', 'date': 'time'}
+
+TRADE_FIELDS = (
+    'ticket', 'open_time', 'type', 'size', 'symbol', 'open_price', 'stop_loss', 'take_profit',
+    'close_time', 'close_price', 'commission', 'taxes', 'swap', 'profit'
+)
+
+
+def mt4_to_epoch(date_string):
+    """
+    Convert an MT4 datetime string to epoch seconds (naive, server time).
+
+    Accepts 'YYYY.MM.DD HH:MM:SS' and falls back to the date part only,
+    like parse_mt4_datetime. The exact format is decoded without strptime
+    (see row_decoder.canonical_epoch).
+
+    Args:
+        date_string: Date string in MT4 format
+
+    Returns:
+        Integer epoch seconds or NO_TIME if parsing fails
+    """
+    if not date_string:
+        return NO_TIME
+    epoch = canonical_epoch(date_string) if isinstance(date_string, str) else None
+    if epoch is not None:
+        return epoch
+    try:
+        parsed = datetime.strptime(date_string, MT4_DATETIME_FORMAT)
+    except (ValueError, TypeError):
+        try:
+            parsed = datetime.strptime(date_string.split()[0], '%Y.%m.%d')
+        except (ValueError, TypeError, IndexError):
+            return NO_TIME
+    return calendar.timegm(parsed.timetuple())
+
+
+def epoch_to_mt4(epoch):
+    """
+    Format epoch seconds back to 'YYYY.MM.DD HH:MM:SS' ('' for NO_TIME).
+    """
+    if epoch == NO_TIME:
+        return ''
+    return (EPOCH + timedelta(seconds=int(epoch))).strftime(MT4_DATETIME_FORMAT)
+
+
+def _encode_categories(values):
+    """
+    Dictionary-encode a list of strings.
+
+    Returns:
+        Tuple (int32 codes array, list of category strings)
+    """
+    lookup = {}
+    codes = np.fromiter(
+        (lookup.setdefault(value, len(lookup)) for value in values),
+        dtype=np.int32,
+        count=len(values)
+    )
+    return codes, list(lookup)
+
+
+def _encode_tickets(tickets):
+    """
+    Store tickets as int64 when every ticket round-trips, otherwise as strings.
+    """
+    try:
+        encoded = np.array([int(t) for t in tickets], dtype=np.int64)
+    except (ValueError, OverflowError):
+        return np.array(tickets, dtype=object)
+    if all(str(int(n)) == t for n, t in zip(encoded, tickets)):
+        return encoded
+    return np.array(tickets, dtype=object)
+
+
+class TradeLedger:
+    """
+    Column-oriented container for MT4 transactions.
+
+    Every transaction is one row. Times are int64 epoch seconds ('time' is
+    open_time for trades and the booking date for balance rows), prices and
+    money are float64, and type/symbol/description are int32 codes into
+    small category lists. Row selections return new ledgers; slices share
+    memory with their parent.
+
+    Rows are kept sorted by 'time' (stable, rows without a time first), so
+    the time column doubles as a sorted index and date ranges are answered
+    with two binary searches.
+    """
+
+    __slots__ = ('columns', 'categories', 'raw_times', 'rollups')
+
+    def __init__(self, columns, categories, raw_times=None):
+        self.columns = columns
+        self.categories = categories
+        # Original strings for the rare timestamps that don't round-trip
+        self.raw_times = raw_times or {}
+        # Optional services.rollups.RollupCube attached at load time
+        self.rollups = None
+
+    # ---------- construction ----------
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build a ledger from the transaction dictionaries of parse_trade_data.
+
+        Args:
+            records: List of transaction dictionaries
+
+        Returns:
+            TradeLedger
+        """
+        count = len(records)
+        types = [r.get('type', '') for r in records]
+        symbols = [r.get('symbol', '') for r in records]
+        descriptions = [r.get('description', '') for r in records]
+        times = np.empty(count, dtype=np.int64)
+        close_times = np.empty(count, dtype=np.int64)
+        floats = {name: np.zeros(count, dtype=np.float64) for name in FLOAT_COLUMNS}
+        raw_times = {}
+
+        for i, record in enumerate(records):
+            time_string = record.get('open_time') or record.get('date') or ''
+            close_string = record.get('close_time') or ''
+            # Fixed-format timestamps always round-trip; only others need the check
+            time = canonical_epoch(time_string)
+            close_time = canonical_epoch(close_string) if close_string else NO_TIME
+            if time is None or close_time is None:
+                time, close_time = mt4_to_epoch(time_string), mt4_to_epoch(close_string)
+                if epoch_to_mt4(time) != time_string or epoch_to_mt4(close_time) != close_string:
+                    raw_times[i] = (time_string, close_string)
+            times[i] = time
+            close_times[i] = close_time
+            for name in FLOAT_COLUMNS:
+                value = record.get(name)
+                if value:
+                    floats[name][i] = value
+
+        columns = {
+            'ticket': _encode_tickets([r.get('ticket', '') for r in records]),
+            'time': times,
+            'close_time': close_times,
+        }
+        categories = {}
+        for name, values in zip(CATEGORY_COLUMNS, (types, symbols, descriptions)):
+            columns[name], categories[name] = _encode_categories(values)
+        columns.update(floats)
+        ledger = cls(columns, categories, raw_times)
+        if count > 1 and not np.all(times[:-1] <= times[1:]):
+            ledger = ledger.take(np.argsort(times, kind='stable'))
+        return ledger
+
+    @classmethod
+    def empty(cls):
+        """Ledger with no rows."""
+        return cls.from_records([])
+
+    @classmethod
+    def concat(cls, ledgers, accounts=None):
+        """
+        Merge several ledgers into one time-sorted ledger.
+
+        Category codes are remapped onto merged category lists. When account
+        names are given (one per ledger) an 'account' categorical column
+        records which ledger each row came from.
+
+        Args:
+            ledgers: List of TradeLedger
+            accounts: Optional list of account names, same length as ledgers
+
+        Returns:
+            TradeLedger
+        """
+        if not ledgers:
+            return cls.empty()
+
+        columns = {}
+        categories = {}
+        for name in CATEGORY_COLUMNS:
+            merged = {}
+            parts = []
+            for ledger in ledgers:
+                remap = np.array(
+                    [merged.setdefault(value, len(merged)) for value in ledger.categories[name]],
+                    dtype=np.int32
+                )
+                parts.append(remap[ledger.columns[name]] if len(remap) else ledger.columns[name])
+            columns[name] = np.concatenate(parts)
+            categories[name] = list(merged)
+
+        tickets = [ledger.columns['ticket'] for ledger in ledgers]
+        if any(t.dtype == object for t in tickets):
+            tickets = [t.astype(str).astype(object) for t in tickets]
+        columns['ticket'] = np.concatenate(tickets)
+        for name in ('time', 'close_time') + FLOAT_COLUMNS:
+            columns[name] = np.concatenate([ledger.columns[name] for ledger in ledgers])
+
+        raw_times = {}
+        offset = 0
+        for ledger in ledgers:
+            raw_times.update({offset + row: value for row, value in ledger.raw_times.items()})
+            offset += len(ledger)
+
+        if accounts is not None:
+            lengths = [len(ledger) for ledger in ledgers]
+            columns['account'] = np.repeat(np.arange(len(ledgers), dtype=np.int32), lengths)
+            categories['account'] = list(accounts)
+
+        merged_ledger = cls(columns, categories, raw_times)
+        times = columns['time']
+        if len(times) > 1 and not np.all(times[:-1] <= times[1:]):
+            merged_ledger = merged_ledger.take(np.argsort(times, kind='stable'))
+        return merged_ledger
+
+    # ---------- basic access ----------
+
+    def __len__(self):
+        return len(self.columns['time'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def nbytes(self):
+        """Memory held by the column arrays."""
+        return sum(column.nbytes for column in self.columns.values())
+
+    def decode(self, name):
+        """
+        Category strings of a categorical column as an object array.
+        """
+        categories = np.array(self.categories[name] or [''], dtype=object)
+        return categories[self.columns[name]]
+
+    def category_mask(self, name, predicate):
+        """
+        Boolean row mask for a categorical column, evaluated once per category.
+
+        Args:
+            name: 'type', 'symbol' or 'description'
+            predicate: Callable receiving a category string
+
+        Returns:
+            Boolean NumPy array
+        """
+        matches = np.fromiter(
+            (bool(predicate(value)) for value in self.categories[name]),
+            dtype=bool,
+            count=len(self.categories[name])
+        )
+        if not len(matches):
+            return np.zeros(len(self), dtype=bool)
+        return matches[self.columns[name]]
+
+    def trade_mask(self):
+        """Rows whose type is exactly 'buy' or 'sell'."""
+        return self.category_mask('type', lambda value: value in TRADE_TYPES)
+
+    def balance_mask(self):
+        """Balance (deposit/withdrawal/fee) rows."""
+        return self.category_mask('type', lambda value: value == 'balance')
+
+    def admin_fee_mask(self):
+        """Rows whose description contains 'Administration Fee'."""
+        return self.category_mask('description', lambda value: ADMIN_FEE_MARKER in value)
+
+    # ---------- selection ----------
+
+    def take(self, selector):
+        """
+        Select rows by slice, boolean mask or index array.
+
+        Slices return views over the same buffers; masks and index arrays copy.
+        """
+        columns = {name: column[selector] for name, column in self.columns.items()}
+        raw_times = {}
+        if self.raw_times and isinstance(selector, slice) and selector.step in (None, 1):
+            start, stop, _ = selector.indices(len(self))
+            raw_times = {old - start: value for old, value in self.raw_times.items() if start <= old < stop}
+        elif self.raw_times:
+            positions = np.arange(len(self))[selector]
+            raw_times = {new: self.raw_times[old] for new, old in enumerate(positions) if old in self.raw_times}
+        return TradeLedger(columns, self.categories, raw_times)
+
+    def trades(self):
+        """Ledger restricted to buy/sell rows."""
+        return self.take(self.trade_mask())
+
+    def time_slice(self, start=None, end=None):
+        """
+        Binary-search the sorted time column for an inclusive epoch range.
+
+        Args:
+            start: First epoch second to include (None for unbounded)
+            end: Last epoch second to include (None for unbounded)
+
+        Returns:
+            slice object over the ledger rows (rows without a time are excluded)
+        """
+        times = self.columns['time']
+        if start is None or start <= NO_TIME:
+            lo = int(np.searchsorted(times, NO_TIME, side='right'))
+        else:
+            lo = int(np.searchsorted(times, start, side='left'))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, side='right'))
+        return slice(lo, max(lo, hi))
+
+    def filter_by_date_range(self, from_date=None, to_date=None):
+        """
+        Rows whose open time (or balance date) falls in [from_date, to_date].
+
+        Same semantics as mt4_parser.filter_by_date_range: dates are
+        'YYYY.MM.DD' strings or datetimes, to_date covers the whole day and
+        rows without a parseable time are dropped when a bound is given.
+        The result is a view over this ledger's columns.
+        """
+        if from_date is None and to_date is None:
+            return self
+        return self.take(self.date_range_slice(from_date, to_date))
+
+    def date_range_slice(self, from_date=None, to_date=None):
+        """
+        Row slice for a 'YYYY.MM.DD' (or datetime) date range, see filter_by_date_range.
+        """
+        start = _bound_to_epoch(from_date) if from_date is not None else None
+        end = _bound_to_epoch(to_date, end_of_day=True) if to_date is not None else None
+        return self.time_slice(start, end)
+
+    # ---------- aggregation ----------
+
+    def group_sum(self, column, by, mask=None):
+        """
+        Sum a float column per category of a categorical column.
+
+        Args:
+            column: Name of a numeric column (e.g. 'profit')
+            by: Categorical column name ('symbol', 'type', 'description')
+            mask: Optional boolean row mask applied first
+
+        Returns:
+            Dictionary {category: sum}
+        """
+        codes = self.columns[by]
+        values = self.columns[column]
+        if mask is not None:
+            codes, values = codes[mask], values[mask]
+        sums = np.bincount(codes, weights=values, minlength=len(self.categories[by]))
+        return {name: float(total) for name, total in zip(self.categories[by], sums)}
+
+    def group_count(self, by, mask=None):
+        """
+        Count rows per category of a categorical column.
+
+        Returns:
+            Dictionary {category: count}
+        """
+        codes = self.columns[by]
+        if mask is not None:
+            codes = codes[mask]
+        counts = np.bincount(codes, minlength=len(self.categories[by]))
+        return {name: int(total) for name, total in zip(self.categories[by], counts)}
+
+    def metric_columns(self):
+        """
+        Per-row contribution of every row to each summary metric.
+
+        Summing a column over any set of rows gives that metric for the set,
+        which is what both summary() and the prefix-sum rollups rely on.
+
+        Returns:
+            Dictionary {metric: float64 array} with one entry per SUMMARY_METRICS name
+        """
+        trades = self.trade_mask()
+        balances = self.balance_mask()
+        admin_fees = self.admin_fee_mask()
+        profit = self.columns['profit']
+        amount = self.columns['amount']
+        cash = balances & ~admin_fees
+        zero = 0.0
+
+        return {
+            'pnl': np.where(trades, profit, zero),
+            'volume': np.where(trades, self.columns['size'], zero),
+            'trade_commissions': np.where(trades, self.columns['commission'], zero),
+            'admin_fees': np.where(balances & admin_fees & (amount < 0), np.abs(amount), zero),
+            'deposits': np.where(cash & (amount > 0), amount, zero),
+            'withdrawals': np.where(cash & (amount < 0), np.abs(amount), zero),
+            'trade_count': trades.astype(np.float64),
+            'winning_trades': (trades & (profit > 0)).astype(np.float64),
+            'losing_trades': (trades & (profit < 0)).astype(np.float64),
+            'balance_transactions': balances.astype(np.float64),
+        }
+
+    def summary(self, from_date=None, to_date=None):
+        """
+        Vectorized equivalent of mt4_parser.extract_trade_info.
+
+        Uses the attached prefix-sum rollups when present, otherwise sums the
+        metric columns of the filtered rows.
+
+        Returns:
+            Dictionary with summary statistics for the given date range
+        """
+        if self.rollups is not None:
+            return self.rollups.summary(from_date, to_date)
+        ledger = self.filter_by_date_range(from_date, to_date)
+        totals = {name: values.sum() for name, values in ledger.metric_columns().items()}
+        return summary_from_totals(from_date, to_date, totals)
+
+    # ---------- export ----------
+
+    def time_strings(self, name='time'):
+        """
+        MT4-formatted strings of a time column ('time' or 'close_time').
+        """
+        values = format_mt4_times(self.columns[name])
+        position = 0 if name == 'time' else 1
+        for row, raw in self.raw_times.items():
+            values[row] = raw[position]
+        return values
+
+    def field_values(self, field):
+        """
+        JSON-ready values of one record field for every row.
+
+        Args:
+            field: A key of the record dictionaries (e.g. 'open_time', 'symbol', 'profit')
+
+        Returns:
+            List with one value per row
+        """
+        if field in ('open_time', 'date'):
+            return self.time_strings('time')
+        if field == 'close_time':
+            return self.time_strings('close_time')
+        if field == 'ticket':
+            return [str(ticket) for ticket in self.columns['ticket'].tolist()]
+        if field in self.categories:
+            return self.decode(field).tolist()
+        return self.columns[field].tolist()
+
+    def sort_order(self, field, descending=False):
+        """
+        Row order that sorts the ledger by a record field (stable in both directions).
+
+        Categorical fields sort by their string value, tickets numerically when possible.
+
+        Returns:
+            int64 index array for take()
+        """
+        column = FIELD_COLUMNS.get(field, field)
+        key = self.columns[column]
+        if column in self.categories:
+            # Rank of each category string, looked up through the codes
+            ranks = np.argsort(np.argsort(np.array(self.categories[column], dtype=object), kind='stable'))
+            key = ranks[key] if len(ranks) else key
+        elif key.dtype == object:
+            key = key.astype(str)
+        if not descending:
+            return np.argsort(key, kind='stable')
+        return len(key) - 1 - np.argsort(key[::-1], kind='stable')[::-1]
+
+    def to_records(self, fields=None):
+        """
+        Transaction dictionaries in the same shape parse_trade_data returns.
+
+        Args:
+            fields: Optional list of record keys to project to (buy/sell fields only)
+
+        Returns:
+            List of dictionaries
+        """
+        if fields is not None:
+            values = [self.field_values(field) for field in fields]
+            return [dict(zip(fields, row)) for row in zip(*values)]
+
+        types = self.decode('type')
+        symbols = self.decode('symbol')
+        descriptions = self.decode('description')
+        tickets = self.field_values('ticket')
+        times = self.time_strings('time')
+        close_times = self.time_strings('close_time')
+        floats = {name: self.columns[name].tolist() for name in FLOAT_COLUMNS}
+        accounts = self.decode('account') if 'account' in self.columns else None
+
+        records = []
+        for i in range(len(self)):
+            if types[i] == 'balance':
+                records.append({
+                    'ticket': tickets[i],
+                    'date': times[i],
+                    'type': 'balance',
+                    'description': descriptions[i],
+                    'amount': floats['amount'][i],
+                    'symbol': '',
+                    'size': 0,
+                    'open_price': 0,
+                    'close_price': 0,
+                    'profit': floats['profit'][i]
+                })
+            else:
+                records.append({
+                    'ticket': tickets[i],
+                    'open_time': times[i],
+                    'type': types[i],
+                    'size': floats['size'][i],
+                    'symbol': symbols[i],
+                    'open_price': floats['open_price'][i],
+                    'stop_loss': floats['stop_loss'][i],
+                    'take_profit': floats['take_profit'][i],
+                    'close_time': close_times[i],
+                    'close_price': floats['close_price'][i],
+                    'commission': floats['commission'][i],
+                    'taxes': floats['taxes'][i],
+                    'swap': floats['swap'][i],
+                    'profit': floats['profit'][i]
+                })
+            if accounts is not None:
+                records[-1]['account'] = accounts[i]
+        return records
+
+    def to_frame(self):
+        """
+        pandas DataFrame view of the ledger with datetime64 time columns.
+
+        Like the record dictionaries, balance rows carry their time in 'date'
+        and trades in 'open_time'; the other column is NaT.
+        """
+        import pandas as pd
+
+        times = _epoch_to_datetime64(self.columns['time'])
+        balances = self.balance_mask()
+        data = {
+            'ticket': self.columns['ticket'],
+            'type': pd.Categorical.from_codes(self.columns['type'], self.categories['type']),
+            'symbol': pd.Categorical.from_codes(self.columns['symbol'], self.categories['symbol']),
+            'description': pd.Categorical.from_codes(self.columns['description'], self.categories['description']),
+            'open_time': np.where(balances, np.datetime64('NaT'), times),
+            'date': np.where(balances, times, np.datetime64('NaT')),
+            'close_time': _epoch_to_datetime64(self.columns['close_time']),
+        }
+        for name in FLOAT_COLUMNS:
+            data[name] = self.columns[name]
+        return pd.DataFrame(data)
+
+
+def format_mt4_times(epochs):
+    """
+    Vectorized epoch_to_mt4 for an int64 array.
+
+    Returns:
+        List of 'YYYY.MM.DD HH:MM:SS' strings ('' for NO_TIME)
+    """
+    strings = np.datetime_as_string(_epoch_to_datetime64(np.asarray(epochs)))
+    return ['' if value == 'NaT' else value.replace('-', '.').replace('T', ' ') for value in strings.tolist()]
+
+
+def _epoch_to_datetime64(epochs):
+    values = epochs.astype('datetime64[s]')
+    values[epochs == NO_TIME] = np.datetime64('NaT')
+    return values
+
+
+def _bound_to_epoch(value, end_of_day=False):
+    """
+    Convert a 'YYYY.MM.DD' string or datetime date bound to epoch seconds.
+    """
+    if isinstance(value, str):
+        value = datetime.strptime(value, '%Y.%m.%d')
+    if end_of_day:
+        value = value.replace(hour=23, minute=59, second=59)
+    return calendar.timegm(value.timetuple())
+
+
+def summary_from_totals(from_date, to_date, totals):
+    """
+    Assemble the /api/summary dictionary from SUMMARY_METRICS totals.
+
+    Args:
+        from_date: Requested start date (echoed in 'period')
+        to_date: Requested end date (echoed in 'period')
+        totals: Dictionary {metric: total} as produced from metric_columns()
+
+    Returns:
+        Dictionary with the same keys and rounding as extract_trade_info
+    """
+    trade_count = int(round(totals['trade_count']))
+    winning_trades = int(round(totals['winning_trades']))
+    win_rate = (winning_trades / trade_count * 100) if trade_count > 0 else 0
+    return {
+        'period': {
+            'from_date': str(from_date) if from_date else 'All',
+            'to_date': str(to_date) if to_date else 'All'
+        },
+        'total_pnl': round(float(totals['pnl']), 2),
+        'total_fees': round(float(totals['trade_commissions'] + totals['admin_fees']), 2),
+        'total_deposits': round(float(totals['deposits']), 2),
+        'total_withdrawals': round(float(totals['withdrawals']), 2),
+        'total_volume': round(float(totals['volume']), 2),
+        'trade_count': trade_count,
+        'winning_trades': winning_trades,
+        'losing_trades': int(round(totals['losing_trades'])),
+        'win_rate': round(float(win_rate), 2),
+        'balance_transactions': int(round(totals['balance_transactions']))
+    }
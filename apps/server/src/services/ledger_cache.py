@@ -0,0 +1,433 @@
+"""
+Parsed ledger cache
+Process-wide cache of parsed MT4 statements, validated by file signature
+and content hash, with incremental tail ingest
+"""
+
+import hashlib
+import os
+import threading
+import numpy as np
+from services import metrics
+from services.ledger import TradeLedger
+from services.mt4_parser import load_ledger_checkpoint, parse_statement_tail
+from services.rollups import RollupCube
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_signature(file_path):
+    """
+    Cheap change detector for an export file.
+
+    Args:
+        file_path: Path to the MT4 .htm export file
+
+    Returns:
+        Tuple (mtime_ns, size) or None if the file does not exist
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def file_digest(file_path):
+    """
+    SHA-256 hex digest of a file, read in fixed-size chunks.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        Hex digest string or None if the file cannot be read
+    """
+    return file_digests(file_path)[0]
+
+
+def file_digests(file_path, prefix_length=None):
+    """
+    SHA-256 of a whole file and, in the same pass, of its first prefix_length bytes.
+
+    Args:
+        file_path: Path to the file
+        prefix_length: Optional byte count for the prefix hash
+
+    Returns:
+        Tuple (hex digest or None, hashlib object over the prefix or None if
+        no prefix was requested or the file is shorter)
+    """
+    digest = hashlib.sha256()
+    prefix = None
+    position = 0
+    try:
+        with metrics.span('hash'), open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+                if prefix_length is not None and prefix is None and position + len(chunk) >= prefix_length:
+                    digest.update(chunk[:prefix_length - position])
+                    prefix = digest.copy()
+                    digest.update(chunk[prefix_length - position:])
+                else:
+                    digest.update(chunk)
+                position += len(chunk)
+    except OSError:
+        return None, None
+    if prefix_length == 0:
+        prefix = hashlib.sha256()
+    return digest.hexdigest(), prefix
+
+
+def _prefix_hash(file_path, length):
+    """hashlib object over the first length bytes of a file."""
+    digest = hashlib.sha256()
+    remaining = length
+    with open(file_path, 'rb') as file:
+        while remaining > 0:
+            chunk = file.read(min(HASH_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest
+
+
+def _same_tickets(new_tickets, old_tickets):
+    """True if any ticket of the new rows was already ingested."""
+    if new_tickets.dtype != old_tickets.dtype:
+        new_tickets, old_tickets = new_tickets.astype(str), old_tickets.astype(str)
+    return bool(np.isin(new_tickets, old_tickets).any())
+
+
+class _IngestCheckpoint:
+    """
+    Where the last ingest stopped: the byte offset just past the last
+    transaction row and a running hash of every byte before it.
+    """
+    __slots__ = ('rows_end', 'prefix_hash')
+
+    def __init__(self, rows_end, prefix_hash):
+        self.rows_end = rows_end
+        self.prefix_hash = prefix_hash
+
+
+class _CacheEntry:
+    __slots__ = ('signature', 'digest', 'data', 'version', 'checkpoint')
+
+    def __init__(self, signature, digest, data, version, checkpoint=None):
+        self.signature = signature
+        self.digest = digest
+        self.data = data
+        self.version = version
+        self.checkpoint = checkpoint
+
+
+class _InFlightLoad:
+    __slots__ = ('event', 'entry', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.entry = None
+        self.error = None
+
+
+class LedgerCache:
+    """
+    Process-wide cache of parsed MT4 statements.
+
+    Entries are validated on every lookup with a cheap stat (mtime, size).
+    When the stat changes the file is hashed; an identical hash only refreshes
+    the signature, a different hash triggers a reparse. Concurrent lookups
+    that miss while a parse is running wait for that parse instead of
+    starting their own. The new entry is swapped in under the lock, so
+    readers always see either the old or the new ledger, never a partial one.
+
+    With incremental ingest, each entry remembers the byte offset where its
+    last transaction row ended and a hash of everything before it. If a
+    changed file still starts with exactly those bytes, only the tail is
+    parsed and appended; new tickets that were already ingested, or a tail
+    that starts a new table, mean history was rewritten and the file is
+    parsed in full instead (counted in rewrite_fallbacks).
+
+    With a SnapshotStore attached, a file whose digest has a saved snapshot
+    is memory-mapped from disk instead of parsed, and every newly parsed
+    ledger is saved in the background.
+    """
+
+    def __init__(self, loader=None, incremental=True, snapshots=None):
+        self._loader = loader or load_ledger_checkpoint
+        self.incremental = incremental
+        self.snapshots = snapshots
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._inflight = {}
+        self._listeners = []
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.coalesced = 0
+        self.incremental_reloads = 0
+        self.rewrite_fallbacks = 0
+        self.snapshot_loads = 0
+        self.installs = 0
+
+    def get(self, file_path):
+        """
+        Return the parsed ledger for file_path, parsing only when needed.
+
+        Args:
+            file_path: Path to the MT4 .htm export file
+
+        Returns:
+            TradeLedger (shared, treat as read-only)
+        """
+        return self.get_entry(file_path).data
+
+    def get_entry(self, file_path):
+        """
+        Same as get() but returns the cache entry (data, digest and version).
+        """
+        key = os.path.abspath(str(file_path))
+        signature = file_signature(key)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature == signature:
+                self.hits += 1
+                return entry
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _InFlightLoad()
+                self._inflight[key] = flight
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.entry
+
+        try:
+            new_entry, counter = self._load(key, signature, entry)
+            with self._lock:
+                self._entries[key] = new_entry
+                setattr(self, counter, getattr(self, counter) + 1)
+            flight.entry = new_entry
+            if entry is None or new_entry.version != entry.version:
+                self._notify(key, new_entry)
+            return new_entry
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def _load(self, key, signature, entry):
+        """
+        Build the new entry for a file whose stat changed.
+
+        Returns:
+            Tuple (entry, name of the counter to increment)
+        """
+        checkpoint = entry.checkpoint if entry is not None and self.incremental else None
+        prefix_hash = None
+        if signature is None:
+            digest = None
+        elif checkpoint is not None:
+            digest, prefix_hash = file_digests(key, checkpoint.rows_end)
+        else:
+            digest = file_digest(key)
+
+        if entry is not None and entry.digest == digest:
+            # Touched but unchanged: keep the parsed data
+            return _CacheEntry(signature, digest, entry.data, entry.version, entry.checkpoint), 'hits'
+
+        if checkpoint is not None:
+            if prefix_hash is not None and prefix_hash.digest() == checkpoint.prefix_hash.digest():
+                new_entry = self._ingest_tail(key, signature, digest, entry, prefix_hash)
+                if new_entry is not None:
+                    return new_entry, 'incremental_reloads'
+            with self._lock:
+                self.rewrite_fallbacks += 1
+
+        counter = 'reloads' if entry is not None else 'misses'
+        snapshot = self.snapshots.load(digest) if self.snapshots is not None and digest else None
+        if snapshot is not None:
+            data, rows_end = snapshot
+            counter = 'snapshot_loads'
+        else:
+            data, rows_end = self._loader(key)
+            self._save_snapshot(digest, key, data, rows_end)
+
+        new_checkpoint = None
+        if self.incremental and rows_end is not None:
+            new_checkpoint = _IngestCheckpoint(rows_end, _prefix_hash(key, rows_end))
+        return _CacheEntry(signature, digest, data, self._next_version(), new_checkpoint), counter
+
+    def _save_snapshot(self, digest, key, ledger, rows_end):
+        if self.snapshots is not None and digest:
+            self.snapshots.save_async(digest, key, ledger, rows_end)
+
+    def _ingest_tail(self, key, signature, digest, entry, prefix_hash):
+        """
+        Parse only the bytes after entry's checkpoint and append the new rows.
+
+        Returns:
+            New cache entry, or None if the tail is inconsistent with the stored history
+        """
+        checkpoint = entry.checkpoint
+        with metrics.span('incremental_ingest') as span:
+            try:
+                with open(key, 'rb') as file:
+                    file.seek(checkpoint.rows_end)
+                    tail = file.read()
+                result = parse_statement_tail(tail)
+            except (OSError, UnicodeDecodeError):
+                return None
+            if result is None:
+                return None
+            span['rows'] = len(result[0])
+
+        transactions, tail_end = result
+        ledger = entry.data
+        if transactions:
+            appended = TradeLedger.from_records(transactions)
+            if _same_tickets(appended['ticket'], ledger['ticket']):
+                return None
+            ledger = TradeLedger.concat([ledger, appended])
+            ledger.rollups = RollupCube(ledger)
+            print(f"Incremental ingest: {len(transactions)} new transactions in {key}")
+
+        prefix_hash.update(tail[:tail_end])
+        new_checkpoint = _IngestCheckpoint(checkpoint.rows_end + tail_end, prefix_hash)
+        self._save_snapshot(digest, key, ledger, new_checkpoint.rows_end)
+        return _CacheEntry(signature, digest, ledger, self._next_version(), new_checkpoint)
+
+    def install(self, file_path, source_path, data, digest, rows_end=None):
+        """
+        Move an already parsed statement into place and make its ledger current.
+
+        source_path is renamed over file_path and the new entry stored in
+        one step under the cache lock, so readers keep getting the old
+        ledger until then and the new one afterwards, without a reparse.
+        A rename keeps the file's mtime and size, so the entry's signature
+        is taken from source_path.
+
+        Args:
+            file_path: Statement path the ledger is served for
+            source_path: Parsed file on the same filesystem (e.g. a finished upload)
+            data: TradeLedger parsed from source_path
+            digest: SHA-256 hex digest of source_path
+            rows_end: Byte offset of the end of the last transaction row, if known
+
+        Returns:
+            The new cache entry
+        """
+        key = os.path.abspath(str(file_path))
+        signature = file_signature(source_path)
+        checkpoint = None
+        if self.incremental and rows_end is not None:
+            checkpoint = _IngestCheckpoint(rows_end, _prefix_hash(source_path, rows_end))
+        entry = _CacheEntry(signature, digest, data, self._next_version(), checkpoint)
+        with self._lock:
+            os.replace(source_path, key)
+            self._entries[key] = entry
+            self.installs += 1
+        self._save_snapshot(digest, key, data, rows_end)
+        self._notify(key, entry)
+        return entry
+
+    def _next_version(self):
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def set_loader(self, loader):
+        """
+        Replace the function used to parse a file on a miss (e.g. to run it in a process pool).
+
+        The loader receives the file path and returns (TradeLedger, rows_end),
+        like load_ledger_checkpoint.
+        """
+        self._loader = loader
+
+    def add_listener(self, callback):
+        """
+        Register callback(file_path, entry), called after every ingest that produced a new ledger version.
+
+        Callbacks run in the thread that loaded the file and should hand
+        slow work to a background worker.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, key, entry):
+        for callback in list(self._listeners):
+            try:
+                callback(key, entry)
+            except Exception as e:
+                print(f"Error in ledger cache listener: {e}")
+
+    def set_snapshot_store(self, snapshots):
+        """
+        Attach (or detach with None) a SnapshotStore used for cold starts.
+        """
+        self.snapshots = snapshots
+
+    def invalidate(self, file_path=None):
+        """
+        Drop one cached file (or all of them when file_path is None).
+        """
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(str(file_path)), None)
+
+    def stats(self):
+        """
+        Hit/miss/reload counters and the number of cached files.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+                'coalesced': self.coalesced,
+                'incremental_reloads': self.incremental_reloads,
+                'rewrite_fallbacks': self.rewrite_fallbacks,
+                'snapshot_loads': self.snapshot_loads,
+                'installs': self.installs,
+                'entries': len(self._entries),
+            }
+
+    def sizes(self):
+        """
+        Rows and in-memory bytes of every cached ledger.
+
+        Returns:
+            Dictionary {file path: (rows, bytes)}
+        """
+        with self._lock:
+            entries = list(self._entries.items())
+        return {key: (len(entry.data), entry.data.nbytes) for key, entry in entries if entry.data is not None}
+
+
+ledger_cache = LedgerCache()
+
+
+def get_trade_data(file_path):
+    """
+    Cached, columnar variant of parse_trade_data shared by all API routes.
+
+    Args:
+        file_path: Path to the MT4 .htm export file
+
+    Returns:
+        TradeLedger (shared, treat as read-only)
+    """
+    return ledger_cache.get(file_path)
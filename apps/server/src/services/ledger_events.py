@@ -0,0 +1,123 @@
+"""
+Ledger update events
+Turns every new ledger version from the LedgerCache into a delta (the rows
+that were not in the previous version) and fans it out to subscribers
+such as the dashboard's server-sent event stream
+"""
+
+import asyncio
+import threading
+import numpy as np
+
+
+class LedgerEvent:
+    """
+    One new ledger version of a statement file.
+
+    Attributes:
+        path: Absolute path of the statement
+        version: Version token of the new ledger
+        ledger: The new TradeLedger
+        new_rows: Row indices of ledger that were not in the previous version,
+            or None when there is no usable previous version (subscribers should reload)
+    """
+
+    __slots__ = ('path', 'version', 'ledger', 'new_rows')
+
+    def __init__(self, path, version, ledger, new_rows):
+        self.path = path
+        self.version = version
+        self.ledger = ledger
+        self.new_rows = new_rows
+
+
+def new_rows(previous, current):
+    """
+    Rows of current whose ticket is not in previous.
+
+    Returns:
+        int64 index array, or None if previous is missing or rows were removed
+        (history was rewritten, so a delta would not describe the change)
+    """
+    if previous is None:
+        return None
+    old, new = previous['ticket'], current['ticket']
+    if old.dtype != new.dtype:
+        old, new = old.astype(str), new.astype(str)
+    if not np.isin(old, new).all():
+        return None
+    return np.flatnonzero(~np.isin(new, old))
+
+
+class LedgerEventHub:
+    """
+    Publishes LedgerEvents to asyncio subscribers.
+
+    on_ingest is registered as a LedgerCache listener and runs in whatever
+    thread loaded the file; events are handed to each subscriber's event
+    loop with call_soon_threadsafe. Every subscriber has a bounded queue: a
+    subscriber that falls behind loses its oldest events and gets a reload
+    event (new_rows=None) instead, so a slow dashboard never holds memory
+    or blocks ingest.
+    """
+
+    def __init__(self, queue_size=64):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._ledgers = {}
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self):
+        """
+        Register a subscriber on the running event loop.
+
+        Returns:
+            asyncio.Queue receiving LedgerEvents
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def on_ingest(self, path, entry):
+        """
+        LedgerCache listener: diff the new version against the previous one and publish it.
+        """
+        with self._lock:
+            previous = self._ledgers.get(path)
+            self._ledgers[path] = entry.data
+            subscribers = list(self._subscribers.items())
+        if not subscribers:
+            return
+        event = LedgerEvent(path, entry.version, entry.data, new_rows(previous, entry.data))
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # Subscriber's loop is closed
+                self.unsubscribe(queue)
+        with self._lock:
+            self.published += 1
+
+    def _deliver(self, queue, event):
+        if queue.full():
+            queue.get_nowait()
+            event = LedgerEvent(event.path, event.version, event.ledger, None)
+            with self._lock:
+                self.dropped += 1
+        queue.put_nowait(event)
+
+    def stats(self):
+        """Subscriber count and event counters."""
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'published': self.published,
+                'dropped': self.dropped,
+            }
@@ -0,0 +1,305 @@
+"""
+Instrumentation
+Per-stage latency histograms, row counters and gauges rendered in the
+Prometheus text format, context-manager spans for the services, and a
+sampling profiler for single requests
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+# Latency buckets in seconds (upper bounds, +Inf is implicit)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for name, value in labels:
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set."""
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), count, total) for labels, (counts, count, total) in self._series.items()]
+        for label_values, counts, count, total in sorted(series):
+            labels = list(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', _format_value(float(bound)))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class CounterMetric:
+    """Monotonic counter per label set."""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *label_values):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{_format_labels(list(zip(self.label_names, label_values)))} {_format_value(value)}")
+        return lines
+
+
+class CallbackMetric:
+    """Gauge or counter whose samples are read from a callback at scrape time."""
+
+    def __init__(self, name, help_text, label_names, callback, kind='gauge'):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.callback = callback
+        self.kind = kind
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            samples = self.callback()
+        except Exception as e:
+            print(f"Error reading metric {self.name}: {e}")
+            return lines
+        for label_values, value in sorted(samples.items(), key=lambda item: item[0]):
+            if value is None:
+                continue
+            lines.append(f"{self.name}{_format_labels(list(zip(self.label_names, label_values)))} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide set of metrics rendered together at /metrics.
+
+    Stage timings recorded in another process (e.g. a parse in the process
+    pool) are shipped back with collected() and merge().
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._capture = threading.local()
+        self.stage_seconds = self.histogram(
+            'mt4_stage_duration_seconds', 'Time spent per processing stage.', ('stage',)
+        )
+        self.stage_rows = self.counter(
+            'mt4_stage_rows_total', 'Rows processed per processing stage.', ('stage',)
+        )
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def histogram(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def counter(self, name, help_text, label_names=()):
+        return self._register(CounterMetric(name, help_text, label_names))
+
+    def gauge(self, name, help_text, label_names, callback, kind='gauge'):
+        """
+        Register a metric read at scrape time from existing state (e.g. cache stats).
+
+        Args:
+            callback: Returns {tuple of label values: number}
+            kind: 'gauge', or 'counter' for monotonic totals
+        """
+        return self._register(CallbackMetric(name, help_text, label_names, callback, kind))
+
+    def observe(self, stage, seconds, rows=None):
+        """Record one execution of a stage (and the rows it processed)."""
+        self.stage_seconds.observe(seconds, stage)
+        if rows:
+            self.stage_rows.inc(rows, stage)
+        events = getattr(self._capture, 'events', None)
+        if events is not None:
+            events.append((stage, seconds, rows))
+
+    @contextmanager
+    def span(self, stage, rows=None):
+        """
+        Time a block as one execution of stage.
+
+        Yields:
+            Dictionary whose 'rows' key may be set inside the block
+        """
+        state = {'rows': rows}
+        start = time.perf_counter()
+        try:
+            yield state
+        finally:
+            self.observe(stage, time.perf_counter() - start, state['rows'])
+
+    def merge(self, events):
+        """Record stage events captured in another process (see collected)."""
+        for stage, seconds, rows in events:
+            self.observe(stage, seconds, rows)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+span = registry.span
+observe = registry.observe
+
+
+def timed(stage):
+    """
+    Decorator recording every call of a function as one execution of stage.
+
+    The length of the first argument (e.g. a ledger) is counted as the rows processed.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(data, *args, **kwargs):
+            with span(stage, rows=len(data) if hasattr(data, '__len__') else None):
+                return func(data, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def collected(func, *args):
+    """
+    Run func and return its result with the stage events it recorded.
+
+    Module-level so it can run in a process pool; pass the events to
+    registry.merge() in the parent.
+
+    Returns:
+        Tuple (result, list of (stage, seconds, rows))
+    """
+    registry._capture.events = []
+    try:
+        return func(*args), registry._capture.events
+    finally:
+        registry._capture.events = None
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling every thread's stack from a background thread.
+
+    Request work runs in pool threads rather than on the event loop, so
+    the stacks of all threads are sampled (threads idling in a wait are
+    skipped). Samples of concurrent requests are mixed together.
+    """
+
+    # Leaf frames of idle threads
+    IDLE_FILES = ('threading.py', 'selectors.py', 'queue.py', 'thread.py', 'connection.py')
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self._started
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own or frame.f_code.co_filename.endswith(self.IDLE_FILES):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[tuple(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def report(self, top=30):
+        """
+        Text report: functions by inclusive and self samples, then collapsed stacks.
+
+        The collapsed stacks ('a;b;c count') can be fed to flamegraph tools.
+        """
+        inclusive = Counter()
+        own = Counter()
+        for stack, count in self.samples.items():
+            for name in set(stack):
+                inclusive[name] += count
+            own[stack[-1]] += count
+        total = sum(self.samples.values()) or 1
+        lines = [
+            f"Sampled {self.sample_count} times every {self.interval * 1000:.1f} ms over {self.elapsed * 1000:.1f} ms "
+            f"({sum(self.samples.values())} busy thread samples)",
+            "",
+            f"{'inclusive':>10} {'self':>8}  function",
+        ]
+        for name, count in inclusive.most_common(top):
+            lines.append(f"{count / total:>9.1%} {own[name] / total:>8.1%}  {name}")
+        lines += ["", "Collapsed stacks:"]
+        lines += [f"{';'.join(stack)} {count}" for stack, count in self.samples.most_common()]
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,169 @@
+"""
+Monte Carlo trade-sequence simulator
+Resamples the realized per-trade returns of a ledger into many alternative
+trade sequences to estimate drawdown and ruin probability distributions
+"""
+
+import numpy as np
+from services.ledger import NO_TIME, _bound_to_epoch
+
+METHODS = ('bootstrap', 'shuffle')
+
+# Upper bound on paths x trades simulated per chunk (one chunk is one process-pool job)
+CHUNK_ELEMENTS = 4_000_000
+
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+def trade_returns(ledger, from_date=None, to_date=None):
+    """
+    Realized return of every closed trade relative to the balance before it.
+
+    The balance runs over deposits, withdrawals, fees and closed trades in
+    effective-time order (same events as the equity curve), so a trade's
+    return is its net result (profit, commission, taxes and swap) divided
+    by the balance just before it closed.
+
+    Args:
+        ledger: TradeLedger
+        from_date: First close date to include (format: 'YYYY.MM.DD')
+        to_date: Last close date to include (format: 'YYYY.MM.DD')
+
+    Returns:
+        float64 array of returns in close-time order (trades closed on a
+        non-positive balance are left out)
+    """
+    balances = ledger.balance_mask()
+    trades = ledger.trade_mask()
+    times = np.where(balances, ledger['time'], ledger['close_time'])
+    changes = np.where(
+        balances,
+        ledger['amount'],
+        ledger['profit'] + ledger['commission'] + ledger['taxes'] + ledger['swap']
+    )
+    events = (balances | trades) & (times != NO_TIME)
+    order = np.argsort(times[events], kind='stable')
+    times = times[events][order]
+    changes = changes[events][order]
+    is_trade = trades[events][order]
+
+    before = np.cumsum(changes) - changes
+    selected = is_trade & (before > 0)
+    if from_date is not None:
+        selected &= times >= _bound_to_epoch(from_date)
+    if to_date is not None:
+        selected &= times <= _bound_to_epoch(to_date, end_of_day=True)
+    return changes[selected] / before[selected]
+
+
+def simulate_chunk(returns, paths, horizon, method, ruin_level, seed):
+    """
+    Simulate one chunk of paths.
+
+    Every path compounds horizon returns drawn from the history: with
+    replacement ('bootstrap') or as a random permutation ('shuffle', where
+    horizon equals the number of trades). Equity, running peak and
+    drawdown are computed for all paths at once on a (paths x horizon)
+    array.
+
+    Args:
+        returns: float64 array of per-trade returns
+        paths: Number of paths in this chunk
+        horizon: Trades per path
+        method: One of METHODS
+        ruin_level: Equity (as a fraction of the start) at or below which a path counts as ruined
+        seed: numpy SeedSequence of this chunk
+
+    Returns:
+        Tuple of float64 arrays (final return, max drawdown fraction) and a bool array (ruined), one entry per path
+    """
+    rng = np.random.default_rng(seed)
+    if method == 'shuffle':
+        sample = rng.permuted(np.broadcast_to(returns, (paths, len(returns))), axis=1)
+    else:
+        sample = returns[rng.integers(0, len(returns), size=(paths, horizon))]
+
+    equity = np.cumprod(np.maximum(1 + sample, 0.0), axis=1)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), 1.0)
+    max_drawdown = (1 - equity / peak).max(axis=1)
+    ruined = equity.min(axis=1) <= ruin_level
+    return equity[:, -1] - 1, max_drawdown, ruined
+
+
+def simulate(returns, paths=10000, horizon=None, method='bootstrap', ruin_pct=50.0, seed=0, executor=None):
+    """
+    Run a Monte Carlo simulation of trade sequences.
+
+    Paths are split into chunks of at most CHUNK_ELEMENTS simulated trades.
+    Chunk c draws from SeedSequence(seed).spawn(...)[c], so results depend
+    only on the inputs and the seed, never on how many workers ran them.
+
+    Args:
+        returns: Per-trade returns (see trade_returns)
+        paths: Number of simulated sequences
+        horizon: Trades per sequence (default: the number of historical trades)
+        method: 'bootstrap' (draw with replacement) or 'shuffle' (reorder the history)
+        ruin_pct: Loss of starting equity, in percent, that counts as ruin
+        seed: Integer seed
+        executor: Optional concurrent.futures executor to run chunks in parallel
+
+    Returns:
+        Dictionary with ruin probability and drawdown / return distributions
+
+    Raises:
+        ValueError: On invalid parameters or an empty history
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    if not len(returns):
+        raise ValueError("No closed trades to resample")
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}', expected one of {METHODS}")
+    if method == 'shuffle' or horizon is None:
+        horizon = len(returns)
+    if paths < 1 or horizon < 1:
+        raise ValueError("paths and horizon must be >= 1")
+    if not 0 < ruin_pct <= 100:
+        raise ValueError("ruin_pct must be in (0, 100]")
+
+    per_chunk = max(1, CHUNK_ELEMENTS // horizon)
+    sizes = [min(per_chunk, paths - start) for start in range(0, paths, per_chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    ruin_level = 1 - ruin_pct / 100
+    jobs = [(returns, size, horizon, method, ruin_level, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+    if executor is None or len(jobs) < 2:
+        chunks = [simulate_chunk(*job) for job in jobs]
+    else:
+        chunks = list(executor.map(simulate_chunk, *zip(*jobs)))
+
+    final_return, max_drawdown, ruined = (np.concatenate(parts) for parts in zip(*chunks))
+    return {
+        'paths': paths,
+        'horizon': horizon,
+        'method': method,
+        'seed': seed,
+        'historical_trades': len(returns),
+        'ruin_pct': ruin_pct,
+        'ruin_probability': round(float(ruined.mean()), 6),
+        'max_drawdown_pct': _distribution(max_drawdown * 100),
+        'final_return_pct': _distribution(final_return * 100),
+        'drawdown_histogram': _histogram(max_drawdown * 100),
+    }
+
+
+def _distribution(values):
+    """Mean and PERCENTILES of an array, rounded."""
+    quantiles = np.percentile(values, PERCENTILES)
+    return {
+        'mean': round(float(values.mean()), 4),
+        **{f"p{p}": round(float(q), 4) for p, q in zip(PERCENTILES, quantiles)},
+    }
+
+
+def _histogram(drawdown_pct, bins=20):
+    """Share of paths per 5% bucket of max drawdown."""
+    counts, edges = np.histogram(drawdown_pct, bins=bins, range=(0, 100))
+    shares = counts / max(len(drawdown_pct), 1)
+    return [
+        {'from': float(lo), 'to': float(hi), 'share': round(float(share), 6)}
+        for lo, hi, share in zip(edges[:-1], edges[1:], shares)
+    ]
@@ -1,6 +1,18 @@
-from bs4 import BeautifulSoup
-from datetime import datetime
+from datetime import datetime, timedelta
+from html.parser import HTMLParser
+import codecs
+import io
 import os
+import time
+from services import metrics
+from services.ledger import TradeLedger
+from services.row_decoder import canonical_epoch, parse_number, parse_optional_number
+from services.rollups import RollupCube
+
+PARSER_ENGINES = ('stream', 'bs4')
+DEFAULT_PARSER_ENGINE = os.environ.get('MT4_PARSER_ENGINE', 'stream')
+STREAM_CHUNK_SIZE = 64 * 1024
+EPOCH = datetime(1970, 1, 1)
 
 
 def parse_mt4_datetime(date_string):
@@ -13,6 +25,9 @@ def parse_mt4_datetime(date_string):
     Returns:
         datetime object or None if parsing fails
     """
+    epoch = canonical_epoch(date_string) if isinstance(date_string, str) else None
+    if epoch is not None:
+        return EPOCH + timedelta(seconds=epoch)
     try:
         return datetime.strptime(date_string, '%Y.%m.%d %H:%M:%S')
     except (ValueError, TypeError):
@@ -32,11 +47,19 @@ def filter_by_date_range(transaction_data, from_date=None, to_date=None):
         to_date: End date (string in format 'YYYY.MM.DD' or datetime object)
         
     Returns:
-        Filtered list of transactions
+        Filtered list of transactions (a TradeLedger when given one)
     """
+    if isinstance(transaction_data, TradeLedger):
+        return transaction_data.filter_by_date_range(from_date, to_date)
+
     if not transaction_data or (from_date is None and to_date is None):
         return transaction_data
-    
+
+    with metrics.span('filter', rows=len(transaction_data)):
+        return _filter_records(transaction_data, from_date, to_date)
+
+
+def _filter_records(transaction_data, from_date, to_date):
     # Parse from_date
     if isinstance(from_date, str):
         from_date = datetime.strptime(from_date, '%Y.%m.%d')
@@ -67,26 +90,44 @@ def filter_by_date_range(transaction_data, from_date=None, to_date=None):
     return filtered_data
 
 
-def parse_trade_data(file_path):
+def parse_trade_data(file_path, engine=None):
     """
     Parse MT4 HTML export file and extract trade data including all transactions.
     
     Args:
         file_path: Path to the MT4 .htm export file
+        engine: 'stream' (incremental, default) or 'bs4' (whole-document BeautifulSoup)
         
     Returns:
         List of transaction dictionaries including trades, deposits, withdrawals, and balance changes
     """
-    transaction_data = []
+    engine = engine or DEFAULT_PARSER_ENGINE
+    if engine not in PARSER_ENGINES:
+        raise ValueError(f"Unknown parser engine '{engine}', expected one of {PARSER_ENGINES}")
     
     if not os.path.exists(file_path):
         print(f"File not found: {file_path}")
-        return transaction_data
+        return []
     
-    print(f"Parsing MT4 file: {file_path}")
+    print(f"Parsing MT4 file: {file_path} (engine={engine})")
+    if engine == 'bs4':
+        return _parse_trade_data_bs4(file_path)
+    return _parse_trade_data_stream(file_path)
+
+
+def _parse_trade_data_bs4(file_path):
+    """
+    Reference parser: builds the full BeautifulSoup tree of the statement.
+    """
+    # Imported on first use: the default streaming engine doesn't need bs4
+    from bs4 import BeautifulSoup
+
+    transaction_data = []
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            soup = BeautifulSoup(file.read(), 'html.parser')
+        with metrics.span('file_read'), open(file_path, 'r', encoding='utf-8') as file:
+            html = file.read()
+        with metrics.span('parse_tree'):
+            soup = BeautifulSoup(html, 'html.parser')
             
         # Find the table containing trade data
         tables = soup.find_all('table')
@@ -180,24 +221,371 @@ def parse_trade_data(file_path):
 
 
 
+def transaction_from_cells(cells):
+    """
+    Build a transaction dictionary from the stripped text of a row's cells.
+
+    Mirrors the per-row rules of the BeautifulSoup parser; every cell is
+    decoded once with the row_decoder helpers.
+
+    Args:
+        cells: List of cell strings (already stripped)
+
+    Returns:
+        Transaction dictionary or None if the row is not a transaction
+    """
+    if len(cells) < 2:
+        return None
+
+    transaction_type = cells[2] if len(cells) > 2 else ''
+    try:
+        if transaction_type == 'balance':
+            balance_amount = parse_number(cells[-1])
+            return {
+                'ticket': cells[0],
+                'date': cells[1],
+                'type': 'balance',
+                'description': cells[3] if len(cells) > 3 else '',
+                'amount': balance_amount,
+                'symbol': '',
+                'size': 0,
+                'open_price': 0,
+                'close_price': 0,
+                'profit': balance_amount
+            }
+
+        if transaction_type.lower() in ['buy', 'sell'] and len(cells) >= 10:
+            count = len(cells)
+            return {
+                'ticket': cells[0],
+                'open_time': cells[1],
+                'type': transaction_type,
+                'size': parse_number(cells[3]),
+                'symbol': cells[4],
+                'open_price': parse_number(cells[5]),
+                'stop_loss': parse_optional_number(cells[6]),
+                'take_profit': parse_optional_number(cells[7]),
+                'close_time': cells[8],
+                'close_price': parse_optional_number(cells[9]),
+                'commission': parse_optional_number(cells[10]) if count > 10 else 0,
+                'taxes': parse_optional_number(cells[11]) if count > 11 else 0,
+                'swap': parse_optional_number(cells[12]) if count > 12 else 0,
+                'profit': parse_number(cells[13]) if count > 13 else 0,
+            }
+    except (ValueError, IndexError):
+        return None
+
+    return None
+
+
+class _StatementRowParser(HTMLParser):
+    """
+    Incremental <tr>/<td> walker for MT4 statements.
+
+    Only the rows of the most recently opened table are kept, matching the
+    "last table" rule of the BeautifulSoup parser, and each row is turned into
+    a transaction as soon as it closes, so no document tree is ever built.
+    """
+
+    def __init__(self, resume=False):
+        super().__init__(convert_charrefs=True)
+        self.transactions = []
+        # (line, column, explicit </tr>) of the end of the last transaction row
+        self.last_row_end = None
+        self.tables_opened = 0
+        self._table_depth = 0
+        self._active_depth = 0
+        self._row_index = 0
+        self._cells = None
+        self._cell_parts = None
+        if resume:
+            # Continue right after a transaction row of the active table
+            self._table_depth = self._active_depth = 1
+            self._row_index = 1
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            self._close_row()
+            self.tables_opened += 1
+            self._table_depth += 1
+            self._active_depth = self._table_depth
+            self._row_index = 0
+            self.transactions = []
+        elif not self._active_depth:
+            return
+        elif tag == 'tr':
+            self._close_row()
+            self._cells = []
+        elif tag == 'td' and self._cells is not None:
+            self._close_cell()
+            self._cell_parts = []
+
+    def handle_endtag(self, tag):
+        if tag == 'table':
+            if self._table_depth == self._active_depth:
+                self._close_row()
+                self._active_depth = 0
+            self._table_depth = max(self._table_depth - 1, 0)
+        elif tag == 'tr':
+            self._close_row(explicit=True)
+        elif tag == 'td':
+            self._close_cell()
+
+    def handle_data(self, data):
+        if self._cell_parts is not None:
+            self._cell_parts.append(data)
+
+    def _close_cell(self):
+        if self._cell_parts is not None:
+            self._cells.append(''.join(self._cell_parts).strip())
+            self._cell_parts = None
+
+    def _close_row(self, explicit=False):
+        if self._cells is None:
+            return
+        self._close_cell()
+        cells = self._cells
+        self._cells = None
+        self._row_index += 1
+        # Skip header row
+        if self._row_index == 1:
+            return
+        transaction = transaction_from_cells(cells)
+        if transaction is not None:
+            self.transactions.append(transaction)
+            self.last_row_end = self.getpos() + (explicit,)
+
+
+def _position_to_offset(file, position):
+    """
+    Convert an HTMLParser (line, column, explicit) row end to a byte offset.
+
+    Args:
+        file: Binary file object positioned at the start of the parsed text
+        position: last_row_end of a _StatementRowParser
+
+    Returns:
+        Byte offset (relative to the file's start position) just past the
+        row's closing tag, or None if the bytes there don't look like a row end
+    """
+    line, column, explicit = position
+    base = file.tell()
+    offset = base
+    newlines = 0
+    while newlines < line - 1:
+        chunk = file.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            return None
+        remaining = line - 1 - newlines
+        count = chunk.count(b'\n')
+        if count < remaining:
+            newlines += count
+            offset += len(chunk)
+            continue
+        cut = -1
+        for _ in range(remaining):
+            cut = chunk.index(b'\n', cut + 1)
+        offset += cut + 1
+        newlines = line - 1
+    file.seek(offset)
+    text = file.read(column * 4 + STREAM_CHUNK_SIZE)
+    prefix = text.decode('utf-8', errors='ignore')[:column].encode('utf-8')
+    tag_start = offset + len(prefix)
+    tail = text[len(prefix):]
+    if not explicit:
+        return tag_start - base if tail[:1] == b'<' else None
+    if tail[:4].lower() != b'</tr':
+        return None
+    close = tail.find(b'>')
+    return tag_start + close + 1 - base if close >= 0 else None
+
+
+def _stream_statement(file_path, progress=None):
+    """
+    Run the streaming parser over a file.
+
+    Args:
+        file_path: Path to the MT4 .htm export file
+        progress: Optional callable(bytes read so far), called after every chunk
+
+    Returns:
+        Finished _StatementRowParser, or None if the file could not be parsed
+    """
+    parser = _StatementRowParser()
+    # Decode (with universal newlines, as text mode would) from raw chunks so
+    # progress can be reported in bytes of the file
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')(), translate=True)
+    read_seconds = 0.0
+    read_bytes = 0
+    start = time.perf_counter()
+    try:
+        with open(file_path, 'rb') as file:
+            while True:
+                read_start = time.perf_counter()
+                chunk = file.read(STREAM_CHUNK_SIZE)
+                read_seconds += time.perf_counter() - read_start
+                if not chunk:
+                    break
+                parser.feed(decoder.decode(chunk))
+                if progress is not None:
+                    read_bytes += len(chunk)
+                    progress(read_bytes)
+        parser.feed(decoder.decode(b'', final=True))
+        parser.close()
+    except Exception as e:
+        print(f"Error parsing MT4 file: {e}")
+        return None
+    # Reading and parsing interleave chunk by chunk; report them as separate stages
+    metrics.observe('file_read', read_seconds)
+    metrics.observe('parse', time.perf_counter() - start - read_seconds, len(parser.transactions))
+    return parser
+
+
+def _parse_trade_data_stream(file_path):
+    """
+    Streaming parser: feeds the statement in chunks and decodes rows as they close.
+    """
+    parser = _stream_statement(file_path)
+    return parser.transactions if parser is not None else []
+
+
+def parse_statement_checkpoint(file_path, progress=None):
+    """
+    Parse a statement and locate where its last transaction row ends.
+
+    The byte offset lets a later ingest of the same (appended) file skip
+    everything before it, see LedgerCache.
+
+    Args:
+        file_path: Path to the MT4 .htm export file
+        progress: Optional callable(bytes read so far)
+
+    Returns:
+        Tuple (transactions, rows_end) where rows_end is a byte offset or None
+    """
+    if not os.path.exists(file_path):
+        print(f"File not found: {file_path}")
+        return [], None
+    print(f"Parsing MT4 file: {file_path} (engine=stream, checkpoint)")
+    parser = _stream_statement(file_path, progress)
+    if parser is None:
+        return [], None
+    rows_end = None
+    if parser.last_row_end is not None:
+        with open(file_path, 'rb') as file:
+            rows_end = _position_to_offset(file, parser.last_row_end)
+    return parser.transactions, rows_end
+
+
+def parse_statement_tail(data):
+    """
+    Parse the bytes that follow a checkpoint (see parse_statement_checkpoint).
+
+    Args:
+        data: Statement bytes starting right after the last known transaction row
+
+    Returns:
+        Tuple (transactions, rows_end relative to data) or None when the tail
+        opens a new table, i.e. the rows before the checkpoint no longer
+        belong to the trade table
+    """
+    parser = _StatementRowParser(resume=True)
+    parser.feed(data.decode('utf-8'))
+    parser.close()
+    if parser.tables_opened:
+        return None
+    rows_end = 0
+    if parser.last_row_end is not None:
+        rows_end = _position_to_offset(io.BytesIO(data), parser.last_row_end)
+        if rows_end is None:
+            return None
+    return parser.transactions, rows_end
+
+
+def compare_parser_engines(file_path):
+    """
+    Parity check between the streaming and BeautifulSoup engines.
+
+    Args:
+        file_path: Path to the MT4 .htm export file
+
+    Returns:
+        Dictionary with per-engine counts and the indexes of mismatching transactions
+    """
+    streamed = parse_trade_data(file_path, engine='stream')
+    reference = parse_trade_data(file_path, engine='bs4')
+    mismatches = [i for i, (a, b) in enumerate(zip(streamed, reference)) if a != b]
+    return {
+        'stream_count': len(streamed),
+        'bs4_count': len(reference),
+        'mismatches': mismatches,
+        'identical': len(streamed) == len(reference) and not mismatches
+    }
+
+
 def parse_mt4_file(file_path):
     """
     Alias for parse_trade_data for backward compatibility.
     """
     return parse_trade_data(file_path)
 
+
+def load_ledger(file_path, engine=None):
+    """
+    Parse an MT4 export file into a columnar TradeLedger.
+
+    The prefix-sum rollups used for range summaries are built here, once
+    per load, rather than on the first request.
+
+    Args:
+        file_path: Path to the MT4 .htm export file
+        engine: Parser engine, see parse_trade_data
+
+    Returns:
+        TradeLedger with rollups attached
+    """
+    return _ledger_with_rollups(parse_trade_data(file_path, engine=engine))
+
+
+def load_ledger_checkpoint(file_path, engine=None, progress=None):
+    """
+    load_ledger plus the byte offset where the last transaction row ends.
+
+    Only the streaming engine can report the offset (and parse progress,
+    see _stream_statement); other engines return None.
+
+    Returns:
+        Tuple (TradeLedger, rows_end)
+    """
+    if (engine or DEFAULT_PARSER_ENGINE) != 'stream':
+        return load_ledger(file_path, engine=engine), None
+    transactions, rows_end = parse_statement_checkpoint(file_path, progress)
+    return _ledger_with_rollups(transactions), rows_end
+
+
+def _ledger_with_rollups(transactions):
+    with metrics.span('ledger_build', rows=len(transactions)):
+        ledger = TradeLedger.from_records(transactions)
+        ledger.rollups = RollupCube(ledger)
+    return ledger
+
+
 def extract_trade_info(trade_data, from_date=None, to_date=None):
     """
     Extract summary information from trade data for a given date range.
     
     Args:
-        trade_data: List of transaction dictionaries (trades and balance entries)
+        trade_data: TradeLedger or list of transaction dictionaries (trades and balance entries)
         from_date: Start date (string in format 'YYYY.MM.DD' or datetime object)
         to_date: End date (string in format 'YYYY.MM.DD' or datetime object)
         
     Returns:
         Dictionary with summary statistics including fees, PnL, deposits, and withdrawals
     """
+    if isinstance(trade_data, TradeLedger):
+        with metrics.span('summary', rows=len(trade_data)):
+            return trade_data.summary(from_date, to_date)
+
     # Filter by date range if provided
     filtered_data = filter_by_date_range(trade_data, from_date, to_date)
     
@@ -273,6 +661,7 @@ if __name__ == "__main__":
     print(f"Using MT4 file path: {file}")
 
     mt4_file = file
+    print(f"Engine parity: {compare_parser_engines(mt4_file)}")
     trades = parse_trade_data(mt4_file)
     import json
     json_data = json.dumps(trades, indent=4)
@@ -0,0 +1,170 @@
+"""
+Position sizing engine
+Server-side version of the capital / risk % / leverage calculator,
+vectorized over batches of scenarios with NumPy broadcasting
+"""
+
+import csv
+import io
+import numpy as np
+
+# Scenario inputs; the first three are required
+INPUT_COLUMNS = ('capital', 'risk_pct', 'leverage', 'stop_distance', 'contract_size')
+REQUIRED_COLUMNS = ('capital', 'risk_pct', 'leverage')
+OUTPUT_COLUMNS = ('risk_amount', 'position_size', 'units', 'lots')
+
+# Units per standard lot (FX majors); stop_distance is in price units
+DEFAULT_CONTRACT_SIZE = 100000.0
+LOT_STEP = 0.01
+
+
+def position_size(capital, risk_pct, leverage, stop_distance=None, contract_size=DEFAULT_CONTRACT_SIZE):
+    """
+    Size positions for every combination of the (broadcast) inputs.
+
+    Same math as the calculator page: risk_amount = capital * risk_pct / 100
+    and position_size = risk_amount * leverage. When a stop distance is
+    given, units = risk_amount / stop_distance is the position that loses
+    exactly risk_amount at the stop, and lots is units / contract_size
+    rounded down to LOT_STEP so the risk is never exceeded.
+
+    Args:
+        capital: Account capital (scalar or array)
+        risk_pct: Percentage of capital risked per trade (scalar or array)
+        leverage: Account leverage (scalar or array)
+        stop_distance: Optional stop distance in price units (scalar or array, NaN for none)
+        contract_size: Units per lot (scalar or array)
+
+    Returns:
+        Dictionary {column: float64 array} with the broadcast inputs and OUTPUT_COLUMNS
+        (units and lots are NaN where there is no stop distance)
+    """
+    if stop_distance is None:
+        stop_distance = np.nan
+    arrays = np.broadcast_arrays(*(
+        np.asarray(value, dtype=np.float64)
+        for value in (capital, risk_pct, leverage, stop_distance, contract_size)
+    ))
+    inputs = {name: np.ravel(array) for name, array in zip(INPUT_COLUMNS, arrays)}
+    validate(inputs)
+
+    risk_amount = inputs['capital'] * inputs['risk_pct'] / 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        units = risk_amount / inputs['stop_distance']
+        lots = np.floor(units / inputs['contract_size'] / LOT_STEP + 1e-9) * LOT_STEP
+    return {
+        **inputs,
+        'risk_amount': risk_amount,
+        'position_size': risk_amount * inputs['leverage'],
+        'units': units,
+        'lots': lots,
+    }
+
+
+def position_size_grid(capital, risk_pct, leverage, stop_distance=None, contract_size=DEFAULT_CONTRACT_SIZE):
+    """
+    Size positions for the cartesian product of the input lists.
+
+    Each input is a scalar or a list; every input gets its own axis, so
+    e.g. 10 capitals x 5 risk levels x 4 leverages give 200 scenarios.
+
+    Returns:
+        Same as position_size, one row per combination (last input varies fastest)
+    """
+    values = [np.atleast_1d(np.asarray(np.nan if value is None else value, dtype=np.float64))
+              for value in (capital, risk_pct, leverage, stop_distance, contract_size)]
+    axes = np.ix_(*values)
+    return position_size(*axes)
+
+
+def scenario_count(grid=False, **inputs):
+    """
+    Number of scenarios position_size (or position_size_grid) would produce, without computing them.
+
+    Raises:
+        ValueError: If the inputs cannot be broadcast together
+    """
+    shapes = [np.shape(value) for value in inputs.values() if value is not None]
+    if grid:
+        return int(np.prod([max(int(np.prod(shape)), 1) for shape in shapes]))
+    return int(np.prod(np.broadcast_shapes(*shapes)))
+
+
+def validate(inputs):
+    """
+    Check scenario inputs.
+
+    Raises:
+        ValueError: Naming the first invalid scenario and column
+    """
+    checks = (
+        ('capital', lambda values: values >= 0, "must be >= 0"),
+        ('risk_pct', lambda values: (values > 0) & (values <= 100), "must be in (0, 100]"),
+        ('leverage', lambda values: values > 0, "must be > 0"),
+        ('stop_distance', lambda values: np.isnan(values) | (values > 0), "must be > 0"),
+        ('contract_size', lambda values: values > 0, "must be > 0"),
+    )
+    for name, check, message in checks:
+        invalid = np.flatnonzero(~check(inputs[name]))
+        if len(invalid):
+            row = int(invalid[0])
+            raise ValueError(f"Row {row}: {name}={inputs[name][row]} {message}")
+
+
+def to_records(results):
+    """
+    Result rows as dictionaries (amounts rounded to 2 decimals, missing values as None).
+    """
+    columns = {}
+    for name, values in results.items():
+        if name in OUTPUT_COLUMNS:
+            values = np.round(values, 2)
+        columns[name] = [None if value != value else value for value in values.tolist()]
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def read_csv(text):
+    """
+    Parse a CSV of scenarios with a header row.
+
+    Required columns are capital, risk_pct and leverage; stop_distance and
+    contract_size are optional (empty cells mean no stop / the default size).
+
+    Returns:
+        Dictionary of keyword arguments for position_size
+
+    Raises:
+        ValueError: On missing columns or non-numeric cells
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    header = [name.strip() for name in reader.fieldnames or []]
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise ValueError(f"Missing CSV columns: {', '.join(missing)}")
+    reader.fieldnames = header
+
+    defaults = {'stop_distance': np.nan, 'contract_size': DEFAULT_CONTRACT_SIZE}
+    columns = {name: [] for name in INPUT_COLUMNS}
+    for line, row in enumerate(reader, start=2):
+        for name in INPUT_COLUMNS:
+            cell = (row.get(name) or '').strip()
+            if not cell and name in defaults:
+                columns[name].append(defaults[name])
+                continue
+            try:
+                columns[name].append(float(cell))
+            except ValueError:
+                raise ValueError(f"Line {line}: {name} is not a number: '{cell}'") from None
+    return {name: np.array(values, dtype=np.float64) for name, values in columns.items()}
+
+
+def to_csv(results):
+    """
+    Result rows as CSV text (inputs followed by OUTPUT_COLUMNS, empty cells for missing values).
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(results)
+    for record in to_records(results):
+        writer.writerow(['' if value is None else value for value in record.values()])
+    return buffer.getvalue()
@@ -0,0 +1,168 @@
+"""
+Historical risk replay
+Re-sizes every closed trade of a ledger under alternative risk-% and
+leverage rules and rebuilds the resulting equity curves
+"""
+
+import numpy as np
+from services.equity import lttb_indices
+from services.ledger import NO_TIME, format_mt4_times
+
+# Rule combinations per process-pool job
+RULES_PER_CHUNK = 8
+
+
+class ReplayTrades:
+    """
+    Per-trade inputs of a replay, in close-time order.
+
+    Each closed buy/sell trade is reduced to what sizing needs: its net
+    result per lot (profit, commission, taxes and swap all scale with the
+    size), the money at risk per lot between open price and stop loss,
+    and the notional value of one lot. The value of a 1.0 price move per
+    lot is derived from the trade itself (profit / size / price move);
+    trades that closed at their open price use the median of their
+    symbol. Trades whose value cannot be derived are left out.
+    """
+
+    def __init__(self, ledger, from_date=None, to_date=None):
+        if from_date or to_date:
+            ledger = ledger.filter_by_date_range(from_date, to_date)
+        rows = ledger.trade_mask() & (ledger['close_time'] != NO_TIME) & (ledger['size'] > 0)
+        buy_code = ledger.categories['type'].index('buy') if 'buy' in ledger.categories['type'] else -1
+
+        size = ledger['size'][rows]
+        open_price = ledger['open_price'][rows]
+        stop = ledger['stop_loss'][rows]
+        direction = np.where(ledger['type'][rows] == buy_code, 1.0, -1.0)
+        move = (ledger['close_price'][rows] - open_price) * direction
+        profit = ledger['profit'][rows]
+        net = profit + ledger['commission'][rows] + ledger['taxes'][rows] + ledger['swap'][rows]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            point_value = profit / (size * move)
+        point_value = self._fill_by_symbol(point_value, ledger['symbol'][rows])
+
+        usable = np.isfinite(point_value) & (point_value > 0) & (open_price > 0)
+        order = np.argsort(ledger['close_time'][rows][usable], kind='stable')
+        self.close_times = ledger['close_time'][rows][usable][order]
+        self.net_per_lot = (net / size)[usable][order]
+        self.notional_per_lot = (open_price * point_value)[usable][order]
+        has_stop = (stop > 0)[usable][order]
+        risk = (np.abs(open_price - stop) * point_value)[usable][order]
+        self.risk_per_lot = np.where(has_stop & (risk > 0), risk, np.nan)
+        self.skipped = int(rows.sum() - usable.sum())
+
+    @staticmethod
+    def _fill_by_symbol(point_value, symbols):
+        """Replace undefined point values with the median of the same symbol."""
+        defined = np.isfinite(point_value) & (point_value > 0)
+        filled = np.where(defined, point_value, np.nan)
+        for code in np.unique(symbols[~defined]):
+            same = defined & (symbols == code)
+            if same.any():
+                filled[(symbols == code) & ~defined] = np.median(point_value[same])
+        return filled
+
+    def __len__(self):
+        return len(self.close_times)
+
+
+def _lots_per_equity(trades, risk_pct, leverage):
+    """
+    Lots per unit of equity for every (rule, trade) pair.
+
+    Trades with a stop risk risk_pct of equity at the stop, capped by the
+    leverage limit (equity * leverage of notional). Trades without a stop
+    use the calculator rule: notional = equity * risk_pct / 100 * leverage.
+
+    Returns:
+        float64 array of shape (len(risk_pct), len(trades))
+    """
+    risk = (risk_pct / 100)[:, None]
+    leverage = leverage[:, None]
+    by_stop = np.minimum(risk / trades.risk_per_lot, leverage / trades.notional_per_lot)
+    by_notional = risk * leverage / trades.notional_per_lot
+    return np.where(np.isnan(trades.risk_per_lot), by_notional, by_stop)
+
+
+def replay_rules(trades, risk_pct, leverage, initial_capital, points=None):
+    """
+    Equity curves of a batch of rules over the same trades.
+
+    Every trade is sized on the equity left after the previous trade
+    closed, so each curve is initial_capital times the cumulative product
+    of (1 + lots_per_equity * net_per_lot), one vectorized pass for all
+    rules at once. A trade that would lose more than the whole account
+    ruins it: equity stays at 0 afterwards.
+
+    Args:
+        trades: ReplayTrades
+        risk_pct: float64 array of risk percentages, one per rule
+        leverage: float64 array of leverages, same length
+        initial_capital: Starting equity
+        points: Optional point budget per curve (LTTB downsampling)
+
+    Returns:
+        List of result dictionaries, one per rule
+    """
+    risk_pct = np.asarray(risk_pct, dtype=np.float64)
+    leverage = np.asarray(leverage, dtype=np.float64)
+    growth = np.maximum(1 + _lots_per_equity(trades, risk_pct, leverage) * trades.net_per_lot, 0.0)
+    equity = initial_capital * np.cumprod(growth, axis=1)
+    peaks = np.maximum(np.maximum.accumulate(equity, axis=1), initial_capital)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown_pct = np.where(peaks > 0, (peaks - equity) / peaks * 100, 0.0)
+
+    results = []
+    for rule in range(len(risk_pct)):
+        curve = equity[rule]
+        final = float(curve[-1]) if len(curve) else float(initial_capital)
+        indices = np.arange(len(curve))
+        if points is not None and len(curve) > points:
+            indices = lttb_indices(trades.close_times, curve, points)
+        results.append({
+            'risk_pct': float(risk_pct[rule]),
+            'leverage': float(leverage[rule]),
+            'final_equity': round(final, 2),
+            'return_pct': round((final / initial_capital - 1) * 100, 2),
+            'max_drawdown_pct': round(float(drawdown_pct[rule].max()), 2) if len(curve) else 0.0,
+            'ruined': bool(len(curve) and curve[-1] <= 0),
+            'curve': [
+                {'time': time, 'equity': value}
+                for time, value in zip(format_mt4_times(trades.close_times[indices]), np.round(curve[indices], 2).tolist())
+            ],
+        })
+    return results
+
+
+def replay_grid(trades, risk_pcts, leverages, initial_capital=10000.0, points=500, executor=None):
+    """
+    Replay every combination of risk percentages and leverages.
+
+    The grid is split into chunks of RULES_PER_CHUNK rules; with an
+    executor (e.g. a ProcessPoolExecutor) the chunks run in parallel.
+
+    Args:
+        trades: ReplayTrades
+        risk_pcts: Risk percentages to try
+        leverages: Leverages to try
+        initial_capital: Starting equity of every replay
+        points: Point budget per curve
+        executor: Optional concurrent.futures executor
+
+    Returns:
+        List of result dictionaries ordered by (risk_pct, leverage)
+    """
+    risk_grid, leverage_grid = (axis.ravel() for axis in np.meshgrid(
+        np.asarray(risk_pcts, dtype=np.float64), np.asarray(leverages, dtype=np.float64), indexing='ij'
+    ))
+    chunks = [
+        (trades, risk_grid[start:start + RULES_PER_CHUNK], leverage_grid[start:start + RULES_PER_CHUNK], initial_capital, points)
+        for start in range(0, len(risk_grid), RULES_PER_CHUNK)
+    ]
+    if executor is None or len(chunks) < 2:
+        batches = [replay_rules(*chunk) for chunk in chunks]
+    else:
+        batches = list(executor.map(replay_rules, *zip(*chunks)))
+    return [result for batch in batches for result in batch]
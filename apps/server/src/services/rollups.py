@@ -0,0 +1,191 @@
+"""
+Prefix-sum rollups over a time-sorted TradeLedger
+Constant-time range summaries and per-day/week/month/year aggregates
+"""
+
+import numpy as np
+from services.ledger import NO_TIME, summary_from_totals
+from services.symbol_index import SymbolIndex
+
+SECONDS_PER_DAY = 86400
+GRANULARITIES = ('daily', 'weekly', 'monthly', 'yearly')
+
+
+def period_keys(times, granularity):
+    """
+    Integer period key for each epoch second (non-decreasing for sorted input).
+
+    Keys are days, Monday-based weeks, months or years since 1970.
+
+    Args:
+        times: int64 array of epoch seconds (no NO_TIME entries)
+        granularity: One of GRANULARITIES
+
+    Returns:
+        int64 NumPy array
+    """
+    if granularity == 'daily':
+        return times // SECONDS_PER_DAY
+    if granularity == 'weekly':
+        # 1970-01-01 was a Thursday, shift so weeks start on Monday
+        return (times // SECONDS_PER_DAY + 3) // 7
+    if granularity == 'monthly':
+        return times.astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+    if granularity == 'yearly':
+        return times.astype('datetime64[s]').astype('datetime64[Y]').astype(np.int64)
+    raise ValueError(f"Unknown granularity '{granularity}', expected one of {GRANULARITIES}")
+
+
+def period_label(key, granularity):
+    """
+    Human-readable label for a period key, formatted like pandas Period strings.
+    """
+    if granularity == 'daily':
+        return str(np.datetime64(int(key), 'D'))
+    if granularity == 'weekly':
+        monday = np.datetime64(int(key) * 7 - 3, 'D')
+        return f"{monday}/{monday + np.timedelta64(6, 'D')}"
+    if granularity == 'monthly':
+        return str(np.datetime64(int(key), 'M'))
+    return str(np.datetime64(int(key), 'Y'))
+
+
+def period_labels(keys, granularity):
+    """
+    Vectorized period_label for an array of period keys.
+
+    Returns:
+        List of label strings
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    if granularity == 'weekly':
+        mondays = np.datetime_as_string((keys * 7 - 3).astype('datetime64[D]'))
+        sundays = np.datetime_as_string((keys * 7 + 3).astype('datetime64[D]'))
+        return np.char.add(np.char.add(mondays, '/'), sundays).tolist()
+    unit = {'daily': 'D', 'monthly': 'M', 'yearly': 'Y'}[granularity]
+    return np.datetime_as_string(keys.astype(f'datetime64[{unit}]')).tolist()
+
+
+class RollupCube:
+    """
+    Cumulative sums of every summary metric over a time-sorted ledger.
+
+    prefix[metric][i] is the metric total of rows [0, i), so any contiguous
+    row range is summarised with one subtraction per metric. A date range
+    maps to a row range with two binary searches on the sorted time column,
+    which makes a range summary O(log n). Period boundaries (row offsets
+    where a new day/week/month/year starts) are precomputed the same way,
+    as is a per-symbol index (see services.symbol_index).
+    """
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self.prefix = {}
+        for name, values in ledger.metric_columns().items():
+            prefix = np.zeros(len(values) + 1, dtype=np.float64)
+            np.cumsum(values, out=prefix[1:])
+            self.prefix[name] = prefix
+
+        times = ledger['time']
+        first_timed = int(np.searchsorted(times, NO_TIME, side='right'))
+        timed = times[first_timed:]
+        self.periods = {}
+        for granularity in GRANULARITIES:
+            if not len(timed):
+                self.periods[granularity] = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+                continue
+            keys = period_keys(timed, granularity)
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+            self.periods[granularity] = (keys[starts], starts + first_timed)
+        self._symbols = SymbolIndex(ledger)
+
+    @classmethod
+    def from_arrays(cls, ledger, prefix, periods):
+        """
+        Rebuild a cube from previously computed arrays (e.g. a snapshot).
+
+        Args:
+            ledger: The TradeLedger the arrays were computed from
+            prefix: Dictionary {metric: prefix-sum array}
+            periods: Dictionary {granularity: (period keys, row starts)}
+        """
+        cube = cls.__new__(cls)
+        cube.ledger = ledger
+        cube.prefix = prefix
+        cube.periods = periods
+        cube._symbols = None
+        return cube
+
+    @property
+    def symbols(self):
+        """
+        SymbolIndex of the ledger (built with the cube, or on first use for snapshot-loaded cubes).
+        """
+        if self._symbols is None:
+            self._symbols = SymbolIndex(self.ledger)
+        return self._symbols
+
+    def range_totals(self, lo, hi):
+        """
+        Metric totals for rows [lo, hi).
+
+        Returns:
+            Dictionary {metric: total}
+        """
+        return {name: prefix[hi] - prefix[lo] for name, prefix in self.prefix.items()}
+
+    def summary(self, from_date=None, to_date=None):
+        """
+        extract_trade_info-compatible summary for a date range in O(log n).
+        """
+        if from_date is None and to_date is None:
+            lo, hi = 0, len(self.ledger)
+        else:
+            selected = self.ledger.date_range_slice(from_date, to_date)
+            lo, hi = selected.start, selected.stop
+        return summary_from_totals(from_date, to_date, self.range_totals(lo, hi))
+
+    def rollup(self, granularity='monthly', from_date=None, to_date=None):
+        """
+        Per-period metric totals, optionally clipped to a date range.
+
+        Args:
+            granularity: 'daily', 'weekly', 'monthly' or 'yearly'
+            from_date: Start date (format: 'YYYY.MM.DD')
+            to_date: End date (format: 'YYYY.MM.DD')
+
+        Returns:
+            List of dictionaries, one per non-empty period, in time order
+        """
+        if granularity not in self.periods:
+            raise ValueError(f"Unknown granularity '{granularity}', expected one of {GRANULARITIES}")
+        keys, starts = self.periods[granularity]
+        selected = self.ledger.date_range_slice(from_date, to_date)
+        lo, hi = selected.start, selected.stop
+        if lo >= hi:
+            return []
+
+        # Periods overlapping [lo, hi), with their boundaries clipped to it
+        first = max(int(np.searchsorted(starts, lo, side='right')) - 1, 0)
+        last = int(np.searchsorted(starts, hi, side='left'))
+        bounds = np.clip(np.append(starts[first:last], hi), lo, hi)
+        totals = {name: prefix[bounds[1:]] - prefix[bounds[:-1]] for name, prefix in self.prefix.items()}
+
+        results = []
+        for i, key in enumerate(keys[first:last]):
+            trade_count = int(round(totals['trade_count'][i]))
+            winning_trades = int(round(totals['winning_trades'][i]))
+            results.append({
+                'period': period_label(key, granularity),
+                'pnl': round(float(totals['pnl'][i]), 2),
+                'fees': round(float(totals['trade_commissions'][i] + totals['admin_fees'][i]), 2),
+                'deposits': round(float(totals['deposits'][i]), 2),
+                'withdrawals': round(float(totals['withdrawals'][i]), 2),
+                'volume': round(float(totals['volume'][i]), 2),
+                'trade_count': trade_count,
+                'winning_trades': winning_trades,
+                'losing_trades': int(round(totals['losing_trades'][i])),
+                'win_rate': round(winning_trades / trade_count * 100, 2) if trade_count else 0,
+                'balance_transactions': int(round(totals['balance_transactions'][i])),
+            })
+        return results
@@ -0,0 +1,93 @@
+"""
+Row decoding
+Turns the stripped cell strings of an MT4 statement row into values:
+numbers with thousands separators and blanks, and fixed-format
+'YYYY.MM.DD HH:MM:SS' timestamps into epoch seconds
+"""
+
+import re
+from datetime import date
+
+# Timestamps in the exact format MT4 writes; anything else takes the slow path
+MT4_TIMESTAMP = re.compile(r'(\d{4}\.\d\d\.\d\d) ([01]\d|2[0-3]):([0-5]\d):([0-5]\d)', re.ASCII)
+MT4_DATE = re.compile(r'(\d{4})\.(\d\d)\.(\d\d)', re.ASCII)
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+SECONDS_PER_DAY = 86400
+# Distinct trading days seen; cleared when full so odd input can't grow it without bound
+MAX_MEMO_DAYS = 100000
+
+_day_epochs = {}
+
+
+def parse_number(text):
+    """
+    Parse a numeric cell such as '1,234.56'.
+
+    Raises:
+        ValueError: If the cell is blank or not a number
+    """
+    try:
+        return float(text)
+    except ValueError:
+        return float(text.replace(',', ''))
+
+
+def parse_optional_number(text):
+    """
+    Parse a numeric cell that may be blank (blank is 0).
+
+    Raises:
+        ValueError: If the cell is not blank and not a number
+    """
+    if not text:
+        return 0
+    try:
+        return float(text)
+    except ValueError:
+        return float(text.replace(',', ''))
+
+
+def _day_epoch(day):
+    """Epoch seconds of midnight of a 'YYYY.MM.DD' string, or None if it is not a valid date."""
+    epoch = _day_epochs.get(day)
+    if epoch is None:
+        match = MT4_DATE.fullmatch(day)
+        if match is None:
+            return None
+        year, month, day_of_month = (int(part) for part in match.groups())
+        # Years below 1000 don't format back to four digits
+        if year < 1000:
+            return None
+        try:
+            epoch = (date(year, month, day_of_month).toordinal() - EPOCH_ORDINAL) * SECONDS_PER_DAY
+        except ValueError:
+            return None
+        if len(_day_epochs) >= MAX_MEMO_DAYS:
+            _day_epochs.clear()
+        _day_epochs[day] = epoch
+    return epoch
+
+
+def canonical_epoch(text):
+    """
+    Epoch seconds of a timestamp in the exact 'YYYY.MM.DD HH:MM:SS' format.
+
+    Only the fixed format is decoded here (a regex match plus a memo of
+    each day's midnight), so these values always format back to text;
+    anything else returns None and is left to the strptime-based
+    decoders (ledger.mt4_to_epoch).
+
+    Args:
+        text: Cell string
+
+    Returns:
+        Integer epoch seconds (naive, server time) or None
+    """
+    match = MT4_TIMESTAMP.fullmatch(text)
+    if match is None:
+        return None
+    day, hours, minutes, seconds = match.groups()
+    midnight = _day_epoch(day)
+    if midnight is None:
+        return None
+    return midnight + int(hours) * 3600 + int(minutes) * 60 + int(seconds)
@@ -0,0 +1,169 @@
+"""
+Persistent ledger snapshots
+Parsed ledgers stored as memory-mapped .npy column files keyed by the
+SHA-256 of their source statement
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+import numpy as np
+from services.ledger import TradeLedger
+from services.rollups import RollupCube
+
+FORMAT_VERSION = 1
+META_FILE = 'meta.json'
+
+
+class SnapshotStore:
+    """
+    Directory of ledger snapshots, one sub-directory per source digest.
+
+    Every ledger column, rollup prefix sum and period index is saved as its
+    own .npy file and opened with mmap_mode='r' on load, so a cold start
+    reads no data up front and every uvicorn worker on the host shares the
+    same page-cache pages instead of holding a private copy. A snapshot is
+    only used when its name matches the current hash of the statement, and
+    it is written to a temporary directory that is renamed into place, so
+    readers never see a half-written snapshot.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.loads = 0
+        self.saves = 0
+
+    def path_for(self, digest):
+        return self.root / digest
+
+    def load(self, digest):
+        """
+        Open the snapshot of a statement.
+
+        Args:
+            digest: SHA-256 hex digest of the source statement
+
+        Returns:
+            Tuple (TradeLedger with rollups, rows_end) or None if there is no valid snapshot
+        """
+        directory = self.path_for(digest)
+        if not (directory / META_FILE).exists():
+            return None
+        try:
+            with open(directory / META_FILE, 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+            if meta.get('format') != FORMAT_VERSION or meta.get('digest') != digest:
+                return None
+
+            columns = {name: np.load(directory / f"{name}.npy", mmap_mode='r') for name in meta['columns']}
+            if columns['ticket'].dtype.kind == 'U':
+                columns['ticket'] = columns['ticket'].astype(object)
+            raw_times = {int(row): tuple(value) for row, value in meta['raw_times'].items()}
+            ledger = TradeLedger(columns, meta['categories'], raw_times)
+
+            prefix = {name: np.load(directory / f"prefix.{name}.npy", mmap_mode='r') for name in meta['metrics']}
+            periods = {
+                granularity: (
+                    np.load(directory / f"period.{granularity}.keys.npy"),
+                    np.load(directory / f"period.{granularity}.starts.npy")
+                )
+                for granularity in meta['granularities']
+            }
+            ledger.rollups = RollupCube.from_arrays(ledger, prefix, periods)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring snapshot {directory}: {e}")
+            return None
+
+        self.loads += 1
+        return ledger, meta.get('rows_end')
+
+    def save(self, digest, source, ledger, rows_end=None):
+        """
+        Persist a ledger (and its rollups) for a statement digest.
+
+        Empty ledgers are not saved (zero-length arrays cannot be memory-mapped).
+        Older snapshots of the same source file are removed afterwards.
+
+        Args:
+            digest: SHA-256 hex digest of the source statement
+            source: Path of the source statement
+            ledger: TradeLedger with rollups attached
+            rows_end: Incremental-ingest checkpoint offset, if any
+        """
+        final = self.path_for(digest)
+        if not len(ledger) or ledger.rollups is None or final.exists():
+            return
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{digest}.", dir=self.root))
+        try:
+            for name, column in ledger.columns.items():
+                if column.dtype == object:
+                    column = column.astype(str)
+                np.save(staging / f"{name}.npy", column)
+            for name, prefix in ledger.rollups.prefix.items():
+                np.save(staging / f"prefix.{name}.npy", prefix)
+            for granularity, (keys, starts) in ledger.rollups.periods.items():
+                np.save(staging / f"period.{granularity}.keys.npy", keys)
+                np.save(staging / f"period.{granularity}.starts.npy", starts)
+
+            meta = {
+                'format': FORMAT_VERSION,
+                'digest': digest,
+                'source': os.path.abspath(str(source)),
+                'rows': len(ledger),
+                'rows_end': rows_end,
+                'columns': list(ledger.columns),
+                'categories': ledger.categories,
+                'raw_times': {str(row): list(value) for row, value in ledger.raw_times.items()},
+                'metrics': list(ledger.rollups.prefix),
+                'granularities': list(ledger.rollups.periods),
+            }
+            with open(staging / META_FILE, 'w', encoding='utf-8') as file:
+                json.dump(meta, file)
+            os.rename(staging, final)
+        except OSError as e:
+            # Another worker may have published the same snapshot first
+            shutil.rmtree(staging, ignore_errors=True)
+            if not final.exists():
+                print(f"Error saving snapshot {final}: {e}")
+            return
+
+        self.saves += 1
+        self.prune(source, keep=digest)
+
+    def save_async(self, digest, source, ledger, rows_end=None):
+        """
+        save() in a daemon thread so the request that triggered the parse isn't delayed.
+        """
+        threading.Thread(
+            target=self.save,
+            args=(digest, source, ledger, rows_end),
+            name='snapshot-writer',
+            daemon=True
+        ).start()
+
+    def prune(self, source, keep=None):
+        """
+        Remove snapshots of a source file other than the one named keep.
+        """
+        source = os.path.abspath(str(source))
+        if not self.root.exists():
+            return
+        for directory in self.root.iterdir():
+            if directory.name == keep or directory.name.startswith('.'):
+                continue
+            try:
+                with open(directory / META_FILE, 'r', encoding='utf-8') as file:
+                    if json.load(file).get('source') != source:
+                        continue
+            except (OSError, ValueError):
+                continue
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def stats(self):
+        """Snapshot load/save counters."""
+        return {'loads': self.loads, 'saves': self.saves}
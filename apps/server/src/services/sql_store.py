@@ -0,0 +1,357 @@
+"""
+Embedded SQL ledger store
+Optional SQLite copy of parsed statements that answers summary and trades
+queries with indexed, pushed-down SQL
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from services import metrics
+from services.ledger import (
+    NO_TIME, FLOAT_COLUMNS, TRADE_TYPES, ADMIN_FEE_MARKER, FIELD_COLUMNS, TRADE_FIELDS,
+    summary_from_totals, _bound_to_epoch
+)
+
+# Transaction columns in insert order; 'time' is open_time for trades and the date of balance rows
+STORE_COLUMNS = (
+    'path', 'ticket', 'seq', 'time', 'close_time', 'raw_time', 'raw_close_time', 'type', 'symbol', 'description'
+) + FLOAT_COLUMNS
+
+# Bumped on every schema change; a database of another version is rebuilt
+# (it only holds copies of the statements)
+SCHEMA_VERSION = 2
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS statements (
+    path TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    loaded REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    path TEXT NOT NULL,
+    ticket NOT NULL,
+    seq INTEGER NOT NULL,
+    time INTEGER NOT NULL,
+    close_time INTEGER NOT NULL,
+    raw_time TEXT,
+    raw_close_time TEXT,
+    type TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    description TEXT NOT NULL,
+    {', '.join(f'{name} REAL NOT NULL' for name in FLOAT_COLUMNS)},
+    PRIMARY KEY (path, time, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS transactions_close_time ON transactions (path, close_time);
+CREATE INDEX IF NOT EXISTS transactions_symbol ON transactions (path, symbol);
+CREATE INDEX IF NOT EXISTS transactions_type ON transactions (path, type);
+PRAGMA user_version = {SCHEMA_VERSION};
+"""
+
+INSERT_SQL = (
+    f"INSERT INTO transactions ({', '.join(STORE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(STORE_COLUMNS))})"
+)
+
+
+def _quote(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+IS_TRADE = f"type IN ({', '.join(_quote(value) for value in TRADE_TYPES)})"
+IS_BALANCE = "type = 'balance'"
+IS_ADMIN_FEE = f"instr(description, {_quote(ADMIN_FEE_MARKER)}) > 0"
+
+# SUMMARY_METRICS aggregates, mirroring TradeLedger.metric_columns. Trades
+# are most of a statement and are summed in one scan of the clustered key;
+# the few balance rows are read through the type index.
+TRADE_METRIC_SQL = {
+    'pnl': "TOTAL(profit)",
+    'volume': "TOTAL(size)",
+    'trade_commissions': "TOTAL(commission)",
+    'trade_count': "COUNT(*)",
+    'winning_trades': "TOTAL(profit > 0)",
+    'losing_trades': "TOTAL(profit < 0)",
+}
+BALANCE_METRIC_SQL = {
+    'admin_fees': f"TOTAL(CASE WHEN {IS_ADMIN_FEE} AND amount < 0 THEN -amount END)",
+    'deposits': f"TOTAL(CASE WHEN NOT {IS_ADMIN_FEE} AND amount > 0 THEN amount END)",
+    'withdrawals': f"TOTAL(CASE WHEN NOT {IS_ADMIN_FEE} AND amount < 0 THEN -amount END)",
+    'balance_transactions': "COUNT(*)",
+}
+SUMMARY_QUERIES = (
+    (TRADE_METRIC_SQL, f"SELECT {', '.join(TRADE_METRIC_SQL.values())} FROM transactions NOT INDEXED", IS_TRADE),
+    (
+        BALANCE_METRIC_SQL,
+        f"SELECT {', '.join(BALANCE_METRIC_SQL.values())} FROM transactions INDEXED BY transactions_type",
+        IS_BALANCE
+    ),
+)
+
+
+def _time_sql(column, raw_column):
+    return (
+        f"COALESCE({raw_column}, CASE WHEN {column} = {NO_TIME} THEN '' "
+        f"ELSE strftime('%Y.%m.%d %H:%M:%S', {column}, 'unixepoch') END)"
+    )
+
+
+# SQL expression of every record field of a trade, formatted like TradeLedger.field_values
+FIELD_SQL = {field: field for field in TRADE_FIELDS}
+FIELD_SQL.update({
+    'ticket': "CAST(ticket AS TEXT)",
+    'open_time': _time_sql('time', 'raw_time'),
+    'close_time': _time_sql('close_time', 'raw_close_time'),
+})
+
+
+def _range_sql(from_date, to_date):
+    """
+    WHERE terms and parameters for a date range, with filter_by_date_range semantics.
+    """
+    if from_date is None and to_date is None:
+        return [], []
+    # A single lower bound, so SQLite seeks to it (rows without a time are dropped)
+    start = NO_TIME + 1 if from_date is None else max(_bound_to_epoch(from_date), NO_TIME + 1)
+    terms, params = ["time >= ?"], [start]
+    if to_date is not None:
+        terms.append("time <= ?")
+        params.append(_bound_to_epoch(to_date, end_of_day=True))
+    return terms, params
+
+
+class LedgerStore:
+    """
+    SQLite database holding a copy of every ingested statement.
+
+    Each statement is bulk-loaded in one transaction whenever its digest
+    changes, so the database always holds complete ledgers and survives
+    restarts. Rows are stored exactly as in the TradeLedger, including a
+    ticket listed twice, so both backends agree. Rows are clustered by (statement, time, seq), where seq
+    is the row position in the TradeLedger, so a date range is one
+    contiguous scan and results come back in the same order as the
+    in-memory path. The close_time, symbol and type indexes carry the
+    same key, which lets ascending sorts on them read rows in order.
+    Every worker thread keeps its own pooled connection (WAL mode, so
+    readers never wait for a load).
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: SQLite database file (created with its schema if missing)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        # {statement path: latest entry} waiting for a background load
+        self._pending = {}
+        self.connections = 0
+        self.loads = 0
+        connection = self._connection()
+        if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            connection.executescript("DROP TABLE IF EXISTS transactions; DROP TABLE IF EXISTS statements;")
+        connection.executescript(SCHEMA)
+
+    def _connection(self):
+        """
+        Connection of the calling thread, opened on first use.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._lock:
+                self.connections += 1
+        return connection
+
+    # ---------- loading ----------
+
+    def sync(self, source, entry):
+        """
+        Bulk-load a cache entry unless the store already holds its digest.
+
+        Args:
+            source: Statement path
+            entry: LedgerCache entry of the statement
+
+        Returns:
+            True if the ledger was (re)loaded
+        """
+        source = os.path.abspath(str(source))
+        digest = entry.digest or ''  # missing statement: stored as empty
+        with self._sync_lock:
+            connection = self._connection()
+            if self._digest(connection, source) == digest:
+                return False
+            with metrics.span('sql_load') as span:
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    # Another process may have loaded the same digest meanwhile
+                    if self._digest(connection, source) == digest:
+                        connection.execute("COMMIT")
+                        return False
+                    connection.execute("DELETE FROM transactions WHERE path = ?", (source,))
+                    connection.executemany(INSERT_SQL, self._rows(source, entry.data))
+                    rows = connection.execute("SELECT COUNT(*) FROM transactions WHERE path = ?", (source,)).fetchone()[0]
+                    connection.execute(
+                        "INSERT OR REPLACE INTO statements (path, digest, rows, loaded) VALUES (?, ?, ?, ?)",
+                        (source, digest, rows, time.time())
+                    )
+                    connection.execute("COMMIT")
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
+                span['rows'] = rows
+        with self._lock:
+            self.loads += 1
+        print(f"Loaded {rows} transactions of {source} into {self.path.name}")
+        return True
+
+    def holds(self, source, entry):
+        """
+        True if the store already holds the ledger of a cache entry.
+        """
+        return self._digest(self._connection(), os.path.abspath(str(source))) == (entry.digest or '')
+
+    def sync_async(self, source, entry):
+        """
+        sync() in a daemon thread, usable as a LedgerCache listener.
+
+        One loader runs per statement; entries queued while it runs replace
+        each other, so only the latest one is loaded next.
+        """
+        source = os.path.abspath(str(source))
+        with self._lock:
+            running = source in self._pending
+            self._pending[source] = entry
+        if not running:
+            threading.Thread(target=self._sync_pending, args=(source,), name='sql-loader', daemon=True).start()
+
+    def _sync_pending(self, source):
+        while True:
+            with self._lock:
+                entry = self._pending[source]
+            try:
+                self.sync(source, entry)
+            except sqlite3.Error as e:
+                print(f"Error loading {source} into the ledger store: {e}")
+            with self._lock:
+                if self._pending[source] is entry:
+                    del self._pending[source]
+                    return
+
+    @staticmethod
+    def _digest(connection, source):
+        row = connection.execute("SELECT digest FROM statements WHERE path = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _rows(source, ledger):
+        """
+        Insert parameters for every row of a ledger.
+        """
+        count = len(ledger)
+        raw_open = [None] * count
+        raw_close = [None] * count
+        for row, (open_string, close_string) in ledger.raw_times.items():
+            raw_open[row], raw_close[row] = open_string, close_string
+        columns = [
+            [source] * count,
+            ledger['ticket'].tolist(),
+            range(count),
+            ledger['time'].tolist(),
+            ledger['close_time'].tolist(),
+            raw_open,
+            raw_close,
+            ledger.decode('type').tolist(),
+            ledger.decode('symbol').tolist(),
+            ledger.decode('description').tolist(),
+        ]
+        columns.extend(ledger[name].tolist() for name in FLOAT_COLUMNS)
+        return zip(*columns)
+
+    # ---------- queries ----------
+
+    def summary(self, source, from_date=None, to_date=None):
+        """
+        Summary of one statement for a date range, aggregated in SQL.
+
+        Returns:
+            Dictionary with the same keys and rounding as TradeLedger.summary
+        """
+        terms, params = _range_sql(from_date, to_date)
+        params = [os.path.abspath(str(source))] + params
+        connection = self._connection()
+        totals = {}
+        with metrics.span('summary'):
+            for metric_sql, select, kind in SUMMARY_QUERIES:
+                row = connection.execute(f"{select} WHERE {' AND '.join(['path = ?', kind] + terms)}", params).fetchone()
+                totals.update(zip(metric_sql, row))
+        return summary_from_totals(from_date, to_date, totals)
+
+    def trade_page(self, source, from_date=None, to_date=None, fields=None, sort=None, limit=None, offset=0):
+        """
+        Filter, sort and page the buy/sell rows of one statement in SQL.
+
+        Args:
+            source: Statement path
+            from_date: Start date ('YYYY.MM.DD')
+            to_date: End date ('YYYY.MM.DD')
+            fields: Record keys to return (default: every trade field)
+            sort: Record key to sort by, prefixed with '-' for descending
+            limit: Page size (None for every row)
+            offset: Number of rows to skip
+
+        Returns:
+            Tuple (list of record dictionaries, total matching trades)
+
+        Raises:
+            ValueError: On an unknown field or sort key
+        """
+        fields = list(fields or TRADE_FIELDS)
+        unknown = [field for field in fields if field not in FIELD_SQL]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        # Ledger order; ties keep it in both directions, like TradeLedger.sort_order
+        order = "time, seq"
+        if sort:
+            field = sort.lstrip('-')
+            if field not in FIELD_SQL:
+                raise ValueError(f"Unknown sort field: {field}")
+            column = FIELD_COLUMNS.get(field, field)
+            direction = 'DESC' if sort.startswith('-') else 'ASC'
+            order = f"time {direction}, seq" if column == 'time' else f"{column} {direction}, time, seq"
+
+        terms, params = _range_sql(from_date, to_date)
+        where = ' AND '.join(['path = ?', IS_TRADE] + terms)
+        params = [os.path.abspath(str(source))] + params
+        connection = self._connection()
+        with metrics.span('filter') as span:
+            total = connection.execute(f"SELECT COUNT(*) FROM transactions WHERE {where}", params).fetchone()[0]
+            rows = connection.execute(
+                f"SELECT {', '.join(FIELD_SQL[field] for field in fields)} FROM transactions "
+                f"WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?",
+                params + [-1 if limit is None else limit, offset]
+            ).fetchall()
+            span['rows'] = len(rows)
+        return [dict(zip(fields, row)) for row in rows], total
+
+    def stats(self):
+        """Connection/load counters and stored row counts."""
+        statements = self._connection().execute("SELECT COUNT(*), TOTAL(rows) FROM statements").fetchone()
+        with self._lock:
+            return {
+                'path': str(self.path),
+                'connections': self.connections,
+                'loads': self.loads,
+                'statements': statements[0],
+                'rows': int(statements[1]),
+            }
@@ -0,0 +1,249 @@
+"""
+Statement registry
+Discovers every MT4 export under the exports directory and serves
+per-account and aggregated ledgers
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from services.ledger import TradeLedger
+from services.ledger_cache import ledger_cache
+from services.rollups import RollupCube
+
+# Account id that selects the aggregate of every statement
+ALL_ACCOUNTS = 'all'
+
+# Directories modified this close to a scan may change again without their
+# (coarse-grained) mtime moving, so such scans are not reused
+RACY_MTIME_NS = 2 * 10**9
+
+
+class UnknownAccount(KeyError):
+    """Raised when an account id has no statement file."""
+
+
+class StatementRegistry:
+    """
+    Maps account ids to MT4 statement files and loads them in parallel.
+
+    The account id of a file is its path relative to the exports directory
+    without the extension (e.g. 'trade_data' or 'broker_a/1234567').
+    Parsed ledgers live in the shared LedgerCache, so a file that did not
+    change is never parsed twice; stale files are loaded concurrently on the
+    worker pool's I/O threads, each parse running in the cache's loader (the
+    process pool in the API).
+
+    The directory scan is cached and only repeated when the mtime of one of
+    the scanned directories changes, which happens whenever a file or
+    sub-directory is added, removed or renamed in it.
+    """
+
+    def __init__(self, exports_dir, extensions=('.htm', '.html'), cache=None, pool=None):
+        """
+        Args:
+            exports_dir: Directory holding the statements (searched recursively)
+            extensions: Statement file extensions
+            cache: LedgerCache (default: the process-wide ledger_cache)
+            pool: Optional WorkerPool whose I/O threads load statements concurrently
+        """
+        self.exports_dir = Path(exports_dir)
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.cache = cache or ledger_cache
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._aggregate_key = None
+        self._aggregate = None
+        # Last scan: ({directory: mtime_ns}, {account_id: Path})
+        self._scan = None
+        self.scans = 0
+
+    def account_id(self, path):
+        """
+        Account id for a statement path.
+        """
+        return Path(path).relative_to(self.exports_dir).with_suffix('').as_posix()
+
+    def discover(self):
+        """
+        Find every statement file under the exports directory.
+
+        Returns:
+            Dictionary {account_id: Path}, sorted by account id
+        """
+        with self._lock:
+            scan = self._scan
+        if scan is not None and all(_mtime_ns(directory) == mtime for directory, mtime in scan[0].items()):
+            return dict(scan[1])
+
+        started = time.time_ns()
+        directories, files = self._walk()
+        racy = any(mtime is None or mtime > started - RACY_MTIME_NS for mtime in directories.values())
+        with self._lock:
+            self._scan = None if racy else (directories, files)
+            self.scans += 1
+        return dict(files)
+
+    def _walk(self):
+        """
+        Scan the exports directory tree.
+
+        Each directory's mtime is read before it is listed, so a change made
+        during the scan invalidates the result on the next call. Files whose
+        account id is reserved (ALL_ACCOUNTS) or already taken by another
+        extension (a.htm and a.html) are skipped.
+
+        Returns:
+            Tuple ({directory: mtime_ns}, {account_id: Path})
+        """
+        directories = {}
+        paths = []
+        pending = [str(self.exports_dir)]
+        while pending:
+            directory = pending.pop()
+            directories[directory] = _mtime_ns(directory)
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            pending.append(entry.path)
+                        elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in self.extensions:
+                            paths.append(Path(entry.path))
+            except OSError:
+                continue
+        files = {}
+        for path in sorted(paths):
+            account = self.account_id(path)
+            if account == ALL_ACCOUNTS:
+                print(f"Skipping statement {path}: '{ALL_ACCOUNTS}' is reserved for the aggregate of every account")
+            elif account in files:
+                print(f"Skipping statement {path}: account '{account}' is already {files[account]}")
+            else:
+                files[account] = path
+        return directories, files
+
+    def path_for(self, account):
+        """
+        Statement path of one account.
+
+        Raises:
+            UnknownAccount: If no statement file matches the account id
+        """
+        path = self.discover().get(account)
+        if path is None:
+            raise UnknownAccount(account)
+        return path
+
+    def ledger(self, account):
+        """
+        Cached ledger of one account.
+
+        Args:
+            account: Account id (see account_id)
+
+        Returns:
+            TradeLedger
+        """
+        return self.entry(account).data
+
+    def entry(self, account):
+        """
+        Cache entry (ledger, digest and version) of one account.
+        """
+        return self.cache.get_entry(str(self.path_for(account)))
+
+    def load_all(self, files=None):
+        """
+        Load (or revalidate) every statement, parsing stale ones concurrently.
+
+        Args:
+            files: Optional {account_id: Path} mapping (defaults to discover())
+
+        Returns:
+            Dictionary {account_id: cache entry}
+        """
+        files = self.discover() if files is None else files
+        paths = [str(path) for path in files.values()]
+        if self.pool is None or len(paths) < 2:
+            return dict(zip(files, map(self.cache.get_entry, paths)))
+
+        # Callers usually run on the same I/O pool: the calling thread takes
+        # the first file and any file no worker has started yet, so waiting
+        # on the pool from inside it cannot deadlock
+        executor = self.pool.io_pool
+        futures = [executor.submit(self.cache.get_entry, path) for path in paths[1:]]
+        entries = [self.cache.get_entry(paths[0])]
+        for future, path in zip(futures, paths[1:]):
+            entries.append(self.cache.get_entry(path) if future.cancel() else future.result())
+        return dict(zip(files, entries))
+
+    def aggregate(self):
+        """
+        Time-sorted ledger of all accounts with an 'account' column and rollups.
+
+        The merged ledger is rebuilt only when one of the account ledgers changed.
+
+        Returns:
+            TradeLedger
+        """
+        return self.aggregate_entry()[0]
+
+    def aggregate_entry(self):
+        """
+        aggregate() together with its version token.
+
+        Returns:
+            Tuple (TradeLedger, version) where version changes whenever an account ledger does
+        """
+        entries = self.load_all()
+        key = tuple((account, entry.version) for account, entry in entries.items())
+        with self._lock:
+            if key == self._aggregate_key:
+                return self._aggregate, (ALL_ACCOUNTS, key)
+
+        ledger = TradeLedger.concat([entry.data for entry in entries.values()], accounts=list(entries))
+        ledger.rollups = RollupCube(ledger)
+        with self._lock:
+            self._aggregate_key = key
+            self._aggregate = ledger
+        return ledger, (ALL_ACCOUNTS, key)
+
+    def aggregate_state(self):
+        """
+        Version token and last modification of the aggregate, without building it.
+
+        Returns:
+            Tuple (version as returned by aggregate_entry, epoch seconds or None)
+        """
+        entries = self.load_all()
+        key = tuple((account, entry.version) for account, entry in entries.items())
+        mtimes = [entry.signature[0] for entry in entries.values() if entry.signature]
+        return (ALL_ACCOUNTS, key), max(mtimes) / 1e9 if mtimes else None
+
+    def accounts(self):
+        """
+        Overview of every known account.
+
+        Returns:
+            List of dictionaries with account id, file name and row counts
+        """
+        files = self.discover()
+        return [
+            {
+                'account': account,
+                'file': files[account].name,
+                'transactions': len(entry.data),
+                'trades': int(entry.data.trade_mask().sum()),
+                'version': entry.version
+            }
+            for account, entry in self.load_all(files).items()
+        ]
+
+
+def _mtime_ns(path):
+    """Modification time of a path in nanoseconds, or None if it is gone."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
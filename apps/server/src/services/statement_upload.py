@@ -0,0 +1,378 @@
+"""
+Statement uploads
+Streams uploaded MT4 statements to disk while hashing them, then parses
+them in the background and swaps the new ledger into the ledger cache
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from pathlib import Path
+from services.mt4_parser import load_ledger_checkpoint
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+UPLOAD_STATES = ('receiving', 'parsing', 'ready', 'failed')
+# Multipart field holding the statement (any file part is accepted when absent)
+UPLOAD_FIELD = 'file'
+# One path segment of an account id (see StatementRegistry.account_id)
+ACCOUNT_SEGMENT = re.compile(r'[A-Za-z0-9][A-Za-z0-9._-]*')
+PART_SUFFIX = '.part'
+
+
+class UploadError(ValueError):
+    """Raised for an upload that cannot be accepted (bad request)."""
+
+
+class UploadTooLarge(UploadError):
+    """Raised when an upload exceeds the configured size limit."""
+
+
+class UploadInProgress(UploadError):
+    """Raised when the target statement is already being replaced."""
+
+
+def validate_account(account, reserved=()):
+    """
+    Check an account id given for an upload.
+
+    Args:
+        account: Account id such as 'broker_a/1234567'
+        reserved: Ids that cannot be uploaded to (e.g. 'all')
+
+    Raises:
+        UploadError: If the id is not a relative path of plain name segments
+    """
+    segments = account.split('/')
+    if account in reserved or not all(ACCOUNT_SEGMENT.fullmatch(segment) for segment in segments):
+        raise UploadError(f"Invalid account id '{account}'")
+
+
+class StatementUpload:
+    """
+    Receiving side of one upload: writes chunks to a temporary file next to
+    the target and hashes them on the way, so memory stays bounded by the
+    chunk size. Accepts a raw body or multipart/form-data, whose statement
+    part is decoded with python-multipart's streaming parser.
+    """
+
+    def __init__(self, target, max_bytes, content_type=None, extensions=('.htm', '.html')):
+        """
+        Args:
+            target: Path the statement will replace
+            max_bytes: Largest accepted statement
+            content_type: Request Content-Type
+            extensions: Accepted extensions of a multipart file name
+        """
+        self.target = Path(target)
+        self.max_bytes = max_bytes
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.temp_path = self.target.with_name(f".{self.target.name}.{uuid.uuid4().hex}{PART_SUFFIX}")
+        self.size = 0
+        self.filename = None
+        self._hash = hashlib.sha256()
+        self.target.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.temp_path, 'wb')
+        self._parser = None
+        media_type, options = parse_options_header(content_type or '')
+        if media_type == b'multipart/form-data':
+            boundary = options.get(b'boundary')
+            if not boundary:
+                self.abort()
+                raise UploadError("Multipart upload without a boundary")
+            self._parser = self._multipart_parser(boundary)
+
+    def _multipart_parser(self, boundary):
+        state = {'headers': {}, 'field': b'', 'value': b'', 'active': False, 'done': False}
+
+        def on_part_begin():
+            state['headers'] = {}
+
+        def on_header_field(data, start, end):
+            state['field'] += data[start:end]
+
+        def on_header_value(data, start, end):
+            state['value'] += data[start:end]
+
+        def on_header_end():
+            state['headers'][state['field'].lower()] = state['value']
+            state['field'] = state['value'] = b''
+
+        def on_headers_finished():
+            _, options = parse_options_header(state['headers'].get(b'content-disposition', b''))
+            name = options.get(b'name', b'').decode('utf-8', 'replace')
+            filename = options.get(b'filename')
+            state['active'] = not state['done'] and (name == UPLOAD_FIELD or filename is not None)
+            if state['active'] and filename is not None:
+                self.filename = filename.decode('utf-8', 'replace')
+                if Path(self.filename).suffix.lower() not in self.extensions:
+                    raise UploadError(f"Unsupported file type '{self.filename}', expected one of {', '.join(self.extensions)}")
+
+        def on_part_data(data, start, end):
+            if state['active']:
+                self._write(data[start:end])
+
+        def on_part_end():
+            if state['active']:
+                state['active'] = False
+                state['done'] = True
+
+        return MultipartParser(boundary, {
+            'on_part_begin': on_part_begin,
+            'on_header_field': on_header_field,
+            'on_header_value': on_header_value,
+            'on_header_end': on_header_end,
+            'on_headers_finished': on_headers_finished,
+            'on_part_data': on_part_data,
+            'on_part_end': on_part_end,
+        })
+
+    def _write(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"Statement exceeds {self.max_bytes} bytes")
+        self._hash.update(data)
+        self._file.write(data)
+
+    def feed(self, chunk):
+        """
+        Write one chunk of the request body.
+
+        Raises:
+            UploadTooLarge: Once the statement exceeds max_bytes
+        """
+        if self._parser is not None:
+            self._parser.write(chunk)
+        else:
+            self._write(chunk)
+
+    def finish(self):
+        """
+        Flush the temporary file to disk.
+
+        Returns:
+            Tuple (temporary path, SHA-256 hex digest, size in bytes)
+
+        Raises:
+            UploadError: If the body held no statement
+        """
+        if self._parser is not None:
+            self._parser.finalize()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if not self.size:
+            self.abort()
+            raise UploadError("Upload contains no statement")
+        return self.temp_path, self._hash.hexdigest(), self.size
+
+    def abort(self):
+        """Close and delete the temporary file."""
+        self._file.close()
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
+
+
+class UploadJob:
+    """
+    Progress of one upload, from receiving through parsing to ready or failed.
+    """
+
+    def __init__(self, job_id, account, path, total_bytes=None):
+        self.id = job_id
+        self.account = account
+        self.path = str(path)
+        self.state = 'receiving'
+        self.received_bytes = 0
+        self.total_bytes = total_bytes
+        self.temp_path = None
+        self.digest = None
+        self.rows = None
+        self.version = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        # Bytes parsed so far, written by the parsing process; attached and
+        # closed under _progress_lock so progress() never reads a closed block
+        self._progress_memory = None
+        self._progress_lock = threading.Lock()
+
+    def progress(self):
+        """Completed share (0 to 1) of the current stage, or None if unknown."""
+        if self.state in ('ready', 'failed'):
+            return 1.0
+        if self.state == 'parsing':
+            with self._progress_lock:
+                memory = self._progress_memory
+                if memory is None or not self.received_bytes:
+                    return 0.0
+                parsed_bytes = int.from_bytes(memory.buf[:8], 'little')
+            return min(parsed_bytes / self.received_bytes, 1.0)
+        if self.total_bytes:
+            return min(self.received_bytes / self.total_bytes, 1.0)
+        return None
+
+    def to_dict(self):
+        progress = self.progress()
+        return {
+            'id': self.id,
+            'account': self.account,
+            'state': self.state,
+            'progress': round(progress, 4) if progress is not None else None,
+            'received_bytes': self.received_bytes,
+            'total_bytes': self.total_bytes,
+            'digest': self.digest,
+            'rows': self.rows,
+            'version': self.version,
+            'error': self.error,
+            'created': self.created,
+            'finished': self.finished,
+        }
+
+
+def parse_with_progress(file_path, progress_name):
+    """
+    load_ledger_checkpoint that reports its progress in a shared memory block.
+
+    Module-level so it can run in the process pool; the parent reads the
+    bytes parsed so far from the block named progress_name.
+
+    Returns:
+        Tuple (TradeLedger, rows_end)
+    """
+    memory = shared_memory.SharedMemory(name=progress_name)
+    try:
+        def report(parsed_bytes):
+            memory.buf[:8] = parsed_bytes.to_bytes(8, 'little')
+        return load_ledger_checkpoint(file_path, engine='stream', progress=report)
+    finally:
+        memory.close()
+
+
+class UploadManager:
+    """
+    Tracks uploads and ingests finished ones.
+
+    Ingest parses the temporary file (in the process pool through the
+    parse callable), then hands it to LedgerCache.install, which renames
+    it over the statement and swaps the new ledger in under the cache
+    lock: readers are served the previous ledger until that moment and
+    never wait for the parse. At most one upload per statement path runs
+    at a time; the last history_size jobs are kept for status queries.
+    """
+
+    def __init__(self, cache, parse=parse_with_progress, history_size=32):
+        """
+        Args:
+            cache: LedgerCache to install parsed statements into
+            parse: Callable(file_path, progress_name) returning (TradeLedger, rows_end)
+            history_size: Finished jobs kept for status queries
+        """
+        self.cache = cache
+        self.parse = parse
+        self.history_size = history_size
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._active_paths = set()
+        self.completed = 0
+        self.failed = 0
+
+    def begin(self, account, path, total_bytes=None):
+        """
+        Register a new upload for a statement path.
+
+        Raises:
+            UploadInProgress: If another upload of the same path is not finished
+        """
+        key = os.path.abspath(str(path))
+        with self._lock:
+            if key in self._active_paths:
+                raise UploadInProgress(f"Statement for account '{account}' is already being replaced")
+            self._active_paths.add(key)
+            job = UploadJob(uuid.uuid4().hex, account, key, total_bytes)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history_size:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.state not in ('ready', 'failed'):
+                    break
+                self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id):
+        """Job by id, or None."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def received(self, job, temp_path, digest, size):
+        """Mark a job's body as fully written."""
+        job.temp_path, job.digest, job.received_bytes = str(temp_path), digest, size
+        job.state = 'parsing'
+
+    def fail(self, job, error):
+        """Mark a job as failed and release its statement path."""
+        job.state = 'failed'
+        job.error = str(error)
+        self._finish(job, failed=True)
+
+    def _finish(self, job, failed=False):
+        job.finished = time.time()
+        with self._lock:
+            self._active_paths.discard(job.path)
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def ingest(self, job):
+        """
+        Parse a received upload and install it as the account's statement (blocking).
+
+        A statement without any transaction is rejected rather than
+        replacing the existing one.
+        """
+        memory = shared_memory.SharedMemory(create=True, size=8)
+        with job._progress_lock:
+            job._progress_memory = memory
+        try:
+            # A statement seen before (same digest) is mapped from its snapshot instead of parsed
+            snapshot = self.cache.snapshots.load(job.digest) if self.cache.snapshots is not None else None
+            ledger, rows_end = snapshot if snapshot is not None else self.parse(job.temp_path, memory.name)
+            if not len(ledger):
+                raise UploadError("No transactions found in the statement")
+            entry = self.cache.install(job.path, job.temp_path, ledger, job.digest, rows_end)
+            job.rows = len(ledger)
+            job.version = entry.version
+            job.state = 'ready'
+            print(f"Installed uploaded statement {job.path}: {job.rows} transactions")
+            self._finish(job)
+        except Exception as e:
+            print(f"Error ingesting upload {job.id}: {e}")
+            try:
+                os.remove(job.temp_path)
+            except OSError:
+                pass
+            self.fail(job, e)
+        finally:
+            with job._progress_lock:
+                job._progress_memory = None
+                memory.close()
+            memory.unlink()
+
+    def stats(self):
+        """Upload counters."""
+        with self._lock:
+            return {
+                'active': len(self._active_paths),
+                'completed': self.completed,
+                'failed': self.failed,
+            }
@@ -0,0 +1,162 @@
+"""
+Per-symbol index over a time-sorted TradeLedger
+Row positions and prefix sums grouped by instrument for range breakdowns
+"""
+
+import numpy as np
+from services.ledger import NO_TIME, _bound_to_epoch
+
+
+class SymbolIndex:
+    """
+    Buy/sell rows grouped by symbol, time-sorted within each symbol.
+
+    rows holds ledger row positions ordered by (symbol, time), and
+    offsets[i]:offsets[i + 1] is the run of symbol codes[i]. Every metric
+    is stored as a prefix sum in the same order, so a per-symbol breakdown
+    for any date range costs two binary searches per symbol (vectorized
+    over a composite symbol/time key) and one subtraction per metric,
+    without touching the rows themselves.
+    """
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+        trades = np.flatnonzero(ledger.trade_mask())
+        order = trades[np.argsort(ledger['symbol'][trades], kind='stable')]
+        self.rows = order
+
+        codes = ledger['symbol'][order]
+        first = np.flatnonzero(np.diff(codes, prepend=-1))
+        self.codes = codes[first]
+        self.offsets = np.append(first, len(order)).astype(np.int64)
+
+        # Composite (symbol rank, time) key: rank * span + time - time_min + 1, 0 for rows without time
+        times = ledger['time'][order]
+        timed = times != NO_TIME
+        self.time_min = int(times[timed].min()) if timed.any() else 0
+        self.span = (int(times[timed].max()) - self.time_min + 2) if timed.any() else 2
+        ranks = np.repeat(np.arange(len(self.codes), dtype=np.int64), np.diff(self.offsets))
+        self.keys = ranks * self.span + np.where(timed, times - self.time_min + 1, 0)
+
+        self.prefix = {}
+        for name, values in self._metric_columns(ledger, order).items():
+            prefix = np.zeros(len(order) + 1, dtype=np.float64)
+            np.cumsum(values, out=prefix[1:])
+            self.prefix[name] = prefix
+
+    @staticmethod
+    def _metric_columns(ledger, order):
+        profit = ledger['profit'][order]
+        opened = ledger['time'][order]
+        closed = ledger['close_time'][order]
+        held = (opened != NO_TIME) & (closed != NO_TIME)
+        buy_code = ledger.categories['type'].index('buy') if 'buy' in ledger.categories['type'] else -1
+        longs = ledger['type'][order] == buy_code
+        return {
+            'trades': np.ones(len(order)),
+            'pnl': profit,
+            'volume': ledger['size'][order],
+            'wins': (profit > 0).astype(np.float64),
+            'losses': (profit < 0).astype(np.float64),
+            'fees': ledger['commission'][order] + ledger['taxes'][order],
+            'swap': ledger['swap'][order],
+            'long_trades': longs.astype(np.float64),
+            'long_pnl': np.where(longs, profit, 0.0),
+            'hold_seconds': np.where(held, closed - opened, 0).astype(np.float64),
+            'closed_trades': held.astype(np.float64),
+        }
+
+    def rows_for(self, symbol):
+        """
+        Ledger row positions of one symbol's trades, in time order.
+
+        Returns:
+            int64 NumPy array (empty for an unknown symbol)
+        """
+        categories = self.ledger.categories['symbol']
+        if symbol not in categories:
+            return self.rows[:0]
+        found = np.flatnonzero(self.codes == categories.index(symbol))
+        if not len(found):
+            return self.rows[:0]
+        return self.rows[self.offsets[found[0]]:self.offsets[found[0] + 1]]
+
+    def range_bounds(self, from_date=None, to_date=None):
+        """
+        Per-symbol [lo, hi) positions in rows for a date range.
+
+        Same semantics as TradeLedger.date_range_slice: when a bound is given,
+        rows without a time are excluded.
+
+        Returns:
+            Tuple of int64 arrays (lo, hi), one entry per symbol in codes
+        """
+        if from_date is None and to_date is None:
+            return self.offsets[:-1], self.offsets[1:]
+        base = np.arange(len(self.codes), dtype=np.int64) * self.span
+        start = 1 if from_date is None else min(max(_bound_to_epoch(from_date) - self.time_min + 1, 1), self.span)
+        end = self.span - 1 if to_date is None else min(
+            max(_bound_to_epoch(to_date, end_of_day=True) - self.time_min + 1, 0), self.span - 1
+        )
+        lo = np.searchsorted(self.keys, base + start, side='left')
+        hi = np.searchsorted(self.keys, base + end, side='right')
+        return lo, np.maximum(lo, hi)
+
+    def breakdown(self, from_date=None, to_date=None):
+        """
+        Per-symbol statistics for a date range.
+
+        Args:
+            from_date: Start date (format: 'YYYY.MM.DD')
+            to_date: End date (format: 'YYYY.MM.DD')
+
+        Returns:
+            List of dictionaries, one per symbol with trades in the range, sorted by symbol
+        """
+        lo, hi = self.range_bounds(from_date, to_date)
+        totals = {name: prefix[hi] - prefix[lo] for name, prefix in self.prefix.items()}
+        trades = np.rint(totals['trades']).astype(np.int64)
+        wins = np.rint(totals['wins']).astype(np.int64)
+        longs = np.rint(totals['long_trades']).astype(np.int64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            win_rate = np.where(trades > 0, wins / trades * 100, 0.0)
+            hold_hours = np.where(totals['closed_trades'] > 0, totals['hold_seconds'] / totals['closed_trades'] / 3600, 0.0)
+
+        symbols = self.ledger.categories['symbol']
+        results = [
+            {
+                'symbol': symbols[code],
+                'trades': count,
+                'pnl': pnl,
+                'volume': volume,
+                'winning_trades': win_count,
+                'losing_trades': loss_count,
+                'win_rate': rate,
+                'fees': fees,
+                'swap': swap,
+                'net_pnl': net,
+                'avg_hold_hours': hold,
+                'long_trades': long_count,
+                'short_trades': count - long_count,
+                'long_pnl': long_pnl,
+                'short_pnl': short_pnl,
+            }
+            for code, count, pnl, volume, win_count, loss_count, rate, fees, swap, net, hold, long_count, long_pnl, short_pnl in zip(
+                self.codes.tolist(),
+                trades.tolist(),
+                np.round(totals['pnl'], 2).tolist(),
+                np.round(totals['volume'], 2).tolist(),
+                wins.tolist(),
+                np.rint(totals['losses']).astype(np.int64).tolist(),
+                np.round(win_rate, 2).tolist(),
+                np.round(totals['fees'], 2).tolist(),
+                np.round(totals['swap'], 2).tolist(),
+                np.round(totals['pnl'] + totals['fees'] + totals['swap'], 2).tolist(),
+                np.round(hold_hours, 2).tolist(),
+                longs.tolist(),
+                np.round(totals['long_pnl'], 2).tolist(),
+                np.round(totals['pnl'] - totals['long_pnl'], 2).tolist(),
+            )
+            if count
+        ]
+        return sorted(results, key=lambda result: result['symbol'])
@@ -1,9 +1,23 @@
-from typing import List, Dict, Optional
-import matplotlib.pyplot as plt
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
+from __future__ import annotations
+from typing import List, Dict, Optional, TYPE_CHECKING
+import hashlib
+import io
+import json
 import os
+import tempfile
+import threading
+from config import STATIC_CHARTS_DIR
+
+# matplotlib, pandas and plotly are imported inside the functions that use
+# them: importing this module must not load the plotting stacks
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Shared plotly.js bundle that every chart spec is drawn with (see services.chart_cache)
+PLOTLY_JS_URL = '/static/js/plotly.min.js'
+
+# pyplot keeps global state and is not thread-safe
+_pyplot_lock = threading.Lock()
 
 def generate_visualizations(analysis_data: Dict, period: str = "monthly") -> Dict:
     """
@@ -14,8 +28,11 @@ def generate_visualizations(analysis_data: Dict, period: str = "monthly") -> Dic
         period: Time period for analysis ('yearly', 'monthly', 'weekly', 'daily')
         
     Returns:
-        Dictionary with visualization HTML and data
+        Dictionary with Plotly figure specs (JSON-compatible dicts drawn with PLOTLY_JS_URL)
     """
+    import pandas as pd
+    import plotly.graph_objects as go
+
     visualizations = {}
     
     try:
@@ -38,8 +55,9 @@ def generate_visualizations(analysis_data: Dict, period: str = "monthly") -> Dic
                     yaxis_title='Profit',
                     hovermode='x unified'
                 )
-                visualizations['profit_chart'] = fig.to_html(div_id="profit_chart")
+                visualizations['profit_chart'] = json.loads(fig.to_json())
         
+        visualizations['plotly_js'] = PLOTLY_JS_URL
         visualizations['success'] = True
     except Exception as e:
         print(f"Error generating visualizations: {e}")
@@ -48,54 +66,84 @@ def generate_visualizations(analysis_data: Dict, period: str = "monthly") -> Dic
     
     return visualizations
 
+def _pyplot():
+    """matplotlib.pyplot, imported on first use."""
+    import matplotlib.pyplot as plt
+    return plt
+
+def _save_chart(name: str) -> str:
+    """
+    Save the current pyplot figure under a content-hashed name and close it.
+    
+    The file is written to a temporary name and renamed into place, so
+    concurrent requests never see a partial image.
+    
+    Returns:
+        Path of the PNG relative to the server root ('static/charts/<name>-<hash>.png')
+    """
+    plt = _pyplot()
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format='png')
+    plt.close()
+    data = buffer.getvalue()
+    filename = f"{name}-{hashlib.sha256(data).hexdigest()[:16]}.png"
+    target = STATIC_CHARTS_DIR / filename
+    if not target.exists():
+        STATIC_CHARTS_DIR.mkdir(parents=True, exist_ok=True)
+        descriptor, staging = tempfile.mkstemp(prefix=f".{filename}.", dir=STATIC_CHARTS_DIR)
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(data)
+        os.replace(staging, target)
+    return f'static/charts/{filename}'
+
 def generate_yearly_visualization(data: pd.DataFrame) -> str:
     yearly_data = data.resample('Y').sum()
-    plt.figure(figsize=(10, 6))
-    plt.plot(yearly_data.index, yearly_data['profit'], marker='o')
-    plt.title('Yearly Profit Visualization')
-    plt.xlabel('Year')
-    plt.ylabel('Profit')
-    plt.grid()
-    plt.savefig('static/charts/yearly_profit.png')
-    plt.close()
-    return 'static/charts/yearly_profit.png'
+    with _pyplot_lock:
+        plt = _pyplot()
+        plt.figure(figsize=(10, 6))
+        plt.plot(yearly_data.index, yearly_data['profit'], marker='o')
+        plt.title('Yearly Profit Visualization')
+        plt.xlabel('Year')
+        plt.ylabel('Profit')
+        plt.grid()
+        return _save_chart('yearly_profit')
 
 def generate_monthly_visualization(data: pd.DataFrame) -> str:
     monthly_data = data.resample('M').sum()
-    plt.figure(figsize=(10, 6))
-    plt.bar(monthly_data.index, monthly_data['profit'], color='skyblue')
-    plt.title('Monthly Profit Visualization')
-    plt.xlabel('Month')
-    plt.ylabel('Profit')
-    plt.xticks(rotation=45)
-    plt.grid()
-    plt.savefig('static/charts/monthly_profit.png')
-    plt.close()
-    return 'static/charts/monthly_profit.png'
+    with _pyplot_lock:
+        plt = _pyplot()
+        plt.figure(figsize=(10, 6))
+        plt.bar(monthly_data.index, monthly_data['profit'], color='skyblue')
+        plt.title('Monthly Profit Visualization')
+        plt.xlabel('Month')
+        plt.ylabel('Profit')
+        plt.xticks(rotation=45)
+        plt.grid()
+        return _save_chart('monthly_profit')
 
 def generate_weekly_visualization(data: pd.DataFrame) -> str:
     weekly_data = data.resample('W').sum()
-    plt.figure(figsize=(10, 6))
-    plt.plot(weekly_data.index, weekly_data['profit'], marker='x', color='orange')
-    plt.title('Weekly Profit Visualization')
-    plt.xlabel('Week')
-    plt.ylabel('Profit')
-    plt.grid()
-    plt.savefig('static/charts/weekly_profit.png')
-    plt.close()
-    return 'static/charts/weekly_profit.png'
+    with _pyplot_lock:
+        plt = _pyplot()
+        plt.figure(figsize=(10, 6))
+        plt.plot(weekly_data.index, weekly_data['profit'], marker='x', color='orange')
+        plt.title('Weekly Profit Visualization')
+        plt.xlabel('Week')
+        plt.ylabel('Profit')
+        plt.grid()
+        return _save_chart('weekly_profit')
 
 def generate_daily_visualization(data: pd.DataFrame) -> str:
     daily_data = data.resample('D').sum()
-    plt.figure(figsize=(10, 6))
-    plt.plot(daily_data.index, daily_data['profit'], marker='s', color='green')
-    plt.title('Daily Profit Visualization')
-    plt.xlabel('Day')
-    plt.ylabel('Profit')
-    plt.grid()
-    plt.savefig('static/charts/daily_profit.png')
-    plt.close()
-    return 'static/charts/daily_profit.png'
+    with _pyplot_lock:
+        plt = _pyplot()
+        plt.figure(figsize=(10, 6))
+        plt.plot(daily_data.index, daily_data['profit'], marker='s', color='green')
+        plt.title('Daily Profit Visualization')
+        plt.xlabel('Day')
+        plt.ylabel('Profit')
+        plt.grid()
+        return _save_chart('daily_profit')
 
 def clear_old_charts():
     chart_directory = 'static/charts/'
@@ -0,0 +1,60 @@
+"""
+Background warm-up
+Imports the lazily loaded scientific/plotting stacks and parses the
+default statement after the server has started accepting requests
+"""
+
+import importlib
+import threading
+import time
+
+# Modules that are imported on first use and are slow to load
+HEAVY_MODULES = ('pandas', 'matplotlib.pyplot', 'plotly.graph_objects', 'bs4')
+
+
+def warm_up(modules=HEAVY_MODULES, loaders=()):
+    """
+    Import modules and run loader callables, timing each step.
+
+    Failures are printed and skipped: a missing optional package must not
+    keep the rest from warming up.
+
+    Args:
+        modules: Module names to import
+        loaders: Callables to run afterwards (e.g. loading the default ledger)
+
+    Returns:
+        Dictionary {step name: seconds}
+    """
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"Warm-up: could not import {name}: {e}")
+            continue
+        timings[name] = round(time.perf_counter() - start, 4)
+    for loader in loaders:
+        name = getattr(getattr(loader, 'func', loader), '__name__', repr(loader))
+        start = time.perf_counter()
+        try:
+            loader()
+        except Exception as e:
+            print(f"Warm-up: {name} failed: {e}")
+            continue
+        timings[name] = round(time.perf_counter() - start, 4)
+    print(f"Warm-up done: {timings}")
+    return timings
+
+
+def start_background_warmup(modules=HEAVY_MODULES, loaders=()):
+    """
+    Run warm_up() in a daemon thread so startup and requests never wait for it.
+
+    Returns:
+        The started threading.Thread
+    """
+    thread = threading.Thread(target=warm_up, args=(modules, loaders), name='warm-up', daemon=True)
+    thread.start()
+    return thread
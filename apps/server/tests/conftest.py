@@ -0,0 +1,49 @@
+"""
+Shared test fixtures
+Puts src and the statement generator on sys.path and writes small
+synthetic MT4 statements
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SERVER_DIR / "src"))
+sys.path.insert(0, str(SERVER_DIR / "benchmarks"))
+
+from generate_statement import write_statement  # noqa: E402
+
+# Read by config when api.routes is imported: no snapshots, watcher or chart pre-rendering
+os.environ.setdefault("SNAPSHOTS_ENABLED", "0")
+os.environ.setdefault("WATCH_INTERVAL", "0")
+os.environ.setdefault("CHART_PRERENDER", "0")
+
+
+@pytest.fixture(scope="session")
+def statement(tmp_path_factory):
+    """Path of a 2,000-row synthetic statement (the same rows on every run)."""
+    return str(write_statement(tmp_path_factory.mktemp("statements") / "statement.htm", 2000))
+
+
+@pytest.fixture
+def make_statement(tmp_path):
+    """Factory writing a synthetic statement into the test's own directory."""
+    def make(rows, seed=1, name="statement.htm"):
+        return str(write_statement(tmp_path / name, rows, seed))
+    return make
+
+
+@pytest.fixture(scope="session")
+def client(statement):
+    """TestClient of the app, serving the session statement as the main account."""
+    from fastapi.testclient import TestClient
+    import api.routes as routes
+    from api.application import app
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(routes, "MT4_EXPORT_FILE", statement)
+        with TestClient(app) as client:
+            yield client
@@ -0,0 +1,59 @@
+"""
+Tests for the vectorized period analysis
+Results must match the pandas groupby the analyzer replaced
+"""
+
+import pandas as pd
+import pytest
+
+from services.data_analyzer import analyze_trade_data
+from services.mt4_parser import load_ledger, parse_trade_data
+
+PANDAS_PERIODS = {'yearly': 'Y', 'monthly': 'M', 'weekly': 'W', 'daily': 'D'}
+
+
+def _pandas_analysis(records, period):
+    """The original implementation: one DataFrame groupby per request."""
+    df = pd.DataFrame(records)
+    df['date'] = pd.to_datetime(df['open_time'], format='%Y.%m.%d %H:%M:%S', errors='coerce')
+    results = [
+        {
+            'period': str(key),
+            'profit': group['profit'].sum(),
+            'volume': group['size'].sum(),
+            'trades': len(group),
+            'wins': int((group['profit'] > 0).sum()),
+            'losses': int((group['profit'] < 0).sum()),
+        }
+        for key, group in df.groupby(df['date'].dt.to_period(PANDAS_PERIODS[period]))
+    ]
+    return df['profit'].sum(), df['size'].sum(), len(df), results
+
+
+@pytest.mark.parametrize("period", list(PANDAS_PERIODS))
+def test_periods_match_pandas_groupby(statement, period):
+    total_profit, total_volume, total_trades, expected = _pandas_analysis(parse_trade_data(statement), period)
+
+    result = analyze_trade_data(load_ledger(statement), period)
+
+    assert result['period'] == period
+    assert result['total_profit'] == pytest.approx(total_profit)
+    assert result['total_volume'] == pytest.approx(total_volume)
+    assert result['total_trades'] == total_trades
+    assert [row['period'] for row in result['results']] == [row['period'] for row in expected]
+    for row, reference in zip(result['results'], expected):
+        assert row['trades'] == reference['trades']
+        assert row['wins'] == reference['wins']
+        assert row['losses'] == reference['losses']
+        assert row['profit'] == pytest.approx(reference['profit'])
+        assert row['volume'] == pytest.approx(reference['volume'])
+
+
+def test_record_lists_are_analyzed_like_ledgers(statement):
+    records = parse_trade_data(statement)
+
+    assert analyze_trade_data(records, 'weekly') == analyze_trade_data(load_ledger(statement), 'weekly')
+
+
+def test_empty_input_has_no_results():
+    assert analyze_trade_data([], 'monthly') == {'total_profit': 0, 'total_volume': 0, 'trades': [], 'period': 'monthly'}
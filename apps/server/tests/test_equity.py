@@ -0,0 +1,81 @@
+"""
+Tests for the equity curve engine and LTTB downsampling
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from services.equity import EquityCurve, lttb_indices
+from services.mt4_parser import load_ledger, parse_trade_data
+
+
+def _reference_lttb(x, y, threshold):
+    """Steinarsson's Largest-Triangle-Three-Buckets, one point at a time."""
+    count = len(x)
+    every = (count - 2) / (threshold - 2)
+    kept = [0]
+    previous = 0
+    for bucket in range(threshold - 2):
+        next_start = math.floor((bucket + 1) * every) + 1
+        next_stop = min(math.floor((bucket + 2) * every) + 1, count)
+        next_x = sum(x[next_start:next_stop]) / (next_stop - next_start)
+        next_y = sum(y[next_start:next_stop]) / (next_stop - next_start)
+        best, best_area = None, -1.0
+        for i in range(math.floor(bucket * every) + 1, math.floor((bucket + 1) * every) + 1):
+            area = abs((x[previous] - next_x) * (y[i] - y[previous]) - (x[previous] - x[i]) * (next_y - y[previous]))
+            if area > best_area:
+                best, best_area = i, area
+        kept.append(best)
+        previous = best
+    return kept + [count - 1]
+
+
+@pytest.mark.parametrize("count,threshold", [(1000, 3), (1000, 50), (1001, 333), (5000, 999)])
+def test_lttb_matches_reference(count, threshold):
+    rng = np.random.default_rng(count + threshold)
+    x = np.cumsum(rng.integers(1, 600, count)).astype(np.float64)
+    y = np.cumsum(rng.normal(0, 10, count))
+
+    assert lttb_indices(x, y, threshold).tolist() == _reference_lttb(x.tolist(), y.tolist(), threshold)
+
+
+def test_lttb_keeps_short_series_and_rejects_tiny_budgets():
+    assert lttb_indices([1, 2, 3], [1, 2, 3], 10).tolist() == [0, 1, 2]
+    with pytest.raises(ValueError):
+        lttb_indices([1, 2, 3], [1, 2, 3], 2)
+
+
+def test_curve_matches_running_balance(statement):
+    events = []
+    for row in parse_trade_data(statement):
+        if row['type'] == 'balance':
+            events.append((row['date'], row['amount']))
+        else:
+            events.append((row['close_time'], row['profit'] + row['commission'] + row['taxes'] + row['swap']))
+    # MT4 timestamps sort chronologically as strings; sorted() is stable like the engine
+    events.sort(key=lambda event: event[0])
+    balance = peak = worst = 0.0
+    for _, change in events:
+        balance += change
+        peak = max(peak, balance)
+        worst = max(worst, peak - balance)
+
+    curve = EquityCurve.from_ledger(load_ledger(statement))
+    summary = curve.summary()
+
+    assert len(curve) == len(events)
+    assert summary['final_balance'] == round(balance, 2)
+    assert summary['peak_balance'] == round(peak, 2)
+    assert summary['max_drawdown'] == pytest.approx(round(worst, 2), abs=0.011)
+
+
+def test_points_are_downsampled_within_the_range(statement):
+    curve = EquityCurve.from_ledger(load_ledger(statement))
+
+    points = curve.points(max_points=200, from_date='2015.01.12', to_date='2015.01.31')
+
+    assert len(points) == 200
+    assert all('2015.01.12' <= point['time'][:10] <= '2015.01.31' for point in points)
+    assert points == sorted(points, key=lambda point: point['time'])
@@ -0,0 +1,47 @@
+"""
+Tests for the worker pools' back-pressure and request coalescing
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from services.executor import PoolSaturated, WorkerPool
+
+
+def test_cancelled_waiter_keeps_the_job_counted():
+    pool = WorkerPool(io_workers=2, max_pending=2)
+    release = threading.Event()
+
+    async def scenario():
+        waiter = asyncio.create_task(pool.run_io(release.wait, key='slow'))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        # The job is still running: it holds its slot and new callers join it
+        assert pool.pending == 1
+        joined = asyncio.create_task(pool.run_io(release.wait, key='slow'))
+        await asyncio.sleep(0.05)
+        assert pool.coalesced == 1 and pool.pending == 1
+
+        blocker = asyncio.create_task(pool.run_io(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(PoolSaturated):
+            await pool.run_io(release.wait)
+
+        release.set()
+        assert await joined is True and await blocker is True
+        await asyncio.sleep(0)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        pool.shutdown()
+
+    assert pool.stats()['pending'] == 0
+    assert pool.stats()['rejected'] == 1
+    assert pool._inflight == {}
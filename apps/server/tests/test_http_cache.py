@@ -0,0 +1,137 @@
+"""
+Tests for conditional GETs and response compression
+"""
+
+import gzip
+import shutil
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from api.http_cache import CompressionMiddleware
+
+
+def test_matching_etag_is_answered_with_304(client):
+    response = client.get('/api/summary?from_date=2015.01.12')
+    etag = response.headers['etag']
+
+    cached = client.get('/api/summary?from_date=2015.01.12', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert cached.status_code == 304
+    assert cached.content == b''
+    assert cached.headers['etag'] == etag
+
+
+def test_etag_depends_on_the_query(client):
+    first = client.get('/api/summary?from_date=2015.01.12').headers['etag']
+    second = client.get('/api/summary?from_date=2015.01.13').headers['etag']
+
+    assert first != second
+    assert client.get('/api/summary?from_date=2015.01.13', headers={'If-None-Match': first}).status_code == 200
+
+
+def test_last_modified_is_answered_with_304(client):
+    last_modified = client.get('/api/trades?limit=5').headers['last-modified']
+
+    assert client.get('/api/trades?limit=5', headers={'If-Modified-Since': last_modified}).status_code == 304
+
+
+def test_account_list_is_revalidated_when_statements_change(client, tmp_path, statement, monkeypatch):
+    import api.routes as routes
+
+    monkeypatch.setattr(routes.registry, 'exports_dir', tmp_path)
+    monkeypatch.setattr(routes.registry, '_scan', None)
+    shutil.copy(statement, tmp_path / 'a.htm')
+    etag = client.get('/api/accounts').headers['etag']
+    assert client.get('/api/accounts', headers={'If-None-Match': etag}).status_code == 304
+
+    shutil.copy(statement, tmp_path / 'b.htm')
+    response = client.get('/api/accounts', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert [account['account'] for account in response.json()['data']] == ['a', 'b']
+
+
+def test_chart_urls_are_not_revalidated(client, monkeypatch):
+    import api.routes as routes
+
+    monkeypatch.setattr(routes.chart_cache, 'max_entries', 1)
+    first = client.get('/api/charts/profit')
+    client.get('/api/charts/equity')  # evicts the profit spec and deletes its file
+    again = client.get('/api/charts/profit', headers={'If-None-Match': '*'})
+
+    assert 'etag' not in first.headers
+    assert again.status_code == 200
+    assert client.get(again.json()['url']).status_code == 200
+
+
+def test_large_responses_are_compressed(client):
+    response = client.get('/api/trades?limit=500', headers={'Accept-Encoding': 'gzip'})
+    plain = client.get('/api/trades?limit=500', headers={'Accept-Encoding': 'identity'})
+
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['vary']
+    assert int(response.headers['content-length']) < len(plain.content)
+    assert response.json() == plain.json()
+    assert 'content-encoding' not in plain.headers
+
+
+@pytest.fixture
+def compressed_app():
+    def chunks():
+        for i in range(50):
+            yield f'chunk {i} ' * 200
+
+    app = Starlette(routes=[
+        Route('/small', lambda request: PlainTextResponse('ok')),
+        Route('/large', lambda request: PlainTextResponse('x' * 100000)),
+        Route('/stream', lambda request: StreamingResponse(chunks(), media_type='text/plain')),
+        Route('/events', lambda request: StreamingResponse(iter(['data: 1\n\n'] * 200), media_type='text/event-stream')),
+    ])
+    app.add_middleware(CompressionMiddleware, minimum_size=500, thread_minimum_size=10000)
+    return TestClient(app), ''.join(chunks())
+
+
+def test_compression_middleware(compressed_app):
+    client, streamed = compressed_app
+    headers = {'Accept-Encoding': 'gzip'}
+
+    small = client.get('/small', headers=headers)
+    large = client.get('/large', headers=headers)
+    stream = client.get('/stream', headers=headers)
+    events = client.get('/events', headers=headers)
+
+    assert 'content-encoding' not in small.headers and small.text == 'ok'
+    assert large.headers['content-encoding'] == 'gzip' and large.text == 'x' * 100000
+    assert int(large.headers['content-length']) < 1000
+    assert stream.headers['content-encoding'] == 'gzip' and stream.text == streamed
+    assert 'content-length' not in stream.headers
+    assert 'content-encoding' not in events.headers
+
+
+def test_compression_middleware_writes_valid_gzip(compressed_app):
+    client, _ = compressed_app
+
+    with client.stream('GET', '/large', headers={'Accept-Encoding': 'gzip'}) as response:
+        raw = b''.join(response.iter_raw())
+
+    assert gzip.decompress(raw) == b'x' * 100000
+
+
+def test_brotli_is_preferred_when_installed(compressed_app):
+    brotli = pytest.importorskip('brotli')
+    client, streamed = compressed_app
+    headers = {'Accept-Encoding': 'gzip, br'}
+
+    with client.stream('GET', '/large', headers=headers) as response:
+        raw = b''.join(response.iter_raw())
+    stream = client.get('/stream', headers=headers)
+
+    assert response.headers['content-encoding'] == 'br'
+    assert int(response.headers['content-length']) == len(raw)
+    assert brotli.decompress(raw) == b'x' * 100000
+    assert stream.headers['content-encoding'] == 'br' and stream.text == streamed
@@ -0,0 +1,64 @@
+"""
+Tests for the single-request profiler
+"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from api.instrumentation import MetricsMiddleware
+
+
+async def _events(request):
+    async def stream():
+        while True:
+            yield 'data: tick\n\n'
+            await asyncio.sleep(0.01)
+
+    return StreamingResponse(stream(), media_type='text/event-stream')
+
+
+async def _slow(request):
+    await asyncio.sleep(30)
+    return PlainTextResponse('late')
+
+
+@pytest.fixture
+def client():
+    app = Starlette(routes=[
+        Route('/ok', lambda request: PlainTextResponse('ok')),
+        Route('/events', _events),
+        Route('/slow', _slow),
+    ])
+    app.add_middleware(MetricsMiddleware, profiling=True, profile_interval=0.001, profile_timeout=0.5)
+    return TestClient(app)
+
+
+def test_profile_replaces_the_response(client):
+    response = client.get('/ok?profile=1')
+
+    assert response.status_code == 200
+    assert response.headers['x-profiled-status'] == '200'
+    assert response.text.startswith('GET /ok -> 200\n')
+    assert client.get('/ok').text == 'ok'
+
+
+def test_event_streams_are_profiled_until_they_start(client):
+    started = time.monotonic()
+    response = client.get('/events?profile=1')
+
+    assert time.monotonic() - started < 0.5
+    assert response.text.startswith('GET /events -> 200 (event stream')
+
+
+def test_slow_requests_are_cancelled_and_release_the_profiler(client):
+    response = client.get('/slow', headers={'X-Profile': '1'})
+
+    assert response.status_code == 200
+    assert response.text.startswith('GET /slow -> 500 (cancelled after 0.5s)')
+    assert client.get('/ok?profile=1').status_code == 200
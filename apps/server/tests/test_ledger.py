@@ -0,0 +1,61 @@
+"""
+Tests for the columnar TradeLedger
+Vectorized results must match the list-of-dicts implementations
+"""
+
+import pytest
+
+from services.ledger import TradeLedger
+from services.mt4_parser import extract_trade_info, filter_by_date_range, parse_trade_data
+from services.rollups import RollupCube
+
+DATE_RANGES = [
+    (None, None),
+    ('2015.01.20', None),
+    (None, '2015.02.10'),
+    ('2015.01.12', '2015.01.31'),
+    ('2015.01.15', '2015.01.15'),
+    ('2030.01.01', None),
+]
+
+
+@pytest.fixture(scope="module")
+def records(statement):
+    return parse_trade_data(statement, engine='stream')
+
+
+@pytest.mark.parametrize("from_date,to_date", DATE_RANGES)
+def test_summary_matches_extract_trade_info(records, from_date, to_date):
+    ledger = TradeLedger.from_records(records)
+
+    assert ledger.summary(from_date, to_date) == extract_trade_info(records, from_date, to_date)
+
+
+def test_records_round_trip(records):
+    ledger = TradeLedger.from_records(records)
+
+    assert len(ledger) == len(records)
+    assert ledger.to_records() == records
+
+
+def test_rows_are_sorted_by_time(records):
+    ledger = TradeLedger.from_records(records[::-1])
+
+    times = ledger['time']
+    assert (times[:-1] <= times[1:]).all()
+    assert ledger.summary() == extract_trade_info(records)
+
+
+@pytest.mark.parametrize("from_date,to_date", DATE_RANGES)
+def test_date_range_matches_record_filter(records, from_date, to_date):
+    ledger = TradeLedger.from_records(records)
+
+    assert ledger.filter_by_date_range(from_date, to_date).to_records() == filter_by_date_range(records, from_date, to_date)
+
+
+@pytest.mark.parametrize("from_date,to_date", DATE_RANGES)
+def test_rollup_summary_matches_extract_trade_info(records, from_date, to_date):
+    ledger = TradeLedger.from_records(records)
+    ledger.rollups = RollupCube(ledger)
+
+    assert ledger.summary(from_date, to_date) == extract_trade_info(records, from_date, to_date)
@@ -0,0 +1,78 @@
+"""
+Tests for incremental re-ingest in the ledger cache
+Whatever path a reload takes, the cached ledger must equal a full parse
+"""
+
+import os
+
+import pytest
+
+from generate_statement import FOOTER, HEADER, generate_rows
+from services.ledger_cache import LedgerCache
+from services.mt4_parser import load_ledger
+
+ROWS = list(generate_rows(1500, seed=3))
+
+
+def _write(path, rows, mtime):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(HEADER + ''.join(rows) + FOOTER)
+    # Distinct mtimes, so every rewrite is seen by the stat check
+    os.utime(path, (mtime, mtime))
+
+
+def _assert_full_parse(ledger, path):
+    expected = load_ledger(str(path), engine='stream')
+    assert ledger.to_records() == expected.to_records()
+    assert ledger.summary() == expected.summary()
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / 'statement.htm'
+    _write(path, ROWS[:1000], 1_000_000)
+    return path
+
+
+def test_appended_rows_are_ingested_incrementally(path):
+    cache = LedgerCache()
+    cache.get(str(path))
+
+    _write(path, ROWS[:1200], 1_000_100)
+    _assert_full_parse(cache.get(str(path)), path)
+    _write(path, ROWS, 1_000_200)
+    _assert_full_parse(cache.get(str(path)), path)
+
+    assert cache.incremental_reloads == 2
+    assert cache.rewrite_fallbacks == 0
+
+
+def test_rewritten_history_is_parsed_in_full(path):
+    cache = LedgerCache()
+    cache.get(str(path))
+
+    # Same prefix, but the "new" rows repeat tickets that were already ingested
+    _write(path, ROWS[:1000] + ROWS[900:1000], 1_000_100)
+
+    _assert_full_parse(cache.get(str(path)), path)
+    assert cache.rewrite_fallbacks == 1
+
+
+def test_changed_prefix_is_parsed_in_full(path):
+    cache = LedgerCache()
+    cache.get(str(path))
+
+    _write(path, ROWS[1:1100], 1_000_100)
+
+    _assert_full_parse(cache.get(str(path)), path)
+    assert cache.incremental_reloads == 0
+
+
+def test_versions_increase_on_every_reload(path):
+    cache = LedgerCache()
+    first = cache.get_entry(str(path))
+    assert cache.get_entry(str(path)) is first
+
+    _write(path, ROWS[:1100], 1_000_100)
+
+    assert cache.get_entry(str(path)).version > first.version
@@ -0,0 +1,44 @@
+"""
+Tests for the MT4 statement parsers
+The streaming engine must return exactly the rows of the BeautifulSoup engine
+"""
+
+import pytest
+
+from services.mt4_parser import compare_parser_engines, parse_trade_data
+
+
+def test_stream_engine_matches_bs4(statement):
+    result = compare_parser_engines(statement)
+
+    assert result['stream_count'] == 2000
+    assert result['identical'], result['mismatches'][:10]
+
+
+def test_stream_engine_matches_bs4_on_crlf_and_non_ascii(tmp_path, statement):
+    with open(statement, encoding='utf-8') as file:
+        text = file.read().replace('Withdrawal', 'Withdrawal €')
+    path = tmp_path / 'crlf.htm'
+    with open(path, 'w', encoding='utf-8', newline='\r\n') as file:
+        file.write(text)
+
+    streamed = parse_trade_data(str(path), engine='stream')
+
+    assert streamed == parse_trade_data(str(path), engine='bs4')
+    assert any(row.get('description') == 'Withdrawal €' for row in streamed)
+
+
+def test_stream_engine_reads_every_transaction_kind(statement):
+    rows = parse_trade_data(statement, engine='stream')
+
+    assert {row['type'] for row in rows} == {'buy', 'sell', 'balance'}
+    assert rows[0]['type'] == 'balance' and rows[0]['amount'] == 10000.0
+
+
+def test_missing_file_returns_no_rows(tmp_path):
+    assert parse_trade_data(str(tmp_path / 'missing.htm'), engine='stream') == []
+
+
+def test_unknown_engine_is_rejected(statement):
+    with pytest.raises(ValueError):
+        parse_trade_data(statement, engine='lxml')
@@ -0,0 +1,55 @@
+"""
+Tests for API JSON encoding
+The json fallback must encode like orjson
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from api import serialization
+
+CONTENT = {
+    'count': np.int64(3),
+    'ratio': np.float32(0.5),
+    'missing': np.float64('nan'),
+    'curve': np.array([1.5, np.inf]),
+    'flags': [float('-inf'), np.bool_(True), None],
+    'pair': ('EURUSD', 1.25),
+    'note': 'Withdrawal €',
+}
+EXPECTED = {
+    'count': 3,
+    'ratio': 0.5,
+    'missing': None,
+    'curve': [1.5, None],
+    'flags': [None, True, None],
+    'pair': ['EURUSD', 1.25],
+    'note': 'Withdrawal €',
+}
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(serialization, 'orjson', None)
+    return request.param
+
+
+def test_numpy_values_and_non_finite_floats(encoder):
+    encoded = serialization.dumps(CONTENT)
+
+    assert json.loads(encoded) == EXPECTED
+    assert 'Withdrawal €'.encode('utf-8') in encoded
+
+
+def test_encoders_agree(monkeypatch):
+    orjson = pytest.importorskip('orjson')
+    encoded = serialization.dumps(CONTENT)
+    monkeypatch.setattr(serialization, 'orjson', None)
+
+    assert serialization.dumps(CONTENT) == encoded
+    assert orjson.loads(encoded) == EXPECTED
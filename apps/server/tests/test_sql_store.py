@@ -0,0 +1,134 @@
+"""
+Tests for the optional SQLite ledger backend
+SQL summaries and trade pages must equal the in-memory ledger's
+"""
+
+import sqlite3
+import time
+
+import pytest
+
+from generate_statement import FOOTER, HEADER, generate_rows
+from services.ledger import TRADE_FIELDS
+from services.ledger_cache import LedgerCache
+from services.sql_store import LedgerStore
+
+DATE_RANGES = [(None, None), ('2015.01.20', None), (None, '2015.02.10'), ('2015.01.12', '2015.01.31'), ('2030.01.01', None)]
+SORTS = [None, 'profit', '-profit', 'symbol', '-type', 'ticket', '-open_time', 'close_time', '-size']
+
+
+@pytest.fixture(scope="module")
+def duplicated(tmp_path_factory):
+    """Statement listing some tickets twice, which both backends must keep."""
+    rows = list(generate_rows(1500, seed=5))
+    path = tmp_path_factory.mktemp("sql") / 'duplicated.htm'
+    path.write_text(HEADER + ''.join(rows[:800] + rows[700:720] + rows[800:]) + FOOTER, encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def loaded(tmp_path_factory, statement, duplicated):
+    """LedgerStore holding both statements, and their cache entries."""
+    store = LedgerStore(tmp_path_factory.mktemp("sql") / 'ledger.db')
+    cache = LedgerCache()
+    entries = {path: cache.get_entry(path) for path in (statement, duplicated)}
+    for path, entry in entries.items():
+        assert not store.holds(path, entry)
+        assert store.sync(path, entry)
+        assert store.holds(path, entry)
+    return store, entries
+
+
+def _memory_page(ledger, from_date, to_date, fields, sort, limit, offset):
+    trades = ledger.filter_by_date_range(from_date, to_date).trades()
+    if sort:
+        trades = trades.take(trades.sort_order(sort.lstrip('-'), descending=sort.startswith('-')))
+    end = None if limit is None else offset + limit
+    return trades.take(slice(offset, end)).to_records(fields), len(trades)
+
+
+@pytest.mark.parametrize("from_date,to_date", DATE_RANGES)
+def test_summary_matches_memory(loaded, from_date, to_date):
+    store, entries = loaded
+    for path, entry in entries.items():
+        assert store.summary(path, from_date, to_date) == entry.data.summary(from_date, to_date)
+
+
+@pytest.mark.parametrize("sort", SORTS)
+def test_trade_pages_match_memory(loaded, sort):
+    store, entries = loaded
+    fields = list(TRADE_FIELDS)
+    for path, entry in entries.items():
+        for from_date, to_date in DATE_RANGES[:4]:
+            for limit, offset in [(None, 0), (100, 0), (100, 250), (50, 10000)]:
+                expected = _memory_page(entry.data, from_date, to_date, fields, sort, limit, offset)
+                assert store.trade_page(path, from_date, to_date, fields, sort, limit, offset) == expected
+
+
+def test_duplicate_tickets_are_kept(loaded, duplicated):
+    store, entries = loaded
+
+    assert store.stats()['rows'] == sum(len(entry.data) for entry in entries.values())
+    assert store.trade_page(duplicated)[1] == len(entries[duplicated].data.trades())
+
+
+def test_unknown_fields_are_rejected(loaded, statement):
+    store, _ = loaded
+    with pytest.raises(ValueError):
+        store.trade_page(statement, fields=['bogus'])
+    with pytest.raises(ValueError):
+        store.trade_page(statement, sort='-bogus')
+
+
+def test_background_sync_loads_the_latest_entry(tmp_path, statement, duplicated):
+    store = LedgerStore(tmp_path / 'ledger.db')
+    cache = LedgerCache()
+    first, latest = cache.get_entry(statement), cache.get_entry(duplicated)
+
+    store.sync_async('/statements/main.htm', first)
+    store.sync_async('/statements/main.htm', latest)
+    deadline = time.monotonic() + 30
+    while store._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert store.holds('/statements/main.htm', latest)
+    assert store.stats()['rows'] == len(latest.data)
+
+
+def test_database_of_another_schema_is_rebuilt(tmp_path, statement):
+    path = tmp_path / 'ledger.db'
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        "CREATE TABLE statements (path TEXT PRIMARY KEY, digest TEXT, rows INTEGER, loaded REAL);"
+        "INSERT INTO statements VALUES ('stale', 'digest', 1, 0);"
+    )
+    connection.close()
+
+    store = LedgerStore(path)
+    entry = LedgerCache().get_entry(statement)
+
+    assert store.stats()['statements'] == 0
+    assert store.sync(statement, entry)
+    assert not LedgerStore(path).sync(statement, entry)
+
+
+def test_api_answers_from_memory_until_the_store_is_loaded(client, tmp_path, statement, monkeypatch):
+    import api.routes as routes
+
+    ledger = routes.ledger_cache.get(statement)
+    trades_url = '/api/trades?sort=-profit&limit=50&offset=20'
+    expected_trades = client.get(trades_url).json()
+    store = LedgerStore(tmp_path / 'ledger.db')
+    monkeypatch.setattr(routes, 'ledger_store', store)
+
+    # Not loaded yet: served from memory while the load runs in the background.
+    # Each summary asks for a new range, so none is replayed from the response cache.
+    assert client.get('/api/summary?from_date=2015.01.13').json()['data'] == ledger.summary('2015.01.13')
+    assert client.get(trades_url).json() == expected_trades
+    deadline = time.monotonic() + 30
+    while not store.holds(statement, routes.ledger_cache.get_entry(statement)) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert store.loads == 1
+    assert client.get('/api/summary?from_date=2015.01.14').json()['data'] == ledger.summary('2015.01.14')
+    assert client.get(trades_url).json() == expected_trades
@@ -0,0 +1,83 @@
+"""
+Tests for the multi-account statement registry
+"""
+
+import os
+import shutil
+
+import pytest
+
+from services.executor import WorkerPool
+from services.ledger_cache import LedgerCache
+from services.statement_registry import ALL_ACCOUNTS, StatementRegistry, UnknownAccount
+
+
+@pytest.fixture
+def exports(tmp_path, statement, make_statement):
+    exports = tmp_path / 'exports'
+    (exports / 'broker_a').mkdir(parents=True)
+    shutil.copy(statement, exports / 'main.htm')
+    shutil.copy(make_statement(300, seed=2), exports / 'broker_a' / '1234567.htm')
+    (exports / 'notes.txt').write_text('not a statement')
+    return exports
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(io_workers=2, cpu_workers=1)
+    yield pool
+    pool.shutdown()
+
+
+def _age(*directories):
+    # Directories modified just before a scan are always rescanned
+    for directory in directories:
+        os.utime(directory, (0, 0))
+
+
+def test_discover_finds_nested_statements(exports):
+    registry = StatementRegistry(exports, cache=LedgerCache())
+
+    assert list(registry.discover()) == ['broker_a/1234567', 'main']
+    with pytest.raises(UnknownAccount):
+        registry.path_for('notes')
+
+
+def test_reserved_and_duplicate_account_ids_are_skipped(exports, capsys):
+    shutil.copy(exports / 'main.htm', exports / 'all.htm')
+    shutil.copy(exports / 'main.htm', exports / 'broker_a' / '1234567.html')
+    shutil.copy(exports / 'main.htm', exports / 'broker_a' / 'all.htm')
+    registry = StatementRegistry(exports, cache=LedgerCache())
+
+    accounts = registry.discover()
+
+    assert list(accounts) == ['broker_a/1234567', 'broker_a/all', 'main']
+    assert accounts['broker_a/1234567'].name == '1234567.htm'
+    skipped = capsys.readouterr().out
+    assert 'all.htm' in skipped and '1234567.html' in skipped
+
+
+def test_discover_reuses_scan_until_a_directory_changes(exports):
+    registry = StatementRegistry(exports, cache=LedgerCache())
+    _age(exports, exports / 'broker_a')
+    registry.discover()
+    registry.discover()
+    assert registry.scans == 1
+
+    shutil.copy(exports / 'main.htm', exports / 'broker_a' / '7654321.htm')
+
+    assert 'broker_a/7654321' in registry.discover()
+    assert registry.scans == 2
+
+
+def test_aggregate_concatenates_every_account(exports, pool):
+    registry = StatementRegistry(exports, cache=LedgerCache(), pool=pool)
+
+    # From inside the I/O pool, as the API calls it
+    entries = pool.io_pool.submit(registry.load_all).result()
+    ledger, version = registry.aggregate_entry()
+
+    assert len(ledger) == sum(len(entry.data) for entry in entries.values()) == 2300
+    assert set(ledger.decode('account')) == {'main', 'broker_a/1234567'}
+    assert registry.aggregate_state()[0] == version
+    assert version[0] == ALL_ACCOUNTS
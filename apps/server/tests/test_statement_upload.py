@@ -0,0 +1,113 @@
+"""
+Tests for streamed statement uploads and their background ingest
+"""
+
+import hashlib
+import os
+from multiprocessing import shared_memory
+
+import pytest
+
+from services.ledger_cache import LedgerCache
+from services.mt4_parser import load_ledger
+from services.statement_upload import (
+    StatementUpload, UploadError, UploadManager, UploadTooLarge, parse_with_progress, validate_account
+)
+
+
+@pytest.fixture
+def body(statement):
+    with open(statement, 'rb') as file:
+        return file.read()
+
+
+def _feed(upload, data, chunk_size=7919):
+    for start in range(0, len(data), chunk_size):
+        upload.feed(data[start:start + chunk_size])
+    return upload.finish()
+
+
+def test_raw_body_is_written_and_hashed(tmp_path, body):
+    upload = StatementUpload(tmp_path / 'main.htm', max_bytes=len(body))
+
+    temp_path, digest, size = _feed(upload, body)
+
+    assert size == len(body)
+    assert digest == hashlib.sha256(body).hexdigest()
+    assert temp_path.read_bytes() == body
+
+
+def test_multipart_body_keeps_only_the_statement(tmp_path, body):
+    boundary = 'statement-boundary'
+    data = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="note"\r\n\r\nhello\r\n'
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="main.htm"\r\n'
+        'Content-Type: text/html\r\n\r\n'
+    ).encode() + body + f'\r\n--{boundary}--\r\n'.encode()
+    upload = StatementUpload(tmp_path / 'main.htm', len(body), f'multipart/form-data; boundary={boundary}')
+
+    temp_path, digest, size = _feed(upload, data)
+
+    assert temp_path.read_bytes() == body
+    assert size == len(body)
+
+
+def test_oversized_and_invalid_uploads_are_rejected(tmp_path, body):
+    upload = StatementUpload(tmp_path / 'main.htm', max_bytes=1000)
+    with pytest.raises(UploadTooLarge):
+        _feed(upload, body)
+    upload.abort()
+
+    with pytest.raises(UploadError):
+        StatementUpload(tmp_path / 'main.htm', 1000).finish()
+    for account in ('../main', 'all', 'a//b'):
+        with pytest.raises(UploadError):
+            validate_account(account, reserved=('all',))
+    assert os.listdir(tmp_path) == []
+
+
+def test_parse_progress_is_reported_in_bytes(statement):
+    memory = shared_memory.SharedMemory(create=True, size=8)
+    try:
+        ledger, rows_end = parse_with_progress(statement, memory.name)
+        parsed_bytes = int.from_bytes(memory.buf[:8], 'little')
+    finally:
+        memory.close()
+        memory.unlink()
+
+    assert parsed_bytes == os.path.getsize(statement)
+    assert len(ledger) == 2000
+    assert 0 < rows_end < parsed_bytes
+
+
+def test_ingest_installs_the_parsed_statement(tmp_path, body, statement):
+    target = tmp_path / 'main.htm'
+    cache = LedgerCache()
+    manager = UploadManager(cache)
+    job = manager.begin('main', target)
+    temp_path, digest, size = _feed(StatementUpload(target, len(body)), body)
+    manager.received(job, temp_path, digest, size)
+
+    manager.ingest(job)
+
+    assert job.state == 'ready' and job.progress() == 1.0
+    assert job.rows == 2000
+    assert target.read_bytes() == body
+    assert cache.get_entry(str(target)).version == job.version
+    assert cache.get(str(target)).to_records() == load_ledger(statement).to_records()
+    assert manager.stats() == {'active': 0, 'completed': 1, 'failed': 0}
+
+
+def test_statement_without_transactions_keeps_the_old_one(tmp_path):
+    target = tmp_path / 'main.htm'
+    target.write_bytes(b'old')
+    manager = UploadManager(LedgerCache())
+    job = manager.begin('main', target)
+    temp_path, digest, size = _feed(StatementUpload(target, 1000), b'<html><body>nothing here</body></html>')
+    manager.received(job, temp_path, digest, size)
+
+    manager.ingest(job)
+
+    assert job.state == 'failed' and job.progress() == 1.0
+    assert target.read_bytes() == b'old'
+    assert not os.path.exists(temp_path)
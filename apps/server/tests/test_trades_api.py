@@ -0,0 +1,86 @@
+"""
+Tests for paging, projection and sorting of /api/trades
+Every page must be a slice of the trades sorted the way Python would sort them
+"""
+
+import json
+
+import pytest
+
+from services.mt4_parser import parse_trade_data
+
+
+@pytest.fixture(scope="module")
+def trades(statement):
+    return [row for row in parse_trade_data(statement, engine='stream') if row['type'] in ('buy', 'sell')]
+
+
+def _walk(client, url):
+    """Every row of a paged query, following next_cursor."""
+    rows = []
+    while url:
+        body = client.get(url).json()
+        assert body['success'], body
+        rows.extend(body['data'])
+        url = f"/api/trades?cursor={body['next_cursor']}&limit=300" if body['next_cursor'] else None
+    return rows, body['total']
+
+
+def test_legacy_request_returns_every_trade(client, trades):
+    body = client.get('/api/trades').json()
+
+    assert body['data'] == trades
+    assert body['count'] == len(trades)
+
+
+@pytest.mark.parametrize("sort", ['profit', '-profit', 'symbol', '-symbol', 'open_time', '-close_time', '-size'])
+def test_cursor_pages_follow_the_sort_order(client, trades, sort):
+    field = sort.lstrip('-')
+    # sorted() is stable with reverse=True too, like TradeLedger.sort_order
+    expected = sorted(trades, key=lambda row: row[field], reverse=sort.startswith('-'))
+
+    rows, total = _walk(client, f'/api/trades?sort={sort}&limit=300')
+
+    assert total == len(trades)
+    assert [row['ticket'] for row in rows] == [row['ticket'] for row in expected]
+
+
+def test_fields_are_projected(client, trades):
+    body = client.get('/api/trades?fields=ticket,profit&limit=5&offset=10').json()
+
+    assert body['data'] == [{'ticket': row['ticket'], 'profit': row['profit']} for row in trades[10:15]]
+    assert body['next_cursor']
+
+
+def test_date_range_is_applied_before_paging(client, trades):
+    expected = [row for row in trades if '2015.01.12' <= row['open_time'][:10] <= '2015.01.18']
+
+    rows, total = _walk(client, '/api/trades?from_date=2015.01.12&to_date=2015.01.18&limit=300')
+
+    assert total == len(expected)
+    assert rows == expected
+
+
+def test_ndjson_streams_every_row(client, trades):
+    response = client.get('/api/trades?format=ndjson&sort=-profit&fields=ticket')
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers['x-total-count'] == str(len(trades))
+    assert 'x-next-cursor' not in response.headers
+    assert [row['ticket'] for row in lines] == [
+        row['ticket'] for row in sorted(trades, key=lambda row: row['profit'], reverse=True)
+    ]
+
+
+@pytest.mark.parametrize("query", ['sort=bogus', 'fields=bogus', 'limit=0', 'offset=-1', 'cursor=!!', 'format=xml'])
+def test_invalid_queries_are_rejected(client, query):
+    response = client.get(f'/api/trades?{query}')
+
+    assert response.status_code == 400
+    assert response.json()['success'] is False
+
+
+def test_cursor_must_keep_its_sort(client):
+    cursor = client.get('/api/trades?sort=profit&limit=5').json()['next_cursor']
+
+    assert client.get(f'/api/trades?cursor={cursor}&sort=-profit').status_code == 400